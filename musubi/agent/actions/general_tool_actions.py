@@ -41,6 +41,8 @@ def implementation_analyze(website_config_path = Path("config") / "websites.json
             - `scroll` (int): The count of websites classified as "scroll".
             - `onepage` (int): The count of websites classified as "onepage".
             - `click` (int): The count of websites classified as "click".
+            - `sitemap` (int): The count of websites classified as "sitemap".
+            - `feed` (int): The count of websites classified as "feed".
     """
     analyzer = ConfigAnalyzer(website_config_path)
     report = analyzer.implementation_analyze()
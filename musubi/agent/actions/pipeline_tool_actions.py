@@ -4,29 +4,22 @@ import os
 from dotenv import load_dotenv, set_key
 import urllib.parse
 from urllib.parse import quote_plus, urlparse
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from collections import Counter
 import json
 import sys
 from loguru import logger
 from ...utils.analyze import WebsiteNavigationAnalyzer
 from ...pipeline import Pipeline
-from ...utils import is_valid_format, create_env_file
+from ...utils import is_valid_format, create_env_file, get_session, make_soup, DEFAULT_HEADERS
 
 
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/120.0.0.0 Safari/537.36"
-}
-
 
 class SearchCrawler:
     def __init__(self):
         """Initialize Yahoo Search Crawler with proper headers to simulate real browser"""
-        self.headers = headers
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        self.headers = DEFAULT_HEADERS
+        self.session = get_session()
     
     def _is_valid_result(self, title: str, url: str) -> bool:
         """Filter out irrelevant search results like ads, navigation elements, etc.
@@ -277,7 +270,7 @@ def google_search(
             )
 
     url = "https://www.googleapis.com/customsearch/v1?cx={}".format(google_engine_id) + "&key={}".format(google_search_api) + "&q={}".format(query) + "&udm=14"
-    response = requests.get(url)
+    response = get_session().get(url)
     if response.status_code != 200:
         raise Exception("API request error")
     search_result = response.json()
@@ -343,12 +336,12 @@ def get_container(url: str):
         - Second list: Contains [child_element_name, class_name] if a specific child
           element is identified, or None if no child element is needed.
     """
-    response = requests.get(url, headers=headers)
+    response = get_session().get(url)
     if response.status_code != 200:
         logger.error(f"Failed to fetch the page: {response.status_code}")
         return ([], None)
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = make_soup(response.text)
     soup = soup.find("body")
     possible_containers = []
     ignore_class = ["left", "right", "footer", "page", "layout", "nav"]
@@ -469,12 +462,12 @@ def get_page_info(
             https://example.com/blog/page/5/
     """
     pagination_candidates = ["pg", "pagination", "page", "pag"]
-    response = requests.get(url, headers=headers)
+    response = get_session().get(url)
     if response.status_code != 200:
         logger.error(f"Failed to fetch the page: {response.status_code}")
         return []
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = make_soup(response.text, parse_only=SoupStrainer(["nav", "a"]))
     nav_soup = soup.find_all("nav")
     urls = []
     try:
@@ -629,7 +622,7 @@ def pipeline_tool(
         block2 (`list`, *optional*):
             Second block if crawling nested structure.
         implementation (`str`):
-            Type of crawling method to crawl urls on the website. The implementation should be one of the `scan`, `scroll`, `onepage`, or `click`,
+            Type of crawling method to crawl urls on the website. The implementation should be one of the `scan`, `scroll`, `onepage`, `click`, `sitemap`, or `feed`,
             otherwise it will raise an error.
         start_page (`int`, *optional*, default=0):
             From which page to start crawling urls. 0 is first page, 1 is second page, and so forth.
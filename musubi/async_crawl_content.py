@@ -1,56 +1,119 @@
-import os
-from bs4 import BeautifulSoup
-import pymupdf
-import pymupdf4llm
-import io
 from tqdm import tqdm
-from trafilatura import fetch_url, extract
-import orjson
 import pandas as pd
 import aiohttp
 import asyncio
-from functools import partial
+from concurrent.futures import Executor
+from typing import Optional
 from loguru import logger
+from .utils import (
+    iter_jsonl,
+    open_content_index,
+    get_extractor,
+    create_extraction_pool,
+    open_content_writer,
+    is_empty_output,
+    create_async_session,
+    fetch_page_async,
+    extract_image_text_pairs,
+    probe_image_async,
+    FetchError,
+    DeadLetterWriter,
+    get_dead_letter_path,
+    load_dead_letters,
+    compact_dead_letters,
+    open_near_dup_index,
+    CrawlJournal,
+    get_journal_path,
+    RawCache,
+    open_raw_cache,
+    reextract_contents,
+    WarcWriter,
+    open_warc_writer,
+    replay_warc_contents,
+    fetch_document_async,
+    convert_pdf_async,
+    DEFAULT_MAX_PDF_BYTES,
+    DEFAULT_PDF_PAGES_PER_TASK,
+    DEFAULT_MAX_SHARD_BYTES
+)
+
+
+def _archive(url, response, data, cache=None, warc=None, kind="html"):
+    # PDFs are handed over as temporary files, which are streamed into the
+    # archives instead of being read back into memory
+    if warc is not None:
+        write_response = warc.write_response_file if kind == "pdf" else warc.write_response
+        write_response(
+            url,
+            response.status,
+            response.reason,
+            response.headers,
+            data,
+            request_headers=response.request_info.headers
+        )
+    if (cache is not None) and data and (response.status == 200):
+        if kind == "pdf":
+            cache.put_file(url, data, kind=kind)
+        else:
+            cache.put(url, data, kind=kind)
 
 
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/120.0.0.0 Safari/537.36"
-}
-
-
-async def get_content(url: str = None, session: aiohttp.ClientSession = None):
-    if url.endswith(".pdf"):
-        async with session.get(url, headers=headers) as request:
-            filestream = io.BytesIO(await request.read())
-        with pymupdf.open(stream=filestream.getvalue(), filetype="pdf") as doc:
-            result = pymupdf4llm.to_markdown(doc)
+async def get_content(
+    url: str = None,
+    session: aiohttp.ClientSession = None,
+    executor: Optional[Executor] = None,
+    cache: Optional[RawCache] = None,
+    warc: Optional[WarcWriter] = None,
+    max_pdf_bytes: Optional[int] = DEFAULT_MAX_PDF_BYTES,
+    pdf_pages_per_task: int = DEFAULT_PDF_PAGES_PER_TASK
+):
+    # download through the shared session so that connections are pooled and
+    # kept alive, and only hand the CPU-bound extraction off to the executor
+    response, kind, data = await fetch_document_async(url, session, max_pdf_bytes=max_pdf_bytes)
+    if (data is not None) and ((cache is not None) or (warc is not None)):
+        # hashing, compressing and writing the document would stall the other
+        # connections, and must be done before the PDF is converted and removed
+        await asyncio.to_thread(_archive, url, response, data, cache=cache, warc=warc, kind=kind)
+
+    if not data:
+        if response.status != 200:
+            logger.warning(f"Failed to download {url}.")
+        return None, url
+    if kind == "pdf":
+        # long PDFs are split into page ranges converted in parallel
+        result = await convert_pdf_async(data, executor=executor, pages_per_task=pdf_pages_per_task)
     else:
-        loop = asyncio.get_event_loop()
-        downloaded = await loop.run_in_executor(None, fetch_url, url)
-        extract_with_args = partial(extract, filecontent=downloaded, favor_precision=True, output_format="markdown")
-        result = await loop.run_in_executor(None, extract_with_args)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(executor, get_extractor(kind), data)
     return result, url
 
 async def fetch(session: aiohttp.ClientSession, url):
-    async with session.get(url, headers=headers) as response:
-        return await response.text()
+    _, text = await fetch_page_async(url, session)
+    return text
 
 async def get_image_text_pair(
     url: str = None,
-    img_txt_block: list = None
+    img_txt_block: list = None,
+    session: aiohttp.ClientSession = None,
+    probe_images: bool = False
 ):
-    async with aiohttp.ClientSession() as session:
-        content = await fetch(session, url)
-        soup = BeautifulSoup(content, "html.parser")
-        soup = soup.find(img_txt_block[0], class_=img_txt_block[1])
-        img_list = []
-        for img_tag in soup.find_all("img"):
-            img_url = img_tag.get("src")
-            description = img_tag.get("alt")
-            img_list.append({"img_url": img_url, "caption": description, "url": url})
-        return img_list
+    if session is None:
+        async with create_async_session() as session:
+            return await get_image_text_pair(
+                url=url,
+                img_txt_block=img_txt_block,
+                session=session,
+                probe_images=probe_images
+            )
+
+    content = await fetch(session, url)
+    img_list = extract_image_text_pairs(content, url, img_txt_block)
+    if probe_images and img_list:
+        # the images of a page are probed concurrently through the shared session
+        infos = await asyncio.gather(*(probe_image_async(pair["img_url"], session) for pair in img_list))
+        for pair, info in zip(img_list, infos):
+            pair.update(info)
+    return img_list
 
 
 class AsyncCrawl():
@@ -65,17 +128,88 @@ class AsyncCrawl():
         crawl_type (str, optional): Type of crawling operation. Should be one of 
             'text' or 'img-text'. Defaults to 'text'.
         max_concurrent_tasks (int, optional): Maximum number of concurrent crawling
-            tasks allowed. Defaults to 30.
+            tasks allowed. In streaming mode this is the number of worker
+            coroutines. Defaults to 30.
+        streaming (bool, optional): If True, feed links lazily from url_path into
+            a bounded queue consumed by a fixed pool of workers instead of creating
+            one task per link up front. Memory usage then stays flat regardless of
+            the size of the link file. Defaults to False.
+        queue_size (int, optional): Maximum number of links buffered between the
+            reader and the workers in streaming mode. Defaults to twice
+            max_concurrent_tasks.
+        extract_workers (int, optional): If set, run trafilatura and pymupdf4llm
+            in a process pool with this many workers so extraction scales across
+            cores. Defaults to None, using the default thread executor.
+        max_tasks_per_child (int, optional): Number of documents an extraction
+            worker handles before being replaced. Defaults to None.
+        raw_cache_dir (str, optional): Folder of a ``RawCache`` keeping the raw
+            downloaded documents, so that contents can be re-extracted later
+            without fetching them again. Defaults to None, disabling the cache.
+        raw_cache_max_bytes (int, optional): Maximum compressed size of the raw
+            cache, least recently used documents are evicted beyond it.
+            Defaults to None, meaning unlimited.
+        warc_dir (str, optional): Folder where requests and responses are archived
+            as rotating gzip WARC segments. Defaults to None, disabling the archive.
+        warc_max_bytes (int, optional): Size in bytes after which a new WARC
+            segment is started. Defaults to 1 GiB.
+        max_pdf_bytes (int, optional): PDFs larger than this are skipped without
+            being fully downloaded. None means unlimited. Defaults to 100 MiB.
+        pdf_pages_per_task (int, optional): Number of PDF pages converted by one
+            task of the extraction pool, so that long PDFs are converted on several
+            cores. Defaults to 16.
+        near_dup_db (str, optional): Path of a ``NearDuplicateIndex`` database,
+            which can be shared by several websites. Contents which are near
+            duplicates of an indexed document are saved with a None content and
+            the URL of the original under ``duplicate_of``. Defaults to None,
+            disabling near-duplicate detection.
+        output_format (str, optional): 'jsonl' to save contents into a single
+            JSONL file, or 'jsonl.zst' / 'parquet' to save them into a folder of
+            compressed shards, see ``ShardedWriter``. Defaults to 'jsonl'.
+        max_shard_bytes (int, optional): Compressed size of a shard. Defaults to
+            64 MiB.
+        probe_images (bool, optional): If True, the images found by 'img-text'
+            crawls are probed concurrently with range requests, and their size in
+            bytes, format, width and height are saved with their captions.
+            Defaults to False.
     """
     def __init__(
         self,
         url_path: str,
         crawl_type: str = "text",
         max_concurrent_tasks: int = 30,
+        streaming: bool = False,
+        queue_size: Optional[int] = None,
+        extract_workers: Optional[int] = None,
+        max_tasks_per_child: Optional[int] = None,
+        raw_cache_dir: Optional[str] = None,
+        raw_cache_max_bytes: Optional[int] = None,
+        warc_dir: Optional[str] = None,
+        warc_max_bytes: int = 1024 ** 3,
+        max_pdf_bytes: Optional[int] = DEFAULT_MAX_PDF_BYTES,
+        pdf_pages_per_task: int = DEFAULT_PDF_PAGES_PER_TASK,
+        near_dup_db: Optional[str] = None,
+        output_format: str = "jsonl",
+        max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES,
+        probe_images: bool = False
     ):
         self.url_path = url_path
         self.crawl_type = crawl_type     
+        self.max_concurrent_tasks = max_concurrent_tasks
         self.semaphore = asyncio.Semaphore(max_concurrent_tasks)
+        self.streaming = streaming
+        self.queue_size = queue_size if queue_size is not None else 2 * max_concurrent_tasks
+        self.extract_workers = extract_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.raw_cache_dir = raw_cache_dir
+        self.raw_cache_max_bytes = raw_cache_max_bytes
+        self.warc_dir = warc_dir
+        self.warc_max_bytes = warc_max_bytes
+        self.max_pdf_bytes = max_pdf_bytes
+        self.pdf_pages_per_task = pdf_pages_per_task
+        self.near_dup_db = near_dup_db
+        self.output_format = output_format
+        self.max_shard_bytes = max_shard_bytes
+        self.probe_images = probe_images
 
     async def check_content_result(
         self,
@@ -98,7 +232,8 @@ class AsyncCrawl():
         df = pd.read_json(self.url_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")
         url = df.iloc[0]["link"]
         if self.crawl_type == "text":
-            res = await get_content(url=url)
+            async with create_async_session() as session:
+                res = await get_content(url=url, session=session)
         elif self.crawl_type == "img-text":
             res = await get_image_text_pair(url=url, img_txt_block=img_txt_block)
         print(res)
@@ -108,87 +243,291 @@ class AsyncCrawl():
         start_idx: int = 0,
         save_path: str = None,
         sleep_time: int = None,
-        img_txt_block: list = None
+        img_txt_block: list = None,
+        re_extract: bool = False,
+        replay_warc: bool = False,
+        retry_failed: bool = False
     ):
         """Crawl and save content from all websites in url_path asynchronously.
 
         This method concurrently crawls all URLs in the url_path file, extracts
         content based on the crawl_type, and saves results to a JSONL file. It uses
         a semaphore to limit concurrent tasks and supports resuming from a specific
-        index. Already crawled URLs are automatically skipped.
+        index. Already crawled URLs are automatically skipped by looking them up
+        in the seen-URL index stored next to url_path. URLs whose download still
+        fails after retries are recorded in a dead-letter file next to save_path.
 
         Args:
-            start_idx (int, optional): Index to start crawling from. Useful for
-                resuming interrupted crawls. Defaults to 0.
+            start_idx (int, optional): Index to start crawling from. Ignored when
+                an interrupted run is resumed from its journal. Defaults to 0.
             save_path (str, optional): Path to save the crawled content as JSONL.
                 Defaults to None.
             sleep_time (int, optional): Number of seconds to sleep between completed
-                requests to avoid rate limiting. Defaults to None.
+                requests on top of the per-host rate limit. Defaults to None.
             img_txt_block (list, optional): List of CSS selectors or identifiers
                 for image-text blocks. Only used when crawl_type is 'img-text'.
                 Defaults to None.
+            re_extract (bool, optional): If True, regenerate save_path from the
+                documents in the raw cache instead of crawling, without any network
+                access. Requires raw_cache_dir. Defaults to False.
+            replay_warc (bool, optional): If True, regenerate save_path from the
+                responses archived in warc_dir instead of crawling, without any
+                network access. Defaults to False.
+            retry_failed (bool, optional): If True, only crawl the URLs recorded in
+                the dead-letter file of save_path by previous crawls. URLs fetched
+                successfully are removed from it. Defaults to False.
 
         Returns:
             None: Results are saved to the file specified by save_path.
 
         Raises:
             Exception: If the saved content file is empty after crawling.
+            ValueError: If re_extract or replay_warc is True but no raw cache or
+                WARC folder is configured.
 
         Note:
             - Concurrent tasks are limited by the max_concurrent_tasks parameter
               set during initialization.
+            - All pages are downloaded through one shared ``aiohttp.ClientSession``
+              whose connection pool is sized by max_concurrent_tasks; only the
+              extraction step runs in an executor.
             - For 'text' crawl_type, each URL produces one entry with 'content' 
               and 'url' fields.
             - For 'img-text' crawl_type, each URL may produce multiple entries,
               one for each image-text pair found.
             - Errors during individual task execution are logged but do not stop
-              the overall crawling process.
+              the overall crawling process. Failed downloads are retried with
+              backoff, then recorded in ``*.failed.jsonl`` next to save_path.
             - A progress bar is displayed showing the number of completed tasks.
+            - Results are appended in batches by a single ``JsonlWriter``, or a
+              ``ShardedWriter`` for the 'jsonl.zst' and 'parquet' output formats,
+              in which case save_path is a folder.
+            - url_path is read lazily and never loaded into a DataFrame. In
+              streaming mode, the progress bar shows no total.
+            - Progress is journaled in ``*.content.journal`` next to url_path,
+              including the links in flight, whose results come back in any order.
+              If a run is interrupted, the next one seeks straight to the first
+              unfinished link and skips those finished after it; the journal is
+              removed once a run completes.
         """
-        save_file = os.path.isfile(save_path)
-        content_list = (
-            pd.read_json(save_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")["url"].to_list()
-            if save_file else []
+        if re_extract or replay_warc:
+            await self._reextract_contents(save_path, replay_warc=replay_warc)
+            return
+
+        dead_letter_path = get_dead_letter_path(save_path)
+        seen = open_content_index(self.url_path, save_path)
+        writer = open_content_writer(
+            save_path,
+            self.output_format,
+            self.max_shard_bytes,
+            skip_empty="content" if self.crawl_type == "text" else None
         )
+        dead_letters = DeadLetterWriter(dead_letter_path)
+        cache = open_raw_cache(self.raw_cache_dir, self.raw_cache_max_bytes) if self.crawl_type == "text" else None
+        warc = open_warc_writer(self.warc_dir, self.warc_max_bytes) if self.crawl_type == "text" else None
+        near_dup = open_near_dup_index(self.near_dup_db) if self.crawl_type == "text" else None
 
-        url_df = pd.read_json(self.url_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")
-
-        async def worker(coro):
-            async with self.semaphore:
-                try:
-                    res, url = await coro
-                    with open(save_path, "ab") as file:
-                        if self.crawl_type == "text":
-                            file.write(orjson.dumps({"content": res, "url": url}, option=orjson.OPT_NON_STR_KEYS) + b"\n")
-                        elif self.crawl_type == "img-text":
-                            for item in res:
-                                file.write(orjson.dumps(item, option=orjson.OPT_NON_STR_KEYS) + b"\n")
-
-                    if sleep_time is not None:
-                        await asyncio.sleep(sleep_time)
-
-                except Exception as e:
-                    logger.error(f"Error during task execution: {e}")
-
-        tasks = []
-        for i in range(start_idx, len(url_df)):
-            link = url_df.iloc[i]["link"]
-            if content_list and (link in content_list):
-                continue
+        def write_result(res, url):
+            if self.crawl_type == "text":
+                original = near_dup.add(url, res) if near_dup is not None else None
+                if original is not None:
+                    writer.write({"content": None, "url": url, "duplicate_of": original})
+                else:
+                    writer.write({"content": res, "url": url})
+            elif self.crawl_type == "img-text":
+                writer.write_many(res)
+            if res is not None:
+                # empty results are left out of sharded outputs, and retried next run
+                seen.add(url)
 
+        def create_coro(link):
             if self.crawl_type == "text":
-                tasks.append(asyncio.create_task(worker(get_content(url=link))))
+                return get_content(
+                    url=link,
+                    session=session,
+                    executor=pool,
+                    cache=cache,
+                    warc=warc,
+                    max_pdf_bytes=self.max_pdf_bytes,
+                    pdf_pages_per_task=self.pdf_pages_per_task
+                )
             elif self.crawl_type == "img-text":
-                tasks.append(asyncio.create_task(worker(get_image_text_pair(url=link, img_txt_block=img_txt_block))))
+                return get_image_text_pairs(link)
+
+        async def get_image_text_pairs(link):
+            img_list = await get_image_text_pair(
+                url=link,
+                img_txt_block=img_txt_block,
+                session=session,
+                probe_images=self.probe_images
+            )
+            return img_list, link
+
+        async def crawl_one(key, link):
+            try:
+                res, url = await create_coro(link)
+                write_result(res, url)
+                if journal is not None:
+                    journal.complete(key)
+
+                if sleep_time is not None:
+                    await asyncio.sleep(sleep_time)
+
+            except FetchError as e:
+                logger.error(str(e))
+                dead_letters.add(link, e)
+                if journal is not None:
+                    journal.fail(key)
+            except Exception as e:
+                logger.error(f"Error during task execution: {e}")
+                if journal is not None:
+                    journal.fail(key)
+            # the output is flushed in a thread, not on the event loop
+            if (journal is not None) and journal.checkpoint_due():
+                await journal.checkpoint_async()
+
+        def checkpoint():
+            writer.flush()
+            dead_letters.flush()
+
+        if retry_failed:
+            journal = None
+            links = ((None, link) for link in load_dead_letters(dead_letter_path))
+        else:
+            journal = CrawlJournal(
+                get_journal_path(self.url_path, "content"),
+                source_path=self.url_path,
+                on_checkpoint=checkpoint,
+                auto_checkpoint=False
+            )
+            # resume right after the last finished link of an interrupted run,
+            # links completed out of order after it are skipped below
+            links = iter_jsonl(
+                self.url_path,
+                key="link",
+                start_idx=0 if journal.resumed else start_idx,
+                start_offset=journal.low_water,
+                offsets=True
+            )
+
+        def iter_pending():
+            for key, link in links:
+                if (journal is not None) and journal.is_finished(key):
+                    continue
+                if link in seen:
+                    continue
+                if journal is not None:
+                    journal.start(key)
+                yield key, link
+
+        session = create_async_session(limit=self.max_concurrent_tasks)
+        pool = None
+        if self.extract_workers:
+            pool = create_extraction_pool(self.extract_workers, self.max_tasks_per_child)
+        try:
+            if self.streaming:
+                await self._stream_contents(links=iter_pending(), crawl_one=crawl_one)
+            else:
+                async def worker(key, link):
+                    async with self.semaphore:
+                        await crawl_one(key, link)
+
+                tasks = [asyncio.create_task(worker(key, link)) for key, link in iter_pending()]
+
+                if tasks:
+                    with tqdm(total=len(tasks), desc="Crawling contents") as pbar:
+                        for task in asyncio.as_completed(tasks):
+                            await task
+                            pbar.update(1)
+            if journal is not None:
+                journal.finish()
+        finally:
+            if journal is not None:
+                journal.close()
+            await session.close()
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            writer.close()
+            dead_letters.close()
+            # drop the dead letters which have been fetched since
+            compact_dead_letters(dead_letter_path, seen)
+            seen.close()
+            if cache is not None:
+                cache.close()
+            if warc is not None:
+                warc.close()
+            if near_dup is not None:
+                near_dup.close()
+
+        if is_empty_output(save_path):
+            raise Exception("Saved content file is empty.")
 
-        if tasks:
-            with tqdm(total=len(tasks), desc="Crawling contents") as pbar:
-                for task in asyncio.as_completed(tasks):
-                    await task
-                    pbar.update(1)
+    async def _reextract_contents(self, save_path: str, replay_warc: bool = False):
+        if self.crawl_type != "text":
+            raise ValueError("Re-extraction only supports the `text` crawl type.")
+        if replay_warc and (self.warc_dir is None):
+            raise ValueError("Argument `warc_dir` is required to replay contents.")
+        if (not replay_warc) and (self.raw_cache_dir is None):
+            raise ValueError("Argument `raw_cache_dir` is required to re-extract contents.")
+
+        def run():
+            if replay_warc:
+                return replay_warc_contents(
+                    self.warc_dir,
+                    save_path,
+                    extract_workers=self.extract_workers,
+                    max_tasks_per_child=self.max_tasks_per_child,
+                    output_format=self.output_format
+                )
+            # SQLite connections are bound to the thread which opened them
+            with open_raw_cache(self.raw_cache_dir, self.raw_cache_max_bytes) as cache:
+                return reextract_contents(
+                    self.url_path,
+                    save_path,
+                    cache,
+                    extract_workers=self.extract_workers,
+                    max_tasks_per_child=self.max_tasks_per_child,
+                    output_format=self.output_format
+                )
+
+        count = await asyncio.to_thread(run)
+        logger.info(f"Re-extracted {count} contents into {save_path}.")
+
+    async def _stream_contents(
+        self,
+        links,
+        crawl_one
+    ):
+        """Crawl links with a bounded producer/consumer pipeline.
 
-        if os.stat(save_path).st_size == 0:
-            raise Exception("Saved content file is empty.")
+        A single producer pulls ``(key, link)`` pairs lazily from links and puts
+        them into a bounded ``asyncio.Queue`` while ``max_concurrent_tasks`` workers
+        consume it, so only ``queue_size`` links are held in memory at any time and
+        the first results are written as soon as the first fetch finishes.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def producer():
+            try:
+                for item in links:
+                    await queue.put(item)
+            finally:
+                for _ in range(self.max_concurrent_tasks):
+                    await queue.put(None)
+
+        async def consumer(pbar):
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                await crawl_one(*item)
+                pbar.update(1)
+
+        with tqdm(desc="Crawling contents") as pbar:
+            await asyncio.gather(
+                producer(),
+                *[consumer(pbar) for _ in range(self.max_concurrent_tasks)]
+            )
 
 
 if __name__ == "__main__":
@@ -1,35 +1,45 @@
-import os
-import pandas as pd
-from bs4 import BeautifulSoup
-from typing import List, Optional
-import orjson
-import random
+from typing import List, Optional, Union
+from contextlib import nullcontext
 import aiohttp
 import asyncio
 from loguru import logger
 from tqdm import tqdm
-from .utils import get_root_path
+from .utils import (
+    get_root_path,
+    open_link_index,
+    open_validator_cache,
+    JsonlWriter,
+    create_async_session,
+    fetch_page_async,
+    FetchError,
+    DeadLetterWriter,
+    get_dead_letter_path,
+    load_dead_letters,
+    compact_dead_letters,
+    CrawlJournal,
+    get_journal_path,
+    BlockSelector,
+    AUTO_PAGES,
+    get_page_url,
+    find_last_page
+)
 
 
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/120.0.0.0 Safari/537.36"
-}
-
 class AsyncScan:
     def __init__(
         self,
         prefix: str,
         suffix: Optional[str] = None,
         root_path: Optional[str] = None,
-        pages: Optional[int] = None,
+        pages: Optional[Union[int, str]] = None,
         block1: List[str] = None,
         block2: Optional[List[str]] = None,
         url_path: Optional[str] = None,
         page_init_val: Optional[int] = 1,
         multiplier: Optional[int] = 1,
         max_concurrent_tasks: int = 30,
+        conditional: Optional[bool] = False,
+        early_stop: Optional[int] = None,
         **kwargs
     ):
         self.prefix = prefix
@@ -41,115 +51,214 @@ class AsyncScan:
         self.url_path = url_path
         self.block1 = block1
         self.block2 = block2
+        self.max_concurrent_tasks = max_concurrent_tasks
+        self.conditional = conditional
+        if (early_stop is not None) and (early_stop < 1):
+            raise ValueError("Argument `early_stop` should be a positive number of pages but got {}.".format(early_stop))
+        self.early_stop = early_stop
         self.semaphore = asyncio.Semaphore(max_concurrent_tasks)
-        if pages == 1:
+        self.selector = BlockSelector(self.block1, self.block2)
+        # with pages='auto', the pages are only listed once resolve_pages probed them
+        self.pages_lst = None
+        self.length = None
+        if self.pages != AUTO_PAGES:
+            self.resolve_pages()
+
+    def resolve_pages(self):
+        """List the pages to scan, finding their number first if pages is 'auto', see ``Scan.resolve_pages``.
+
+        The probes block, so ``crawl_link`` runs this in a thread when the pages
+        were not resolved before.
+        """
+        if self.pages_lst is not None:
+            return self.pages
+        if self.pages == AUTO_PAGES:
+            self.pages = self.find_pages()
+        if self.pages == 1:
             self.pages_lst = [self.prefix]
         else:
-            if suffix:
-                self.pages_lst = [self.prefix + str((self.page_init_val + i) * self.multiplier) + self.suffix for i in range(self.pages)]
-            else:
-                self.pages_lst = [self.prefix + str((self.page_init_val + i) * self.multiplier) for i in range(self.pages)]
+            self.pages_lst = [
+                get_page_url(self.prefix, i, self.suffix, self.page_init_val, self.multiplier) for i in range(self.pages)
+            ]
         self.length = len(self.pages_lst)
-        self.plural_a_tag = (self.block1[0] == "a") or (self.block2 and self.block2[0] == "a")
+        return self.pages
+
+    def find_pages(self):
+        """Find the number of listing pages with ``find_last_page``, see ``Scan.find_pages``.
+
+        The probes depend on each other, so they are sent one at a time through the
+        shared synchronous session.
+        """
+        pages = find_last_page(
+            lambda i: get_page_url(self.prefix, i, self.suffix, self.page_init_val, self.multiplier),
+            self.selector
+        )
+        if pages == 0:
+            raise ValueError("No link found in the blocks of the first page of {}, please check block1 and block2.".format(self.prefix))
+        return pages
+
+    def journal_run(self):
+        """Return the settings identifying the pages of the link journal, see ``Scan.journal_run``."""
+        return {"prefix": self.prefix, "pages": self.length, "conditional": bool(self.conditional)}
 
-    async def fetch(self, session: aiohttp.ClientSession, url):
-        async with session.get(url, headers=headers) as response:
-            return await response.text()
+    async def fetch(self, session: aiohttp.ClientSession, url, validators=None):
+        headers = validators.request_headers(url) if validators is not None else None
+        response, html = await fetch_page_async(url, session, headers=headers, semaphore=self.semaphore)
+        return html, response
         
     async def get_urls(
         self, 
         session: aiohttp.ClientSession = None, 
-        page: str = None
+        page: str = None,
+        validators=None,
+        dead_letters: DeadLetterWriter = None
     ):
-        async with self.semaphore:
-            link_list = []
-            try:
-                html = await self.fetch(session, page)
-                soup = BeautifulSoup(html, features="html.parser")
-
-                if self.block2:
-                    blocks = soup.find(self.block1[0], class_=self.block1[1])
-                    blocks = blocks.find_all(self.block2[0], class_=self.block2[1])
-                else:
-                    blocks = soup.find_all(self.block1[0], class_=self.block1[1])
-
-                for block in blocks:
-                    if self.root_path:
-                        if self.plural_a_tag:
-                            if "http" not in block["href"]:
-                                if "http" in self.root_path:
-                                    if self.root_path[-1] == block["href"][0] == "/":
-                                        self.root_path = self.root_path[:-1]
-                                    elif (self.root_path[-1] != "/") and (block["href"][0] != "/"):
-                                        self.root_path = self.root_path + "/"
-                                else:
-                                    raise ValueError("Wrong value of root_path.")
-                                link = self.root_path + block["href"]
-                            else:
-                                link = block["href"]
+        # the concurrency slot is only held while a request is in flight, not while
+        # waiting for the per-host rate limit or a retry backoff
+        link_list = []
+        try:
+            html, response = await self.fetch(session, page, validators)
+            if html is None:
+                logger.info("{} is not modified since the last crawl, skip it.".format(page))
+                return link_list
+            for href in self.selector.links(html):
+                if self.root_path:
+                    if "http" not in href:
+                        if "http" in self.root_path:
+                            if self.root_path[-1] == href[0] == "/":
+                                self.root_path = self.root_path[:-1]
+                            elif (self.root_path[-1] != "/") and (href[0] != "/"):
+                                self.root_path = self.root_path + "/"
                         else:
-                            if "http" not in block.a["href"]:
-                                if "http" in self.root_path:
-                                    if self.root_path[-1] == block.a["href"][0] == "/":
-                                        self.root_path = self.root_path[:-1]
-                                    elif (self.root_path[-1] != "/") and (block.a["href"][0] != "/"):
-                                        self.root_path = self.root_path + "/"
-                                else:
-                                    raise ValueError("Wrong value of root_path.")
-                                link = self.root_path + block.a["href"]
-                            else:
-                                link = block.a["href"]
+                            raise ValueError("Wrong value of root_path.")
+                        link = self.root_path + href
+                    else:
+                        link = href
+                else:
+                    if "http" in href:
+                        link = href
                     else:
-                        if self.plural_a_tag:
-                            if "http" in block["href"]:
-                                link = block["href"]
-                            else:
-                                root_path = get_root_path(page)
-                                if block["href"][0] == "/":
-                                    link = root_path + block["href"]
-                                else:
-                                    link = root_path + "/" + block["href"]
+                        root_path = get_root_path(page)
+                        if href[0] == "/":
+                            link = root_path + href
                         else:
-                            if "http" in block.a["href"]:
-                                link = block.a["href"]
-                            else:
-                                root_path = get_root_path(page)
-                                if block.a["href"][0] == "/":
-                                    link = root_path + block.a["href"]
-                                else:
-                                    link = root_path + "/" + block.a["href"]
-                    link_list.append(link)
-
-            except Exception as e:
-                logger.error(f"Error fetching {page}: {e}")
-
-            await asyncio.sleep(random.uniform(0.5, 2.0))
-            
-            return link_list
+                            link = root_path + "/" + href
+                link_list.append(link)
+
+            if (validators is not None) and (response.status == 200):
+                validators.update(page, response.headers)
+        except FetchError as e:
+            logger.error(str(e))
+            if dead_letters is not None:
+                dead_letters.add(page, e)
+            return None
+        except Exception as e:
+            logger.error(f"Error fetching {page}: {e}")
+
+        return link_list
     
-    async def crawl_link(self, start_page: int = 0):
-        is_url_path = os.path.isfile(self.url_path)
-        if is_url_path:
-            url_list = pd.read_json(self.url_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")["link"].to_list()
-        else:
-            url_list = None
-
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for i in range(start_page, self.length):
-                page = self.pages_lst[i]
-                tasks.append(self.get_urls(session, page))
-
-            with tqdm(total=len(tasks), desc="Crawling urls") as pbar:
-                for task in asyncio.as_completed(tasks):
-                    link_list = await task
-                    for link in link_list:
-                        if url_list and link in url_list:
-                            continue
-                        dictt = {"link": link}
-                        with open(self.url_path, "ab") as file:
-                            file.write(orjson.dumps(dictt, option=orjson.OPT_NON_STR_KEYS) + b"\n")
-                    pbar.update(1)
+    async def crawl_link(self, start_page: int = 0, retry_failed: bool = False):
+        """Extract the URLs of every page in pages_lst concurrently and save the new ones to url_path.
+
+        Failed pages are recorded in a dead-letter file and progress is journaled,
+        as in ``Scan.crawl_link``, update runs included. Without early_stop, every page is scheduled at
+        once. With early_stop, pages are fetched in order, in windows of early_stop
+        pages, and the scan ends after the window in which that many consecutive
+        pages held only known links.
+
+        Args:
+            start_page (int, optional): Index of the first page to scan. Ignored
+                when an interrupted crawl is resumed from its journal. Defaults to 0.
+            retry_failed (bool, optional): If True, only scan the pages recorded in
+                the dead-letter file by previous crawls. Defaults to False.
+        """
+        if (not retry_failed) and (self.pages_lst is None):
+            await asyncio.to_thread(self.resolve_pages)
+        dead_letter_path = get_dead_letter_path(self.url_path)
+        done = set()
+
+        async def scan(i, page):
+            return i, page, await self.get_urls(session, page, validators, dead_letters)
+
+        def save(i, page, link_list):
+            # returns the number of new links, or None if the page failed
+            if link_list is None:
+                if journal is not None:
+                    journal.fail(i)
+                return None
+            done.add(page)
+            new_links = 0
+            for link in link_list:
+                if not seen.add(link):
+                    continue
+                writer.write({"link": link})
+                new_links += 1
+            if journal is not None:
+                journal.complete(i)
+            return new_links
+
+        def checkpoint():
+            writer.flush()
+            dead_letters.flush()
+
+        async def checkpoint_if_due():
+            # the output is flushed in a thread, not on the event loop
+            if (journal is not None) and journal.checkpoint_due():
+                await journal.checkpoint_async()
+
+        validator_cache = open_validator_cache(self.url_path) if self.conditional else nullcontext()
+        async with create_async_session(limit=self.max_concurrent_tasks) as session:
+            with validator_cache as validators, open_link_index(self.url_path) as seen, JsonlWriter(self.url_path) as writer, DeadLetterWriter(dead_letter_path) as dead_letters:
+                if retry_failed or self.conditional or (self.early_stop is not None):
+                    journal_context = nullcontext()
+                else:
+                    journal_context = CrawlJournal(
+                        get_journal_path(self.url_path, "link"),
+                        run=self.journal_run(),
+                        on_checkpoint=checkpoint,
+                        auto_checkpoint=False
+                    )
+                with journal_context as journal:
+                    if retry_failed:
+                        pages = list(enumerate(load_dead_letters(dead_letter_path)))
+                    elif journal is None:
+                        pages = list(enumerate(self.pages_lst))[start_page:]
+                    else:
+                        start = journal.low_water if journal.resumed else start_page
+                        pages = [(i, self.pages_lst[i]) for i in range(start, self.length) if not journal.is_finished(i)]
+
+                    early_stop = self.early_stop if not retry_failed else None
+                    with tqdm(total=len(pages), desc="Crawling urls") as pbar:
+                        if early_stop is None:
+                            # pages complete in any order, the journal keeps track of those in flight
+                            if journal is not None:
+                                for i, _ in pages:
+                                    journal.start(i)
+                            for task in asyncio.as_completed([scan(i, page) for i, page in pages]):
+                                i, page, link_list = await task
+                                pbar.update(1)
+                                save(i, page, link_list)
+                                await checkpoint_if_due()
+                        else:
+                            known_pages = 0
+                            for w in range(0, len(pages), early_stop):
+                                window = pages[w:w + early_stop]
+                                if journal is not None:
+                                    for i, _ in window:
+                                        journal.start(i)
+                                # results are taken in page order to count consecutive pages
+                                for i, page, link_list in await asyncio.gather(*[scan(i, page) for i, page in window]):
+                                    pbar.update(1)
+                                    new_links = save(i, page, link_list)
+                                    if new_links is not None:
+                                        known_pages = 0 if new_links else known_pages + 1
+                                await checkpoint_if_due()
+                                if known_pages >= early_stop:
+                                    logger.info("No new link in the last {} pages, stop scanning at {}.".format(known_pages, window[-1][1]))
+                                    break
+                    if journal is not None:
+                        journal.finish()
+        compact_dead_letters(dead_letter_path, done)
 
 
 if __name__ == "__main__":
@@ -3,8 +3,9 @@ import asyncio
 from collections import defaultdict
 from ..async_crawl_content import AsyncCrawl
 from ..crawl_content import Crawl
-from ..crawl_link import Scan, Scroll, OnePage, Click
+from ..crawl_link import Scan, Scroll, OnePage, Click, Sitemap, Feed
 from ..async_crawl_link import AsyncScan
+from ..utils import parse_pages
 
 
 def crawl_content_command_parser(subparsers=None):
@@ -98,7 +99,7 @@ def crawl_link_command_parser(subparsers=None):
 
     This function creates an argument parser for the Musubi crawl-link command,
     which is used to crawl href links from websites using different strategies
-    (scan, scroll, onepage, or click). It supports multiple crawling patterns
+    (scan, scroll, onepage, click, sitemap, or feed). It supports multiple crawling patterns
     and configurations.
 
     Args:
@@ -113,17 +114,19 @@ def crawl_link_command_parser(subparsers=None):
         parser = subparsers.add_parser("crawl-link")
     else:
         parser = argparse.ArgumentParser("Musubi crawl-link command")
-    parser.add_argument("--type", default="scan", help="way of crawling websites", type=str, choices=["scan", "scroll", "onepage", "click"], required=True)
+    parser.add_argument("--type", default="scan", help="way of crawling websites", type=str, choices=["scan", "scroll", "onepage", "click", "sitemap", "feed"], required=True)
     parser.add_argument("--url_path", type=str, default=None, help="Path of json file to save crawled href links.", required=True)
     parser.add_argument("--prefix", default=None, help="prefix of url", type=str, required=True)
     parser.add_argument("--suffix", default=None, help="suffix of url", type=str, required=True)
     parser.add_argument("--root_path", default=None, help="root path of root website", type=str)
-    parser.add_argument("--pages", default=None, help="pages of websites", type=int)
+    parser.add_argument("--pages", default=None, help="pages of websites, or `auto` to find them for scan", type=parse_pages)
     parser.add_argument("--page_init_val", default=1, help="Initial value of pages", type=int)
     parser.add_argument("--multiplier", default=1, help="Multiplier of pages", type=int)
-    parser.add_argument("--block1", default=None, help="main list of tag and class", type=list, required=True)
+    parser.add_argument("--block1", default=None, help="main list of tag and class", type=list)
     parser.add_argument("--block2", default=None, help="sub list of tag and class", type=list)
     parser.add_argument("--async_", default=False, help="asynchronous crawling or not", type=bool)
+    parser.add_argument("--url_pattern", default=None, help="regular expression the links of the sitemaps or the feed should match", type=str)
+    parser.add_argument("--since", default=None, help="ISO date, only sitemap entries modified after it are kept", type=str)
     
     if subparsers is not None:
         parser.set_defaults(func=crawl_link_command)
@@ -133,32 +136,34 @@ def crawl_link_command_parser(subparsers=None):
 def crawl_link_command(args):
     """Execute the crawl-link command to extract links from websites.
 
-    This function crawls href links from websites using one of four strategies:
-    ``scan``, ``scroll``, ``onepage``, or ``click``. Each strategy uses a
+    This function crawls href links from websites using one of six strategies:
+    ``scan``, ``scroll``, ``onepage``, ``click``, ``sitemap``, or ``feed``. Each strategy uses a
     different approach to navigate and extract links from web pages.
 
     Args:
         args (argparse.Namespace): An argparse.Namespace object containing the
             following attributes:
 
-            - **type** (str): Crawling strategy to use. Must be one of ``"scan"``, ``"scroll"``, ``"onepage"``, or ``"click"``.
+            - **type** (str): Crawling strategy to use. Must be one of ``"scan"``, ``"scroll"``, ``"onepage"``, ``"click"``, ``"sitemap"``, or ``"feed"``.
             - **url_path** (str): Path to save the crawled href links as JSON.
             - **prefix** (str): URL prefix for constructing target URLs.
             - **suffix** (str): URL suffix for constructing target URLs.
             - **root_path** (str, optional): Root path of the target website.
-            - **pages** (int, optional): Number of pages to crawl.
+            - **pages** (int or str, optional): Number of pages to crawl, or ``auto`` to find it by probing the listing pages (``scan`` only).
             - **page_init_val** (int, optional): Initial page number value. Defaults to 1.
             - **multiplier** (int, optional): Multiplier for page number calculation. Defaults to 1.
-            - **block1** (list): Main list of HTML tag and class selectors for finding links.
+            - **block1** (list): Main list of HTML tag and class selectors for finding links. Not used by ``sitemap`` and ``feed``.
             - **block2** (list, optional): Secondary list of HTML tag and class selectors.
             - **async_** (bool, optional): Whether to use asynchronous crawling (only supported for ``scan`` type). Defaults to ``False``.
+            - **url_pattern** (str, optional): Regular expression the links found in the sitemaps or the feed should match.
+            - **since** (str, optional): ISO date; only sitemap entries modified after it are kept.
 
     Returns:
         None: This function performs crawling operations and returns nothing.
 
     Raises:
         ValueError: If the ``type`` argument is not one of the valid choices
-            (``scan``, ``scroll``, ``onepage``, ``click``).
+            (``scan``, ``scroll``, ``onepage``, ``click``, ``sitemap``, ``feed``).
 
     Notes:
 
@@ -166,6 +171,8 @@ def crawl_link_command(args):
         - **Scroll**: Crawls pages that load content dynamically when scrolling.
         - **OnePage**: Extracts links from a single page.
         - **Click**: Navigates by clicking elements to discover links.
+        - **Sitemap**: Reads the sitemaps listed in the robots.txt of the website.
+        - **Feed**: Reads the entries of an RSS or Atom feed.
     
     """
     args_dict = defaultdict(lambda: None)
@@ -178,9 +185,11 @@ def crawl_link_command(args):
     args_dict["block1"] = args.block1
     args_dict["block2"] = args.block2
     args_dict["url_path"] = args.url_path
+    args_dict["url_pattern"] = args.url_pattern
+    args_dict["since"] = args.since
     
-    if args.type not in ["scan", "scroll", "onepage", "click"]:
-        raise ValueError("The type can only be scan, scroll, onepage, or click but got {}.".format(args.type))
+    if args.type not in ["scan", "scroll", "onepage", "click", "sitemap", "feed"]:
+        raise ValueError("The type can only be scan, scroll, onepage, click, sitemap, or feed but got {}.".format(args.type))
     elif args.type == "scan":
         if args.async_:
             scan = AsyncScan(**args_dict)
@@ -196,4 +205,10 @@ def crawl_link_command(args):
         onepage.crawl_link()
     elif args.type == "click":
         click = Click(**args_dict)
-        click.crawl_link()
\ No newline at end of file
+        click.crawl_link()
+    elif args.type == "sitemap":
+        sitemap = Sitemap(**args_dict)
+        sitemap.crawl_link()
+    elif args.type == "feed":
+        feed = Feed(**args_dict)
+        feed.crawl_link()
\ No newline at end of file
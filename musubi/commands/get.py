@@ -1,6 +1,6 @@
 import argparse
 from loguru import logger
-from trafilatura import fetch_url, extract
+from ..utils import get_session, extract_html
 from ..agent.actions import analyze_website, get_container
 
 
@@ -20,10 +20,11 @@ def get_content(url):
     Note:
         - Uses favor_precision=True for more accurate content extraction
         - Returns content in markdown format for better readability
-        - Relies on fetch_url() and extract() helper functions
+        - Downloads through the shared HTTP session and extracts with extract_html()
     """
-    downloaded = fetch_url(url)
-    result = extract(downloaded, favor_precision=True, output_format="markdown")
+    response = get_session().get(url)
+    downloaded = response.content if response.status_code == 200 else None
+    result = extract_html(downloaded)
     return result
 
 
@@ -1,5 +1,6 @@
 import argparse
 from ..pipeline import Pipeline
+from ..utils import parse_pages
 
 
 def pipeline_command_parser(subparsers=None):
@@ -38,18 +39,23 @@ def pipeline_command_parser(subparsers=None):
     parser.add_argument("--prefix", default=None, help="prefix of url", type=str, required=True)
     parser.add_argument("--suffix", default=None, help="suffix of url", type=str)
     parser.add_argument("--root_path", default=None, help="root path of root website", type=str)
-    parser.add_argument("--pages", default=None, help="pages of websites", type=int, required=True)
+    parser.add_argument("--pages", default=None, help="pages of websites or `auto` to find them for scan, not needed for sitemap and feed", type=parse_pages)
     parser.add_argument("--page_init_val", default=1, help="Initial value of pages", type=int)
     parser.add_argument("--multiplier", default=1, help="Multiplier of pages", type=int)
-    parser.add_argument("--block1", default=None, help="main list of tag and class", type=list, required=True)
+    parser.add_argument("--block1", default=None, help="main list of tag and class, not needed for sitemap and feed", type=list)
     parser.add_argument("--block2", default=None, help="sub list of tag and class", type=list)
     parser.add_argument("--img_txt_block", default=None, help="main list of tag and class for crawling image-text pair", type=list)
-    parser.add_argument("--implementation", default=None, help="way of crawling websites", type=str, choices=["scan", "scroll", "onepage", "click"], required=True)
+    parser.add_argument("--implementation", default=None, help="way of crawling websites", type=str, choices=["scan", "scroll", "onepage", "click", "sitemap", "feed"], required=True)
     parser.add_argument("--async_", default=True, help="asynchronous crawling or not", type=bool, required=True)
     parser.add_argument("--start_page", default=1, help="From which page to start crawling urls. 0 is first page, 1 is second page, and so forth.", type=int)
     parser.add_argument("--sleep_time", default=1, help="Sleep time to prevent ban from website.", type=int)
     parser.add_argument("--save_dir", default=None, help="Folder to save link.json and articles.", type=str)
     parser.add_argument("--update", default=True, help="Update or not during updating mode.", type=bool)
+    parser.add_argument("--rate_limit", default=None, help="Maximum number of requests per second sent to the website.", type=float)
+    parser.add_argument("--burst", default=None, help="Number of requests allowed at once after an idle period.", type=int)
+    parser.add_argument("--url_pattern", default=None, help="Regular expression the links of the sitemaps or the feed should match.", type=str)
+    parser.add_argument("--since", default=None, help="ISO date, only sitemap entries modified after it are crawled.", type=str)
+    parser.add_argument("--feed", default=None, help="RSS / Atom feed polled instead of the listing pages in update mode.", type=str)
     if subparsers is not None:
         parser.set_defaults(func=pipeline_command)
     return parser
@@ -75,19 +81,20 @@ def pipeline_command(args):
             - **prefix** (str): URL prefix for constructing target URLs.
             - **suffix** (str, optional): URL suffix for constructing target URLs.
             - **root_path** (str, optional): Root path of the target website.
-            - **pages** (int): Total number of pages to crawl.
+            - **pages** (int or str): Total number of pages to crawl, or ``auto`` to find it
+                by probing the listing pages (``scan`` only). Not needed for ``sitemap`` and ``feed``.
             - **page_init_val** (int, optional): Initial page number value.
                 Defaults to 1.
             - **multiplier** (int, optional): Multiplier for page number
                 calculation. Defaults to 1.
             - **block1** (list): Main list of HTML tag and class selectors for
-                link extraction.
+                link extraction. Not needed for ``sitemap`` and ``feed``.
             - **block2** (list, optional): Secondary list of HTML tag and class
                 selectors.
             - **img_txt_block** (list, optional): List of tag and class selectors
                 for crawling image-text pairs.
             - **implementation** (str): Crawling strategy to use. Must be one of
-                ``"scan"``, ``"scroll"``, ``"onepage"``, or ``"click"``.
+                ``"scan"``, ``"scroll"``, ``"onepage"``, ``"click"``, ``"sitemap"``, or ``"feed"``.
             - **async_** (bool, optional): Whether to use asynchronous crawling.
             - **start_page** (int, optional): Starting page index for crawling
                 (0-based). Defaults to 1.
@@ -97,6 +104,16 @@ def pipeline_command(args):
                 extracted articles.
             - **update** (bool, optional): Whether to update existing content.
                 Defaults to ``True``.
+            - **rate_limit** (float, optional): Maximum number of requests per
+                second sent to the website.
+            - **burst** (int, optional): Number of requests allowed at once after
+                an idle period.
+            - **url_pattern** (str, optional): Regular expression the links found
+                in the sitemaps or the feed should match.
+            - **since** (str, optional): ISO date; only sitemap entries modified
+                after it are crawled.
+            - **feed** (str, optional): RSS / Atom feed of the website, polled
+                instead of the listing pages in update mode.
 
     Returns:
         None: This function executes the pipeline and returns nothing.
@@ -105,7 +122,7 @@ def pipeline_command(args):
 
         - The pipeline performs link crawling followed by content extraction.
         - Supports multiple crawling implementations (``scan``, ``scroll``,
-            ``onepage``, ``click``).
+            ``onepage``, ``click``, ``sitemap``, ``feed``).
         - Can operate in update mode to refresh existing content.
         - Sleep time helps avoid rate limiting or IP bans.
         - Output includes ``link.json`` and individual article files.
@@ -131,5 +148,10 @@ def pipeline_command(args):
         start_page=args.start_page,
         sleep_time=args.sleep_time,
         save_dir=args.save_dir,
-        update=args.update
+        update=args.update,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        url_pattern=args.url_pattern,
+        since=args.since,
+        feed=args.feed
         )
\ No newline at end of file
@@ -1,50 +1,92 @@
-import os
-import requests
-from bs4 import BeautifulSoup
-import pymupdf
-import pymupdf4llm
-import io
-from trafilatura import fetch_url, extract
-import orjson
+from collections import deque
+from typing import Optional
+from contextlib import nullcontext
 from tqdm import tqdm
 import pandas as pd
 import time
+from loguru import logger
+from .utils import (
+    open_content_index,
+    get_extractor,
+    create_extraction_pool,
+    open_content_writer,
+    is_empty_output,
+    fetch_page,
+    extract_image_text_pairs,
+    FetchError,
+    DeadLetterWriter,
+    get_dead_letter_path,
+    load_dead_letters,
+    compact_dead_letters,
+    open_near_dup_index,
+    CrawlJournal,
+    get_journal_path,
+    iter_jsonl,
+    open_raw_cache,
+    reextract_contents,
+    open_warc_writer,
+    replay_warc_contents,
+    fetch_document,
+    convert_pdf,
+    submit_pdf,
+    DEFAULT_MAX_PDF_BYTES,
+    DEFAULT_PDF_PAGES_PER_TASK,
+    DEFAULT_MAX_SHARD_BYTES
+)
+
+
+def _archive(url, response, data, cache=None, warc=None, kind="html"):
+    # PDFs are handed over as temporary files, which are streamed into the
+    # archives instead of being read back into memory
+    if warc is not None:
+        write_response = warc.write_response_file if kind == "pdf" else warc.write_response
+        write_response(
+            url,
+            response.status_code,
+            response.reason,
+            response.headers,
+            data,
+            request_headers=response.request.headers
+        )
+    if (cache is not None) and data and (response.status_code == 200):
+        if kind == "pdf":
+            cache.put_file(url, data, kind=kind)
+        else:
+            cache.put(url, data, kind=kind)
 
 
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/120.0.0.0 Safari/537.36"
-}
+def download(url, cache=None, warc=None, max_pdf_bytes=DEFAULT_MAX_PDF_BYTES):
+    """Download a document and return its kind ('html', 'pdf', 'text', ...) with its data.
 
+    The kind is sniffed from the ``Content-Type`` and the first bytes of the
+    response. PDFs are streamed into a temporary file, whose path is returned
+    instead of the raw bytes, and skipped if they are larger than max_pdf_bytes.
+    Unsupported binaries are skipped before their body is downloaded, and
+    ``(None, None)`` is returned. If a raw cache or a WARC writer is given, the
+    downloaded document is stored in it as well. Transient failures are retried,
+    and ``FetchError`` is raised once retries are exhausted.
+    """
+    response, kind, data = fetch_document(url, max_pdf_bytes=max_pdf_bytes)
+    if (data is not None) and ((cache is not None) or (warc is not None)):
+        _archive(url, response, data, cache=cache, warc=warc, kind=kind)
+    return kind, data
 
 
-def get_content(url):
-    if url.endswith(".pdf"):
-        request = requests.get(url, headers=headers)
-        filestream = io.BytesIO(request.content)
-        with pymupdf.open(stream=filestream, filetype="pdf") as doc:
-            result = pymupdf4llm.to_markdown(doc)
-    else:
-        downloaded = fetch_url(url)
-        result = extract(downloaded, favor_precision=True, output_format="markdown")
-    return result
+def get_content(url, cache=None, warc=None, max_pdf_bytes=DEFAULT_MAX_PDF_BYTES):
+    kind, downloaded = download(url, cache=cache, warc=warc, max_pdf_bytes=max_pdf_bytes)
+    if not downloaded:
+        return None
+    if kind == "pdf":
+        return convert_pdf(downloaded)
+    return get_extractor(kind)(downloaded)
 
 
 def get_image_text_pair(
     url: str = None,
     img_txt_block: list = None
 ):
-    request = requests.get(url, headers=headers)
-    content = request.text
-    soup = BeautifulSoup(content, "html.parser")
-    soup = soup.find(img_txt_block[0], class_=img_txt_block[1])
-    img_list = []
-    for img_tag in soup.find_all("img"):
-        img_url = img_tag.get("src")
-        description = img_tag.get("alt")
-        img_list.append({"img_url": img_url, "caption": description, "url": url})
-    return img_list
+    request = fetch_page(url)
+    return extract_image_text_pairs(request.text, url, img_txt_block)
 
 
 class Crawl():
@@ -58,14 +100,66 @@ class Crawl():
         url_path (str): Path to the JSON file containing URLs to crawl.
         crawl_type (str, optional): Type of crawling operation. Should be one of 
             'text' or 'img-text'. Defaults to 'text'.
+        extract_workers (int, optional): If set, run trafilatura and pymupdf4llm
+            in a process pool with this many workers while the next pages are
+            being downloaded. Defaults to None, extracting in the current process.
+        max_tasks_per_child (int, optional): Number of documents an extraction
+            worker handles before being replaced. Defaults to None.
+        raw_cache_dir (str, optional): Folder of a ``RawCache`` keeping the raw
+            downloaded documents, so that contents can be re-extracted later
+            without fetching them again. Defaults to None, disabling the cache.
+        raw_cache_max_bytes (int, optional): Maximum compressed size of the raw
+            cache, least recently used documents are evicted beyond it.
+            Defaults to None, meaning unlimited.
+        warc_dir (str, optional): Folder where requests and responses are archived
+            as rotating gzip WARC segments. Defaults to None, disabling the archive.
+        warc_max_bytes (int, optional): Size in bytes after which a new WARC
+            segment is started. Defaults to 1 GiB.
+        max_pdf_bytes (int, optional): PDFs larger than this are skipped without
+            being fully downloaded. None means unlimited. Defaults to 100 MiB.
+        pdf_pages_per_task (int, optional): Number of PDF pages converted by one
+            task of the extraction pool, so that long PDFs are converted on several
+            cores. Defaults to 16.
+        near_dup_db (str, optional): Path of a ``NearDuplicateIndex`` database,
+            which can be shared by several websites. Contents which are near
+            duplicates of an indexed document are saved with a None content and
+            the URL of the original under ``duplicate_of``. Defaults to None,
+            disabling near-duplicate detection.
+        output_format (str, optional): 'jsonl' to save contents into a single
+            JSONL file, or 'jsonl.zst' / 'parquet' to save them into a folder of
+            compressed shards, see ``ShardedWriter``. Defaults to 'jsonl'.
+        max_shard_bytes (int, optional): Compressed size of a shard. Defaults to
+            64 MiB.
     """
     def __init__(
         self,
         url_path: str,
-        crawl_type: str = "text"
+        crawl_type: str = "text",
+        extract_workers: Optional[int] = None,
+        max_tasks_per_child: Optional[int] = None,
+        raw_cache_dir: Optional[str] = None,
+        raw_cache_max_bytes: Optional[int] = None,
+        warc_dir: Optional[str] = None,
+        warc_max_bytes: int = 1024 ** 3,
+        max_pdf_bytes: Optional[int] = DEFAULT_MAX_PDF_BYTES,
+        pdf_pages_per_task: int = DEFAULT_PDF_PAGES_PER_TASK,
+        near_dup_db: Optional[str] = None,
+        output_format: str = "jsonl",
+        max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES
     ):
         self.url_path = url_path
         self.crawl_type = crawl_type     
+        self.extract_workers = extract_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.raw_cache_dir = raw_cache_dir
+        self.raw_cache_max_bytes = raw_cache_max_bytes
+        self.warc_dir = warc_dir
+        self.warc_max_bytes = warc_max_bytes
+        self.max_pdf_bytes = max_pdf_bytes
+        self.pdf_pages_per_task = pdf_pages_per_task
+        self.near_dup_db = near_dup_db
+        self.output_format = output_format
+        self.max_shard_bytes = max_shard_bytes
 
     def check_content_result(
         self,
@@ -97,72 +191,217 @@ class Crawl():
         start_idx: int = 0, 
         save_path: str = None,
         sleep_time: int = None,
-        img_txt_block: list = None
+        img_txt_block: list = None,
+        re_extract: bool = False,
+        replay_warc: bool = False,
+        retry_failed: bool = False
         ):
         """Crawl and save content from all websites in url_path.
 
         This method iterates through all URLs in the url_path file, extracts
         content based on the crawl_type, and saves results to a JSONL file.
-        It supports resuming from a specific index and skips already crawled URLs.
+        It supports resuming from a specific index and skips already crawled URLs
+        by looking them up in the seen-URL index stored next to url_path. URLs
+        whose download still fails after retries are recorded in a dead-letter
+        file next to save_path instead of being written.
 
         Args:
-            start_idx (int, optional): Index to start crawling from. Useful for
-                resuming interrupted crawls. Defaults to 0.
+            start_idx (int, optional): Index to start crawling from. Ignored when
+                an interrupted run is resumed from its journal. Defaults to 0.
             save_path (str, optional): Path to save the crawled content as JSONL.
                 Defaults to None.
             sleep_time (int, optional): Number of seconds to sleep between requests
-                to avoid rate limiting. Defaults to None.
+                on top of the per-host rate limit. Defaults to None.
             img_txt_block (list, optional): List of CSS selectors or identifiers
                 for image-text blocks. Only used when crawl_type is 'img-text'.
                 Defaults to None.
+            re_extract (bool, optional): If True, regenerate save_path from the
+                documents in the raw cache instead of crawling, without any network
+                access. Requires raw_cache_dir. Defaults to False.
+            replay_warc (bool, optional): If True, regenerate save_path from the
+                responses archived in warc_dir instead of crawling, without any
+                network access. Defaults to False.
+            retry_failed (bool, optional): If True, only crawl the URLs recorded in
+                the dead-letter file of save_path by previous crawls. URLs fetched
+                successfully are removed from it. Defaults to False.
 
         Returns:
             None: Results are saved to the file specified by save_path.
 
         Raises:
             Exception: If the saved content file is empty after crawling.
+            ValueError: If re_extract or replay_warc is True but no raw cache or
+                WARC folder is configured.
 
         Note:
             - For 'text' crawl_type, each URL produces one entry with 'content' 
               and 'url' fields.
             - For 'img-text' crawl_type, each URL may produce multiple entries,
               one for each image-text pair found.
+            - Results are appended in batches by a single ``JsonlWriter``, or a
+              ``ShardedWriter`` for the 'jsonl.zst' and 'parquet' output formats,
+              in which case save_path is a folder.
+            - Dead letters are stored in ``*.failed.jsonl`` next to save_path.
+            - Progress is journaled in ``*.content.journal`` next to url_path. If
+              a run is interrupted, the next one seeks straight to where it stopped
+              instead of going through the whole link file; the journal is removed
+              once a run completes.
         """
-        save_file = os.path.isfile(save_path)
+        if re_extract or replay_warc:
+            self._reextract_contents(save_path, replay_warc=replay_warc)
+            return
+
+        dead_letter_path = get_dead_letter_path(save_path)
+        cache = open_raw_cache(self.raw_cache_dir, self.raw_cache_max_bytes) if self.crawl_type == "text" else None
+        warc = open_warc_writer(self.warc_dir, self.warc_max_bytes) if self.crawl_type == "text" else None
+        near_dup = open_near_dup_index(self.near_dup_db) if self.crawl_type == "text" else None
+        pool = None
+        pending = deque()
+        if (self.crawl_type == "text") and self.extract_workers:
+            pool = create_extraction_pool(self.extract_workers, self.max_tasks_per_child)
+
+        def write_content(result, link, key):
+            original = near_dup.add(link, result) if near_dup is not None else None
+            if original is not None:
+                writer.write({"content": None, "url": link, "duplicate_of": original})
+            else:
+                writer.write({"content": result, "url": link})
+            if result is not None:
+                # empty results are left out of sharded outputs, and retried next run
+                seen.add(link)
+            if journal is not None:
+                journal.complete(key)
+
+        def drain(max_pending):
+            while len(pending) > max_pending:
+                key, link, future = pending.popleft()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to extract content of {link}: {e}")
+                    result = None
+                write_content(result, link, key)
+
+        def checkpoint():
+            writer.flush()
+            dead_letters.flush()
+
+        # skip the content if it is in the file already
+        with open_content_index(self.url_path, save_path) as seen:
+            with self._open_writer(save_path) as writer, DeadLetterWriter(dead_letter_path) as dead_letters:
+                if retry_failed:
+                    journal_context = nullcontext()
+                else:
+                    journal_context = CrawlJournal(
+                        get_journal_path(self.url_path, "content"),
+                        source_path=self.url_path,
+                        on_checkpoint=checkpoint
+                    )
+                with journal_context as journal:
+                    if journal is None:
+                        links = ((None, link) for link in load_dead_letters(dead_letter_path))
+                    else:
+                        # resume right after the last finished link of an interrupted run
+                        links = iter_jsonl(
+                            self.url_path,
+                            key="link",
+                            start_idx=0 if journal.resumed else start_idx,
+                            start_offset=journal.low_water,
+                            offsets=True
+                        )
+                    try:
+                        for key, link in tqdm(links, desc="Crawling contents"):
+                            if (journal is not None) and journal.is_finished(key):
+                                continue
+                            if link in seen:
+                                continue
+
+                            try:
+                                if pool is not None:
+                                    # download here and let the pool extract while the next pages are fetched
+                                    kind, downloaded = download(link, cache=cache, warc=warc, max_pdf_bytes=self.max_pdf_bytes)
+                                    if (journal is not None) and downloaded:
+                                        # keep the low-water mark behind links whose extraction is pending
+                                        journal.start(key)
+                                    if not downloaded:
+                                        write_content(None, link, key)
+                                    elif kind == "pdf":
+                                        # long PDFs are split into page ranges converted by several workers
+                                        pending.append((key, link, submit_pdf(pool, downloaded, self.pdf_pages_per_task)))
+                                    else:
+                                        pending.append((key, link, pool.submit(get_extractor(kind), downloaded)))
+                                    drain(2 * self.extract_workers)
+                                elif self.crawl_type == "text":
+                                    result = get_content(url=link, cache=cache, warc=warc, max_pdf_bytes=self.max_pdf_bytes)
+                                    write_content(result, link, key)
+                                elif self.crawl_type == "img-text":
+                                    result = get_image_text_pair(url=link, img_txt_block=img_txt_block)
+                                    writer.write_many(result)
+                                    seen.add(link)
+                                    if journal is not None:
+                                        journal.complete(key)
+                            except FetchError as e:
+                                logger.error(str(e))
+                                dead_letters.add(link, e)
+                                if journal is not None:
+                                    journal.fail(key)
+
+                            if sleep_time is not None:
+                                time.sleep(sleep_time)
+                        drain(0)
+                        if journal is not None:
+                            journal.finish()
+                    finally:
+                        for _, _, future in pending:
+                            future.cancel()
+                        if pool is not None:
+                            pool.shutdown(cancel_futures=True)
+                        if cache is not None:
+                            cache.close()
+                        if warc is not None:
+                            warc.close()
+                        if near_dup is not None:
+                            near_dup.close()
+            # drop the dead letters which have been fetched since
+            compact_dead_letters(dead_letter_path, seen)
+
+        if is_empty_output(save_path):
+            raise Exception("Wrong contents in saved content file.")
 
-        # check the file exist or not
-        if save_file:
-            content_list = pd.read_json(save_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")["url"].to_list()
+    def _open_writer(self, save_path: str):
+        return open_content_writer(
+            save_path,
+            self.output_format,
+            self.max_shard_bytes,
+            skip_empty="content" if self.crawl_type == "text" else None
+        )
+
+    def _reextract_contents(self, save_path: str, replay_warc: bool = False):
+        if self.crawl_type != "text":
+            raise ValueError("Re-extraction only supports the `text` crawl type.")
+        if replay_warc:
+            if self.warc_dir is None:
+                raise ValueError("Argument `warc_dir` is required to replay contents.")
+            count = replay_warc_contents(
+                self.warc_dir,
+                save_path,
+                extract_workers=self.extract_workers,
+                max_tasks_per_child=self.max_tasks_per_child,
+                output_format=self.output_format
+            )
         else:
-            content_list = None
-
-        url_df = pd.read_json(self.url_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")
-        length = len(url_df)
-
-        
-        for i in tqdm(range(start_idx, length), desc="Crawling contents"):
-            link = url_df.iloc[i]["link"]
-            # skip the content if it is in the file already
-            if content_list and (link in content_list):
-                continue
-
-            if self.crawl_type == "text":
-                result = get_content(url=link)
-                dictt = {"content": result, "url": link}
-                with open(save_path, "ab") as file:
-                    file.write(orjson.dumps(dictt, option=orjson.OPT_NON_STR_KEYS) + b"\n")
-            elif self.crawl_type == "img-text":
-                result = get_image_text_pair(url=link, img_txt_block=img_txt_block)
-                for item in result:
-                    with open(save_path, "ab") as file:
-                        file.write(orjson.dumps(item, option=orjson.OPT_NON_STR_KEYS) + b"\n")
-
-            if sleep_time is not None:
-                time.sleep(sleep_time)
-
-        crawl_df = pd.read_json(save_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")
-        if (len(crawl_df) == 0):
-            raise Exception("Wrong contents in saved content file.")
+            if self.raw_cache_dir is None:
+                raise ValueError("Argument `raw_cache_dir` is required to re-extract contents.")
+            with open_raw_cache(self.raw_cache_dir, self.raw_cache_max_bytes) as cache:
+                count = reextract_contents(
+                    self.url_path,
+                    save_path,
+                    cache,
+                    extract_workers=self.extract_workers,
+                    max_tasks_per_child=self.max_tasks_per_child,
+                    output_format=self.output_format
+                )
+        logger.info(f"Re-extracted {count} contents into {save_path}.")
 
 
 if __name__ == "__main__":
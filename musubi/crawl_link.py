@@ -1,24 +1,43 @@
-import os
-import requests
 from abc import ABC, abstractmethod
-from selenium.webdriver import Edge
-from selenium.webdriver.edge.options import Options
 from selenium.webdriver.common.by import By
 from loguru import logger
-import pandas as pd
-from bs4 import BeautifulSoup
-from typing import List, Optional
-import orjson
+import re
+from typing import List, Optional, Union
+from datetime import datetime, timezone
+from contextlib import nullcontext
 import time
 from tqdm import tqdm
-from .utils import get_root_path
-
-
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/120.0.0.0 Safari/537.36"
-}
+from .utils import (
+    get_root_path,
+    open_link_index,
+    open_validator_cache,
+    fetch_page,
+    FetchError,
+    DeadLetterWriter,
+    get_dead_letter_path,
+    load_dead_letters,
+    compact_dead_letters,
+    CrawlJournal,
+    get_journal_path,
+    JsonlWriter,
+    BlockSelector,
+    find_sitemaps,
+    is_sitemap_url,
+    iter_sitemap_links,
+    parse_lastmod,
+    load_last_run,
+    save_last_run,
+    parse_feed,
+    find_feeds,
+    AUTO_PAGES,
+    get_page_url,
+    find_last_page,
+    block_css_selector,
+    collect_links,
+    collect_new_links,
+    BrowserPool,
+    get_browser_pool
+)
 
 
 class BaseCrawl(ABC):
@@ -34,6 +53,7 @@ class BaseCrawl(ABC):
         sleep_time: Optional[int] = None,
         page_init_val: Optional[int] = 1,
         multiplier: Optional[int] = 1,
+        conditional: Optional[bool] = False,
     ):
         self.prefix = prefix
         self.suffix = suffix
@@ -45,6 +65,7 @@ class BaseCrawl(ABC):
         self.sleep_time = sleep_time
         self.page_init_val = page_init_val
         self.multiplier = multiplier
+        self.conditional = conditional
 
     @abstractmethod
     def crawl_link(self):
@@ -69,7 +90,9 @@ class Scan(BaseCrawl):
         root_path (str, optional): The root domain path for constructing absolute
             URLs from relative links. Defaults to None.
         pages (int, optional): Number of pages to scan. If set to 1, only the
-            prefix URL is scanned. Defaults to None.
+            prefix URL is scanned. If 'auto', the number of pages is found by
+            probing the pages before the first scan (see ``resolve_pages``).
+            Defaults to None.
         block1 (list): List containing [tag_name, class_name] for the primary
             HTML block selector.
         block2 (list, optional): List containing [tag_name, class_name] for a
@@ -82,6 +105,13 @@ class Scan(BaseCrawl):
             Defaults to 1.
         multiplier (int, optional): Multiplier for page numbers in URL generation.
             Defaults to 1.
+        conditional (bool, optional): If True, listing pages are requested with the
+            validators (ETag / Last-Modified) stored by the previous crawl, and pages
+            answered with 304 Not Modified are skipped. Defaults to False.
+        early_stop (int, optional): Incremental mode. If set, the scan stops once
+            this many consecutive pages held no new link. Listings are newest
+            first, so in update mode the scan usually stops after the first pages.
+            Defaults to None, scanning every page.
         **kwargs: Additional keyword arguments passed to BaseCrawl.
 
     Note:
@@ -94,28 +124,78 @@ class Scan(BaseCrawl):
         prefix: str,
         suffix: Optional[str] = None,
         root_path: Optional[str] = None,
-        pages: Optional[int] = None,
+        pages: Optional[Union[int, str]] = None,
         block1: List[str] = None,
         block2: Optional[List[str]] = None,
         url_path: Optional[str] = None,
         sleep_time: Optional[int] = None,
         page_init_val: Optional[int] = 1,
         multiplier: Optional[int] = 1,
+        conditional: Optional[bool] = False,
+        early_stop: Optional[int] = None,
         **kwargs
     ):
-        super().__init__(prefix, suffix, root_path, pages, block1, block2, url_path, sleep_time, page_init_val, multiplier)
-        if pages == 1:
+        super().__init__(prefix, suffix, root_path, pages, block1, block2, url_path, sleep_time, page_init_val, multiplier, conditional)
+        if (early_stop is not None) and (early_stop < 1):
+            raise ValueError("Argument `early_stop` should be a positive number of pages but got {}.".format(early_stop))
+        self.early_stop = early_stop
+        self.selector = BlockSelector(self.block1, self.block2)
+        # with pages='auto', the pages are only listed once resolve_pages probed them
+        self.pages_lst = None
+        self.length = None
+        if self.pages != AUTO_PAGES:
+            self.resolve_pages()
+
+    def resolve_pages(self):
+        """List the pages to scan, finding their number first if pages is 'auto'.
+
+        Creating the crawler sends no request: with pages='auto', the pages are
+        probed by the first call, from ``crawl_link`` or ``check_link_result`` if
+        not called before, and later calls reuse the result.
+
+        Returns:
+            int: The number of pages.
+
+        Raises:
+            ValueError: If pages is 'auto' and the first page holds no link.
+            FetchError: If pages is 'auto' and a probe still fails after retries.
+        """
+        if self.pages_lst is not None:
+            return self.pages
+        if self.pages == AUTO_PAGES:
+            self.pages = self.find_pages()
+        if self.pages == 1:
             self.pages_lst = [self.prefix]
         else:
-            if suffix:
-                self.pages_lst = [self.prefix + str((self.page_init_val + i) * self.multiplier) + self.suffix for i in range(self.pages)]
-            else:
-                self.pages_lst = [self.prefix + str((self.page_init_val + i) * self.multiplier) for i in range(self.pages)]
-
+            self.pages_lst = [
+                get_page_url(self.prefix, i, self.suffix, self.page_init_val, self.multiplier) for i in range(self.pages)
+            ]
         self.length = len(self.pages_lst)
-        self.plural_a_tag = (self.block1[0] == "a") or (self.block2 and self.block2[0] == "a")
+        return self.pages
 
-    def get_urls(self, page):
+    def find_pages(self):
+        """Find the number of listing pages of the website with ``find_last_page``.
+
+        Returns:
+            int: The number of pages holding links in block1 (and block2).
+
+        Raises:
+            ValueError: If the first page holds no link.
+            FetchError: If a probe still fails after retries.
+        """
+        pages = find_last_page(
+            lambda i: get_page_url(self.prefix, i, self.suffix, self.page_init_val, self.multiplier),
+            self.selector
+        )
+        if pages == 0:
+            raise ValueError("No link found in the blocks of the first page of {}, please check block1 and block2.".format(self.prefix))
+        return pages
+
+    def journal_run(self):
+        """Return the settings identifying the pages of the link journal, see ``CrawlJournal``."""
+        return {"prefix": self.prefix, "pages": self.length, "conditional": bool(self.conditional)}
+
+    def get_urls(self, page, validators=None):
         """Extract URLs from a single page based on HTML block selectors.
 
         This method fetches a page, parses its HTML content, and extracts URLs
@@ -125,12 +205,16 @@ class Scan(BaseCrawl):
 
         Args:
             page (str): The URL of the page to scrape.
+            validators (ValidatorCache, optional): If given, the page is requested
+                conditionally and an empty list is returned when it has not changed.
+                Defaults to None.
 
         Returns:
             list: A list of extracted URLs (as strings) from the page.
 
         Raises:
             ValueError: If root_path is provided but does not contain 'http'.
+            FetchError: If the page still fails after retries.
 
         Note:
             - If block2 is specified, the method first finds elements matching
@@ -141,90 +225,118 @@ class Scan(BaseCrawl):
               the page URL.
         """
         link_list = []
-        r = requests.get(page, headers=headers)
-        soup = BeautifulSoup(r.text, features="html.parser")
-        if self.block2:
-            blocks = soup.find(self.block1[0], class_=self.block1[1])
-            blocks = blocks.find_all(self.block2[0], class_=self.block2[1])
-        else:
-            blocks = soup.find_all(self.block1[0], class_=self.block1[1])
-
-        for block in blocks:
+        r = fetch_page(page, validators)
+        if r.status_code == 304:
+            logger.info("{} is not modified since the last crawl, skip it.".format(page))
+            return link_list
+        for href in self.selector.links(r.text):
             if self.root_path:
-                if self.plural_a_tag:
-                    if "http" not in block["href"]:
-                        if "http" in self.root_path:
-                            if self.root_path[-1] == block["href"][0] == "/":
-                                self.root_path = self.root_path[:-1]
-                            elif (self.root_path[-1] != "/") and (block["href"][0] != "/"):
-                                self.root_path = self.root_path + "/"
-                        else:
-                            raise ValueError("Wrong value of root_path.")
-                        link = self.root_path + block["href"]
+                if "http" not in href:
+                    if "http" in self.root_path:
+                        if self.root_path[-1] == href[0] == "/":
+                            self.root_path = self.root_path[:-1]
+                        elif (self.root_path[-1] != "/") and (href[0] != "/"):
+                            self.root_path = self.root_path + "/"
                     else:
-                        link = block["href"]
+                        raise ValueError("Wrong value of root_path.")
+                    link = self.root_path + href
                 else:
-                    if "http" not in block.a["href"]:
-                        if "http" in self.root_path:
-                            if self.root_path[-1] == block.a["href"][0] == "/":
-                                self.root_path = self.root_path[:-1]
-                            elif (self.root_path[-1] != "/") and (block.a["href"][0] != "/"):
-                                self.root_path = self.root_path + "/"
-                        else:
-                            raise ValueError("Wrong value of root_path.")
-                        link = self.root_path + block.a["href"]
-                    else:
-                        link = block.a["href"]
+                    link = href
             else:
-                if self.plural_a_tag:
-                    if "http" in block["href"]:
-                        link = block["href"]
-                    else:
-                        root_path = get_root_path(page)
-                        if block["href"][0] == "/":
-                            link = root_path + block["href"]
-                        else:
-                            link = root_path + "/" + block["href"]
+                if "http" in href:
+                    link = href
                 else:
-                    if "http" in block.a["href"]:
-                        link = block.a["href"]
+                    root_path = get_root_path(page)
+                    if href[0] == "/":
+                        link = root_path + href
                     else:
-                        root_path = get_root_path(page)
-                        if block.a["href"][0] == "/":
-                            link = root_path + block.a["href"]
-                        else:
-                            link = root_path + "/" + block.a["href"]
+                        link = root_path + "/" + href
             link_list.append(link)
+
+        if (validators is not None) and (r.status_code == 200):
+            validators.update(page, r.headers)
         return link_list
     
-    def crawl_link(self, start_page: int=0):
-        """Check and print the first extracted URL from the first page.
+    def crawl_link(self, start_page: int=0, retry_failed: bool = False):
+        """Extract the URLs of every page in pages_lst and save the new ones to url_path.
 
-        This method extracts URLs from the first page in pages_lst and prints
-        the first URL to stdout. Useful for testing and verifying that the
-        URL extraction is working correctly.
+        Pages which still fail after retries are recorded in a dead-letter file
+        next to url_path (``*.failed.jsonl``) and skipped. Progress is journaled in
+        ``*.link.journal`` next to url_path, so that an interrupted crawl resumes
+        from the page where it stopped, as long as the prefix and the number of
+        pages did not change. With early_stop, the scan ends once that many
+        consecutive pages held only known links (failed pages are not counted
+        either way).
 
-        Returns:
-            None: Prints the first extracted URL to stdout.
+        Update runs (conditional or early_stop) are not journaled: new links are
+        on the first pages, so they always start from the newest one, and leave
+        the journal of an interrupted full crawl for the next full crawl.
+
+        Args:
+            start_page (int, optional): Index of the first page to scan. Ignored
+                when an interrupted crawl is resumed from its journal. Defaults to 0.
+            retry_failed (bool, optional): If True, only scan the pages recorded in
+                the dead-letter file by previous crawls. Pages scanned successfully
+                are removed from it. Defaults to False.
         """
-        is_url_path = os.path.isfile(self.url_path)
-        if is_url_path:
-            url_list = pd.read_json(self.url_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")["link"].to_list()
-        else:
-            url_list = None
+        if not retry_failed:
+            self.resolve_pages()
+        dead_letter_path = get_dead_letter_path(self.url_path)
+        done = set()
+
+        def checkpoint():
+            writer.flush()
+            dead_letters.flush()
+
+        validator_cache = open_validator_cache(self.url_path) if self.conditional else nullcontext()
+        with validator_cache as validators, open_link_index(self.url_path) as seen, JsonlWriter(self.url_path) as writer, DeadLetterWriter(dead_letter_path) as dead_letters:
+            if retry_failed or self.conditional or (self.early_stop is not None):
+                journal_context = nullcontext()
+            else:
+                journal_context = CrawlJournal(
+                    get_journal_path(self.url_path, "link"),
+                    run=self.journal_run(),
+                    on_checkpoint=checkpoint
+                )
+            with journal_context as journal:
+                if retry_failed:
+                    pages = list(enumerate(load_dead_letters(dead_letter_path)))
+                elif journal is None:
+                    pages = list(enumerate(self.pages_lst))[start_page:]
+                else:
+                    start = journal.low_water if journal.resumed else start_page
+                    pages = [(i, self.pages_lst[i]) for i in range(start, self.length) if not journal.is_finished(i)]
 
-        
-        for i in tqdm(range(start_page, self.length), desc="Crawling urls..."):
-            page = self.pages_lst[i]
-            link_list = self.get_urls(page=page)
-            for link in link_list:
-                if url_list and link in url_list:
-                    continue 
-                dictt = {"link": link}
-                with open(self.url_path, "ab") as file:
-                    file.write(orjson.dumps(dictt, option=orjson.OPT_NON_STR_KEYS) + b"\n")
+                known_pages = 0
+                for i, page in tqdm(pages, desc="Crawling urls..."):
+                    try:
+                        link_list = self.get_urls(page=page, validators=validators)
+                    except FetchError as e:
+                        logger.error(str(e))
+                        dead_letters.add(page, e)
+                        if journal is not None:
+                            journal.fail(i)
+                        continue
+                    done.add(page)
+                    new_links = 0
+                    for link in link_list:
+                        if not seen.add(link):
+                            continue 
+                        writer.write({"link": link})
+                        new_links += 1
+                    if journal is not None:
+                        journal.complete(i)
+                    if (self.early_stop is not None) and (not retry_failed):
+                        known_pages = 0 if new_links else known_pages + 1
+                        if known_pages >= self.early_stop:
+                            logger.info("No new link in the last {} pages, stop scanning at {}.".format(known_pages, page))
+                            break
+                if journal is not None:
+                    journal.finish()
+        compact_dead_letters(dead_letter_path, done)
 
     def check_link_result(self):
+        self.resolve_pages()
         page = self.pages_lst[0]
         link_list = self.get_urls(page=page)
         print(link_list[0])
@@ -251,15 +363,21 @@ class Scroll(BaseCrawl):
             with BaseCrawl. Defaults to None.
         url_path (str, optional): Path to save extracted URLs as JSONL.
             Defaults to None.
-        sleep_time (int, optional): Number of seconds to wait between scroll actions
-            to allow content to load. Defaults to 5.
+        sleep_time (int, optional): Maximum number of seconds to wait for new
+            blocks after each scroll action. Defaults to 5.
+        early_stop (int, optional): Incremental mode. If set, scrolling stops once
+            this many consecutive scroll actions loaded no new link. Defaults to
+            None.
+        browser_pool (BrowserPool, optional): Pool of the browsers. Defaults to
+            the shared one.
         **kwargs: Additional keyword arguments passed to BaseCrawl.
 
     Note:
-        - This class requires Microsoft Edge WebDriver to be installed.
-        - The browser runs in headless mode by default.
-        - Scrolling stops automatically if the page height doesn't change,
-          indicating no more content to load.
+        - The browser is borrowed from the shared ``BrowserPool`` (headless Edge by
+          default, see ``configure_browser_pool``) and given back after the crawl.
+        - Links are extracted after every scroll action, from the new blocks only.
+        - Scrolling stops automatically if no new block is loaded within
+          sleep_time, indicating no more content to load.
     """
     def __init__(
         self, 
@@ -271,132 +389,156 @@ class Scroll(BaseCrawl):
         block2: Optional[List[str]] = None,
         url_path: Optional[str] = None,
         sleep_time: Optional[int] = 5,
+        early_stop: Optional[int] = None,
+        browser_pool: Optional[BrowserPool] = None,
         **kwargs
     ):
         super().__init__(prefix, suffix, root_path, pages, block1, block2, url_path, sleep_time)
+        self.browser_pool = browser_pool if browser_pool is not None else get_browser_pool()
+        self.driver = None
+        if (early_stop is not None) and (early_stop < 1):
+            raise ValueError("Argument `early_stop` should be a positive number of scroll actions but got {}.".format(early_stop))
         self.scroll_time = pages
+        self.early_stop = early_stop
+        self.block_selector = block_css_selector(self.block1[0], self.block1[1])
 
     def browse_website(self):
-        """Initialize and navigate to the target website using Edge WebDriver.
-
-        This method creates a headless Edge browser instance with optimized
-        settings and navigates to the URL specified in prefix. It waits for
-        the initial page load before returning.
+        """Take a browser from the browser pool and navigate to the target website.
 
         Returns:
-            None: Sets self.driver with the initialized WebDriver instance.
+            None: Sets self.driver with the WebDriver instance, to be given back
+                with release_browser.
 
         Note:
-            - The browser runs in headless mode (no visible window).
-            - Window size is set to 1920x1080 for consistent rendering.
-            - GPU acceleration is disabled for better compatibility in headless mode.
-            - Waits for sleep_time seconds after loading the page.
+            - The browser starts from a blank page, without the cookies and
+              storage of the websites it visited before.
+            - The first blocks are waited for by ``iter_links``, not here.
         """
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920x1080")
-        self.driver = Edge(options=options)
-        self.driver.get(self.prefix)
-        time.sleep(self.sleep_time)
-
-    def scroll(
+        self.driver = self.browser_pool.acquire()
+        try:
+            self.driver.get(self.prefix)
+        except Exception:
+            self.release_browser()
+            raise
+
+    def release_browser(self):
+        """Give the browser taken by browse_website back to the browser pool."""
+        if self.driver is not None:
+            driver, self.driver = self.driver, None
+            self.browser_pool.release(driver)
+
+    def iter_links(
         self,
         scroll_time: int = None
     ):
-        """Scroll down the page multiple times to load dynamic content.
+        """Scroll down the page multiple times and yield the links as they are loaded.
 
-        This method simulates user scrolling by repeatedly scrolling to the bottom
-        of the page. It stops early if the page height stops increasing, indicating
-        no more content is loading.
+        The links of the first blocks of the page are yielded first, then those
+        of the new blocks after every scroll action. Instead of sleeping a fixed
+        time, every scroll action waits until the number of blocks changes, for at
+        most sleep_time seconds, and scrolling stops when it does not.
 
         Args:
             scroll_time (int, optional): Number of times to scroll down. If None,
                 uses self.scroll_time. Defaults to None.
 
-        Returns:
-            None: The page is scrolled and content is loaded in the WebDriver.
+        Yields:
+            list: Absolute URLs of the blocks loaded by the last scroll action.
 
         Note:
             - Each scroll action scrolls to the absolute bottom of the page.
-            - Waits sleep_time seconds between scrolls for content to load.
+            - Every block is read once, with a single script execution per poll
+              (see ``collect_new_links``).
             - A progress bar displays the scrolling progress.
-            - Automatically stops if page height remains unchanged, even if
-              scroll_time hasn't been reached.
         """
-        n = 0
         scroll_time = scroll_time if scroll_time is not None else self.scroll_time
-        
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
+        # wait for the first blocks, rendered after the page is loaded on some websites
+        links, count = collect_new_links(
+            self.driver,
+            self.block_selector,
+            root_path=self.root_path,
+            timeout=self.sleep_time
+        ) or ([], 0)
+        yield links
+
         with tqdm(total=scroll_time, desc="Scrolling") as pbar:
-            while n < scroll_time:
+            for _ in range(scroll_time):
                 self.driver.execute_script("window.scrollBy(0, document.body.scrollHeight);")
-                n += 1
-                time.sleep(self.sleep_time)
                 pbar.update(1)
-
-                new_height = self.driver.execute_script("return document.body.scrollHeight")
-                if new_height == last_height:
+                result = collect_new_links(
+                    self.driver,
+                    self.block_selector,
+                    start=count,
+                    root_path=self.root_path,
+                    timeout=self.sleep_time
+                )
+                if result is None:
+                    logger.info("No new block loaded within {} seconds, stop scrolling.".format(self.sleep_time))
                     break
-                last_height = new_height
+                links, count = result
+                yield links
+
+    def scroll(
+        self,
+        scroll_time: int = None
+    ):
+        """Scroll down the page multiple times to load dynamic content.
+
+        Args:
+            scroll_time (int, optional): Number of times to scroll down. If None,
+                uses self.scroll_time. Defaults to None.
+
+        Returns:
+            None: The page is scrolled and content is loaded in the WebDriver.
+
+        Note:
+            - See ``iter_links``, whose links are discarded.
+        """
+        for _ in self.iter_links(scroll_time):
+            pass
 
     def crawl_link(self):
         """Crawl and save URLs from the scrollable page.
 
-        This method opens the website, scrolls to load all content, extracts URLs
-        from elements matching the specified block selector, and saves them to a
-        JSONL file. Already extracted URLs are automatically skipped.
+        This method opens the website and scrolls to load the content. After
+        every scroll action, the URLs of the new elements matching the specified
+        block selector are extracted and saved to a JSONL file. Already extracted
+        URLs are automatically skipped.
 
         Returns:
             None: URLs are saved to the file specified by url_path.
 
         Note:
-            - Initializes the browser and performs full scrolling automatically.
-            - Handles both absolute and relative URLs, converting relative URLs
-              to absolute ones when necessary.
-            - If the target block is not an anchor tag, searches for anchor tags
-              within the block.
-            - Skips duplicate URLs if url_path already exists.
+            - Initializes the browser and scrolls automatically, see ``iter_links``.
+            - The links are read in the browser (see ``collect_new_links``),
+              already resolved to absolute URLs.
+            - If the target block is not an anchor tag, its first anchor tag is used.
+            - The links of each scroll action are flushed to url_path before the
+              next one, so that they are kept if the browser fails.
+            - Skips duplicate URLs if url_path already exists, and with early_stop,
+              stops once that many scroll actions in a row loaded only known URLs.
             - Each URL is saved as a JSON object with a 'link' field.
         """
-        is_url_path = os.path.isfile(self.url_path)
-        if is_url_path:
-            url_list = pd.read_json(self.url_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")["link"].to_list()
-        else:
-            url_list = None
         self.browse_website()
-        self.scroll()
-        elements = self.driver.find_elements(By.TAG_NAME, self.block1[0])
-
-        for item in elements:
-            class_ = item.get_attribute("class")
-            if (class_ == self.block1[1]):
-                if self.block1[0] != "a":
-                    a = item.find_element(By.TAG_NAME, "a")
-                    url = a.get_attribute("href")
-                else:
-                    url = item.get_attribute("href")
-                if self.root_path:
-                    if self.root_path[-1] == url[0] == "/":
-                        self.root_path = self.root_path[:-1]
-                    elif (self.root_path[-1] != "/") and (url[0] != "/"):
-                        self.root_path = self.root_path + "/"
-                    elif ("http" in self.root_path) and ("http" in url):
-                        self.root_path = ""
-                    url = self.root_path + url
-                else:
-                    if "http" not in url:
-                        root_path = get_root_path(self.prefix)
-                        if url[0] == "/":
-                            url = root_path + url
-                        else:
-                            url = root_path + "/" + url
-                if url_list and (url in url_list):
-                    continue 
-                dictt = {"link": url}
-
-                with open(self.url_path, "ab") as file:
-                    file.write(orjson.dumps(dictt, option=orjson.OPT_NON_STR_KEYS) + b"\n")
+        try:
+            with open_link_index(self.url_path) as seen, JsonlWriter(self.url_path) as writer:
+                known_scrolls = 0
+                for i, links in enumerate(self.iter_links()):
+                    new_links = 0
+                    for url in links:
+                        if not seen.add(url):
+                            continue 
+                        writer.write({"link": url})
+                        new_links += 1
+                    writer.flush()
+                    # the blocks present before the first scroll action are not counted
+                    if (self.early_stop is not None) and (i > 0):
+                        known_scrolls = 0 if new_links else known_scrolls + 1
+                        if known_scrolls >= self.early_stop:
+                            logger.info("No new link in the last {} scroll actions, stop scrolling.".format(known_scrolls))
+                            break
+        finally:
+            self.release_browser()
 
     def check_link_result(self):
         """Check and print extracted URLs from a single scroll action.
@@ -410,23 +552,15 @@ class Scroll(BaseCrawl):
 
         Note:
             - Only scrolls once (scroll_time=1) for quick testing.
-            - Finds all anchor tags within elements matching the block selector.
+            - Extracts the links of the blocks the same way as crawl_link.
             - Does not check for duplicates or save to file.
         """
         self.browse_website()
-        self.scroll(scroll_time = 1)
-        element = self.driver.find_element(By.CLASS_NAME, self.block1[1])
-        elements = element.find_elements(By.TAG_NAME, "a")
-
-        check_list = []
-
-        for item in elements:
-            url = item.get_attribute("href")
-            if self.root_path:
-                url = self.root_path + url
-            dictt = {"link": url}
-            check_list.append(dictt)
-        print(check_list)
+        try:
+            check_list = [{"link": url} for links in self.iter_links(scroll_time = 1) for url in links]
+            print(check_list)
+        finally:
+            self.release_browser()
 
 
 class OnePage(BaseCrawl):
@@ -452,6 +586,9 @@ class OnePage(BaseCrawl):
             Defaults to None.
         sleep_time (int, optional): Not used in this class but kept for
             compatibility with BaseCrawl. Defaults to None.
+        conditional (bool, optional): If True, the page is requested with the
+            validators (ETag / Last-Modified) stored by the previous crawl, and
+            skipped if it is answered with 304 Not Modified. Defaults to False.
         **kwargs: Additional keyword arguments passed to BaseCrawl.
 
     Note:
@@ -470,12 +607,13 @@ class OnePage(BaseCrawl):
         block2: Optional[List[str]] = None,
         url_path: Optional[str] = None,
         sleep_time: Optional[int] = None,
+        conditional: Optional[bool] = False,
         **kwargs
     ):
-        super().__init__(prefix, suffix, root_path, pages, block1, block2, url_path, sleep_time)
-        self.plural_a_tag = (self.block1[0] == "a") or (self.block2 and self.block2[0] == "a")
+        super().__init__(prefix, suffix, root_path, pages, block1, block2, url_path, sleep_time, conditional=conditional)
+        self.selector = BlockSelector(self.block1, self.block2)
 
-    def get_urls(self):
+    def get_urls(self, validators=None):
         """Extract all URLs from the page based on HTML block selectors.
 
         This method fetches the page specified in prefix, parses its HTML content,
@@ -483,6 +621,11 @@ class OnePage(BaseCrawl):
         It handles both absolute and relative URLs, converting relative URLs to
         absolute ones when necessary.
 
+        Args:
+            validators (ValidatorCache, optional): If given, the page is requested
+                conditionally and an empty list is returned when it has not changed.
+                Defaults to None.
+
         Returns:
             list: A list of extracted URLs (as strings) from the page.
 
@@ -498,62 +641,36 @@ class OnePage(BaseCrawl):
               the prefix URL.
         """
         link_list = []
-        r = requests.get(self.prefix, headers=headers)
-        soup = BeautifulSoup(r.text, features="html.parser")
-
-        if self.block2:
-            blocks = soup.find(self.block1[0], class_=self.block1[1])
-            blocks = blocks.find_all(self.block2[0], class_=self.block2[1])
-        else:
-            blocks = soup.find_all(self.block1[0], class_=self.block1[1])
-
-        for block in blocks:
+        r = fetch_page(self.prefix, validators)
+        if r.status_code == 304:
+            logger.info("{} is not modified since the last crawl, skip it.".format(self.prefix))
+            return link_list
+        for href in self.selector.links(r.text):
             if self.root_path:
-                if self.plural_a_tag:
-                    if "http" not in block["href"]:
-                        if "http" in self.root_path:
-                            if self.root_path[-1] == block["href"][0] == "/":
-                                self.root_path = self.root_path[:-1]
-                            elif (self.root_path[-1] != "/") and (block["href"][0] != "/"):
-                                self.root_path = self.root_path + "/"
-                        else:
-                            raise ValueError("Wrong value of root_path.")
-                        link = self.root_path + block["href"]
+                if "http" not in href:
+                    if "http" in self.root_path:
+                        if self.root_path[-1] == href[0] == "/":
+                            self.root_path = self.root_path[:-1]
+                        elif (self.root_path[-1] != "/") and (href[0] != "/"):
+                            self.root_path = self.root_path + "/"
                     else:
-                        link = block["href"]
+                        raise ValueError("Wrong value of root_path.")
+                    link = self.root_path + href
                 else:
-                    if "http" not in block.a["href"]:
-                        if "http" in self.root_path:
-                            if self.root_path[-1] == block.a["href"][0] == "/":
-                                self.root_path = self.root_path[:-1]
-                            elif (self.root_path[-1] != "/") and (block.a["href"][0] != "/"):
-                                self.root_path = self.root_path + "/"
-                        else:
-                            raise ValueError("Wrong value of root_path.")
-                        link = self.root_path + block.a["href"]
-                    else:
-                        link = block.a["href"]
+                    link = href
             else:
-                if self.plural_a_tag:
-                    if "http" in block["href"]:
-                        link = block["href"]
-                    else:
-                        root_path = get_root_path(self.prefix)
-                        if block["href"][0] == "/":
-                            link = root_path + block["href"]
-                        else:
-                            link = root_path + "/" + block["href"]
+                if "http" in href:
+                    link = href
                 else:
-                    if "http" in block.a["href"]:
-                        link = block.a["href"]
+                    root_path = get_root_path(self.prefix)
+                    if href[0] == "/":
+                        link = root_path + href
                     else:
-                        root_path = get_root_path(self.prefix)
-                        if block.a["href"][0] == "/":
-                            link = root_path + block.a["href"]
-                        else:
-                            link = root_path + "/" + block.a["href"]
+                        link = root_path + "/" + href
             link_list.append(link)
 
+        if (validators is not None) and (r.status_code == 200):
+            validators.update(self.prefix, r.headers)
         return link_list
     
     def crawl_link(self):
@@ -573,19 +690,13 @@ class OnePage(BaseCrawl):
             - Unlike Scan class, this method does not iterate through multiple
               pages or show a progress bar.
         """
-        is_url_path = os.path.isfile(self.url_path)
-        if is_url_path:
-            url_list = pd.read_json(self.url_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")["link"].to_list()
-        else:
-            url_list = None
-
-        link_list = self.get_urls()
-        for link in link_list:
-            if url_list and link in url_list:
-                continue 
-            dictt = {"link": link}
-            with open(self.url_path, "ab") as file:
-                file.write(orjson.dumps(dictt, option=orjson.OPT_NON_STR_KEYS) + b"\n")
+        validator_cache = open_validator_cache(self.url_path) if self.conditional else nullcontext()
+        with validator_cache as validators, open_link_index(self.url_path) as seen, JsonlWriter(self.url_path) as writer:
+            link_list = self.get_urls(validators=validators)
+            for link in link_list:
+                if not seen.add(link):
+                    continue 
+                writer.write({"link": link})
 
     def check_link_result(self):
         """Check and print all extracted URLs from the page.
@@ -629,11 +740,13 @@ class Click(BaseCrawl):
             Defaults to None.
         sleep_time (int, optional): Number of seconds to wait after each click
             to allow content to load. Defaults to 5.
+        browser_pool (BrowserPool, optional): Pool of the browsers. Defaults to
+            the shared one.
         **kwargs: Additional keyword arguments passed to BaseCrawl.
 
     Note:
-        - This class requires Microsoft Edge WebDriver to be installed.
-        - The browser runs in headless mode by default.
+        - The browser is borrowed from the shared ``BrowserPool`` (headless Edge by
+          default, see ``configure_browser_pool``) and given back after the crawl.
         - block2 must be specified to identify the clickable button element.
         - The method attempts JavaScript click first, then falls back to standard
           click if that fails.
@@ -648,37 +761,44 @@ class Click(BaseCrawl):
         block2: Optional[List[str]] = None,
         url_path: Optional[str] = None,
         sleep_time: Optional[int] = 5,
+        browser_pool: Optional[BrowserPool] = None,
         **kwargs
     ):
         super().__init__(prefix, suffix, root_path, pages, block1, block2, url_path, sleep_time)
+        self.browser_pool = browser_pool if browser_pool is not None else get_browser_pool()
+        self.driver = None
         self.click_time = pages
+        # blocks are matched by class only, as with By.CLASS_NAME
+        self.block_selector = block_css_selector(None, self.block1[1], exact=False)
 
     def browse_website(self):
-        """Initialize and navigate to the target website using Edge WebDriver.
-
-        This method creates a headless Edge browser instance with optimized
-        settings and navigates to the URL specified in prefix. It waits for
-        the initial page load before returning.
+        """Take a browser from the browser pool and navigate to the target website.
 
         Returns:
-            None: Sets self.driver with the initialized WebDriver instance.
+            None: Sets self.driver with the WebDriver instance, to be given back
+                with release_browser.
 
         Note:
-            - The browser runs in headless mode (no visible window).
-            - Window size is set to 1920x1080 for consistent rendering.
-            - GPU acceleration is disabled for better compatibility in headless mode.
+            - The browser starts from a blank page, without the cookies and
+              storage of the websites it visited before.
             - Waits for sleep_time seconds after loading the page if sleep_time
               is specified.
         """
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920x1080")
-        self.driver = Edge(options=options)
-        self.driver.get(self.prefix)
+        self.driver = self.browser_pool.acquire()
+        try:
+            self.driver.get(self.prefix)
+        except Exception:
+            self.release_browser()
+            raise
         if self.sleep_time:
             time.sleep(self.sleep_time)
 
+    def release_browser(self):
+        """Give the browser taken by browse_website back to the browser pool."""
+        if self.driver is not None:
+            driver, self.driver = self.driver, None
+            self.browser_pool.release(driver)
+
     def crawl_link(
         self,
         click_time: int = None,
@@ -696,74 +816,47 @@ class Click(BaseCrawl):
 
         Returns:
             None: URLs are saved to the file specified by url_path, and the
-                WebDriver is closed after completion.
+                WebDriver is given back to the browser pool after completion.
 
         Note:
             - After each click, extracts URLs from all currently visible elements
-              matching block1.
+              matching block1, with a single script execution (see ``collect_links``).
             - Uses JavaScript click (execute_script) as primary method, with
               standard click as fallback.
             - If clicking fails (button disabled, disappeared, or limit reached),
               logs a warning and continues to the next iteration.
             - Waits sleep_time seconds after each click for content to load.
             - A progress bar displays the clicking progress.
-            - Automatically closes the browser driver when finished.
-            - Handles both absolute and relative URLs, converting relative URLs
-              to absolute ones when necessary.
+            - Automatically gives the browser back to the pool when finished.
+            - Links are resolved to absolute URLs in the browser.
         """
         self.browse_website()
-        n = 0
-        click_time = click_time if click_time is not None else self.click_time
-
-        is_url_path = os.path.isfile(self.url_path)
-        if is_url_path:
-            url_list = pd.read_json(self.url_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")["link"].to_list()
-        else:
-            url_list = None
-
-        with tqdm(total=click_time, desc="Clicking") as pbar:
-            while n < click_time:
-                elements = self.driver.find_elements(By.CLASS_NAME, self.block1[1])
-
-                for item in elements:
-                    item = item.find_element(By.TAG_NAME, "a")
-                    url = item.get_attribute("href")
-                    if self.root_path:
-                        if self.root_path[-1] == url[0] == "/":
-                            self.root_path = self.root_path[:-1]
-                        elif (self.root_path[-1] != "/") and (url[0] != "/"):
-                            self.root_path = self.root_path + "/"
-                        elif ("http" in self.root_path) and ("http" in url):
-                            self.root_path = ""
-                        url = self.root_path + url
-                    else:
-                        if "http" not in url:
-                            root_path = get_root_path(self.prefix)
-                            if url[0] == "/":
-                                url = root_path + url
-                            else:
-                                url = root_path + "/" + url
-                    if url_list and (url in url_list):
-                        continue 
-                    dictt = {"link": url}
-
-                    with open(self.url_path, "ab") as file:
-                        file.write(orjson.dumps(dictt, option=orjson.OPT_NON_STR_KEYS) + b"\n")
-
-                button = self.driver.find_element(By.CLASS_NAME, self.block2[1])
-                try:
-                    self.driver.execute_script("arguments[0].click();", button)
-                except:
-                    try:
-                        button.click()
-                    except:
-                        logger.warning("Reach click limit or finish clicking.")
-                n += 1
-                if self.sleep_time:
-                    time.sleep(self.sleep_time)
-                pbar.update(1)
-
-        self.driver.quit()
+        try:
+            n = 0
+            click_time = click_time if click_time is not None else self.click_time
+
+            with open_link_index(self.url_path) as seen, JsonlWriter(self.url_path) as writer:
+                with tqdm(total=click_time, desc="Clicking") as pbar:
+                    while n < click_time:
+                        for url in collect_links(self.driver, self.block_selector, self.root_path):
+                            if not seen.add(url):
+                                continue 
+                            writer.write({"link": url})
+
+                        button = self.driver.find_element(By.CLASS_NAME, self.block2[1])
+                        try:
+                            self.driver.execute_script("arguments[0].click();", button)
+                        except:
+                            try:
+                                button.click()
+                            except:
+                                logger.warning("Reach click limit or finish clicking.")
+                        n += 1
+                        if self.sleep_time:
+                            time.sleep(self.sleep_time)
+                        pbar.update(1)
+        finally:
+            self.release_browser()
 
     def check_link_result(
         self,
@@ -794,36 +887,284 @@ class Click(BaseCrawl):
         """
         link_list = []
         self.browse_website()
-        n = 0
-        click_time = click_time if click_time is not None else self.click_time
-
-        with tqdm(total=click_time, desc="Clicking") as pbar:
-            while n < click_time:
-                elements = self.driver.find_elements(By.CLASS_NAME, self.block1[1])
-
-                for item in elements:
-                    item = item.find_element(By.TAG_NAME, "a")
-                    url = item.get_attribute("href")
-                    if self.root_path:
-                        if self.root_path[-1] == url[0] == "/":
-                            self.root_path = self.root_path[:-1]
-                        elif (self.root_path[-1] != "/") and (url[0] != "/"):
-                            self.root_path = self.root_path + "/"
-                        elif ("http" in self.root_path) and ("http" in url):
-                            self.root_path = ""
-                        url = self.root_path + url
-                    link_list.append(url)
-
-                button = self.driver.find_element(By.CLASS_NAME, self.block2[1])
-                try:
-                    self.driver.execute_script("arguments[0].click();", button)
-                except:
+        try:
+            n = 0
+            click_time = click_time if click_time is not None else self.click_time
+
+            with tqdm(total=click_time, desc="Clicking") as pbar:
+                while n < click_time:
+                    link_list.extend(collect_links(self.driver, self.block_selector, self.root_path))
+
+                    button = self.driver.find_element(By.CLASS_NAME, self.block2[1])
                     try:
-                        button.click()
+                        self.driver.execute_script("arguments[0].click();", button)
                     except:
-                        logger.warning("Reach click limit or finish clicking.")
-                n += 1
-                if self.sleep_time:
-                    time.sleep(self.sleep_time)
-                pbar.update(1)
-        print(link_list)
\ No newline at end of file
+                        try:
+                            button.click()
+                        except:
+                            logger.warning("Reach click limit or finish clicking.")
+                    n += 1
+                    if self.sleep_time:
+                        time.sleep(self.sleep_time)
+                    pbar.update(1)
+            print(link_list)
+        finally:
+            self.release_browser()
+
+
+class Sitemap(BaseCrawl):
+    """A link crawler reading the sitemaps of a website instead of its listing pages.
+
+    The sitemaps are found in the ``robots.txt`` of the website, or given directly
+    as prefix. Sitemap indexes are followed, gzip and plain text sitemaps are
+    supported, and every sitemap is stream-parsed so that memory stays bounded
+    whatever its size. No HTML is parsed, so links are found at the speed the
+    sitemaps are downloaded.
+
+    Args:
+        prefix (str): URL of the website, whose robots.txt lists the sitemaps, or
+            URL of a sitemap (``.xml``, ``.xml.gz`` or ``.txt``).
+        suffix (str, optional): Not used in this class but kept for compatibility
+            with BaseCrawl. Defaults to None.
+        root_path (str, optional): Not used in this class, since sitemaps hold
+            absolute URLs. Defaults to None.
+        pages (int, optional): Not used in this class. Defaults to None.
+        block1 (list, optional): Not used in this class. Defaults to None.
+        block2 (list, optional): Not used in this class. Defaults to None.
+        url_path (str, optional): Path to save extracted URLs as JSONL.
+            Defaults to None.
+        sleep_time (int, optional): Not used in this class, requests go through
+            the per-host rate limiter. Defaults to None.
+        conditional (bool, optional): Update mode. If True, only pages whose
+            ``lastmod`` is newer than the start of the last complete crawl are kept,
+            child sitemaps which are older are not downloaded, and the others are
+            requested with the validators of the previous crawl. Defaults to False.
+        url_pattern (str, optional): Regular expression the page URLs should match,
+            e.g. ``/news/``. Defaults to None.
+        since (str, optional): ISO date; only pages whose lastmod is newer are kept.
+            Defaults to None.
+        **kwargs: Additional keyword arguments passed to BaseCrawl.
+
+    Note:
+        - Pages without lastmod are always kept; already crawled links are skipped
+          by the seen-URL index as usual.
+        - The start time of every crawl in which all sitemaps could be read is
+          saved in ``*.sitemap.json`` next to url_path.
+
+    Example:
+        ::
+
+            sitemap = Sitemap(
+                prefix="https://example.com",
+                url_path="crawler/example/example_link.json",
+                url_pattern=r"/news/[0-9]+"
+            )
+            sitemap.crawl_link()
+    """
+    def __init__(
+        self,
+        prefix: str,
+        suffix: Optional[str] = None,
+        root_path: Optional[str] = None,
+        pages: Optional[int] = None,
+        block1: Optional[List[str]] = None,
+        block2: Optional[List[str]] = None,
+        url_path: Optional[str] = None,
+        sleep_time: Optional[int] = None,
+        conditional: Optional[bool] = False,
+        url_pattern: Optional[str] = None,
+        since: Optional[str] = None,
+        **kwargs
+    ):
+        super().__init__(prefix, suffix, root_path, pages, block1, block2, url_path, sleep_time, conditional=conditional)
+        self.url_pattern = url_pattern
+        self.since = parse_lastmod(since) if since else None
+        if since and (self.since is None):
+            raise ValueError("Invalid value `{}` of since, it should be an ISO date.".format(since))
+
+    def get_sitemaps(self):
+        """Return the URLs of the sitemaps to read."""
+        if is_sitemap_url(self.prefix):
+            return [self.prefix]
+        return find_sitemaps(self.prefix)
+
+    def get_urls(self, since: Optional[datetime] = None, validators=None, on_error=None, on_done=None):
+        """Stream the page URLs of the sitemaps, see ``iter_sitemap_links``.
+
+        Args:
+            since (datetime, optional): Only pages modified after it are kept,
+                in addition to the since of the crawler. Defaults to None.
+            validators (ValidatorCache, optional): Validators of the child
+                sitemaps. Defaults to None.
+            on_error (Callable, optional): Called with ``(url, error)`` when a
+                sitemap fails. If None, the error is raised. Defaults to None.
+            on_done (Callable, optional): Called with the URL of every sitemap
+                read successfully. Defaults to None.
+
+        Yields:
+            str: URLs of the pages.
+        """
+        if (self.since is not None) and ((since is None) or (self.since > since)):
+            since = self.since
+        yield from iter_sitemap_links(
+            self.get_sitemaps(),
+            url_pattern=self.url_pattern,
+            since=since,
+            validators=validators,
+            on_error=on_error,
+            on_done=on_done
+        )
+
+    def crawl_link(self, retry_failed: bool = False):
+        """Read the sitemaps and save the new page URLs to url_path.
+
+        Sitemaps which still fail after retries are recorded in a dead-letter file
+        next to url_path (``*.failed.jsonl``) and skipped. The start time of the
+        crawl is only saved if no sitemap failed, so that the pages of a failed
+        sitemap are not filtered out by the next update.
+
+        Args:
+            retry_failed (bool, optional): If True, only read the sitemaps recorded
+                in the dead-letter file by previous crawls. Defaults to False.
+        """
+        started = datetime.now(timezone.utc)
+        dead_letter_path = get_dead_letter_path(self.url_path)
+        since = load_last_run(self.url_path) if self.conditional else None
+        done = set()
+        failed = []
+
+        def on_error(url, error):
+            logger.error(str(error))
+            dead_letters.add(url, error)
+            failed.append(url)
+
+        validator_cache = open_validator_cache(self.url_path) if self.conditional else nullcontext()
+        with validator_cache as validators, open_link_index(self.url_path) as seen, JsonlWriter(self.url_path) as writer, DeadLetterWriter(dead_letter_path) as dead_letters:
+            if retry_failed:
+                urls = iter_sitemap_links(
+                    load_dead_letters(dead_letter_path),
+                    url_pattern=self.url_pattern,
+                    since=self.since,
+                    on_error=on_error,
+                    on_done=done.add
+                )
+            else:
+                urls = self.get_urls(since=since, validators=validators, on_error=on_error, on_done=done.add)
+            for link in tqdm(urls, desc="Crawling urls..."):
+                if not seen.add(link):
+                    continue
+                writer.write({"link": link})
+        compact_dead_letters(dead_letter_path, done)
+        if (not failed) and (not retry_failed):
+            save_last_run(self.url_path, started)
+
+    def check_link_result(self):
+        """Print the first page URL found in the sitemaps."""
+        for link in self.get_urls():
+            print(link)
+            break
+
+
+class Feed(BaseCrawl):
+    """A link crawler polling the RSS or Atom feed of a website.
+
+    A feed lists the latest entries of a website in a single small document, so
+    an update costs one request, or none at all when the feed is answered with
+    304 Not Modified, instead of scanning several listing pages. Only entries
+    which are not in the link file yet are saved.
+
+    Args:
+        prefix (str): URL of the RSS or Atom feed. If it is the HTML page of the
+            website instead, the first feed advertised by the page with
+            ``<link rel="alternate">`` is read.
+        suffix (str, optional): Not used in this class but kept for compatibility
+            with BaseCrawl. Defaults to None.
+        root_path (str, optional): Not used in this class. Defaults to None.
+        pages (int, optional): Not used in this class. Defaults to None.
+        block1 (list, optional): Not used in this class. Defaults to None.
+        block2 (list, optional): Not used in this class. Defaults to None.
+        url_path (str, optional): Path to save extracted URLs as JSONL.
+            Defaults to None.
+        sleep_time (int, optional): Not used in this class. Defaults to None.
+        conditional (bool, optional): If True, the feed is requested with the
+            validators (ETag / Last-Modified) stored by the previous poll, and
+            nothing is done if it has not changed. Defaults to False.
+        url_pattern (str, optional): Regular expression the entry links should
+            match. Defaults to None.
+        **kwargs: Additional keyword arguments passed to BaseCrawl.
+
+    Note:
+        - A feed only holds the latest entries, so use another implementation
+          (or the `feed` field of a website config, read in update mode only) to
+          collect the archive of a website.
+    """
+    def __init__(
+        self,
+        prefix: str,
+        suffix: Optional[str] = None,
+        root_path: Optional[str] = None,
+        pages: Optional[int] = None,
+        block1: Optional[List[str]] = None,
+        block2: Optional[List[str]] = None,
+        url_path: Optional[str] = None,
+        sleep_time: Optional[int] = None,
+        conditional: Optional[bool] = False,
+        url_pattern: Optional[str] = None,
+        **kwargs
+    ):
+        super().__init__(prefix, suffix, root_path, pages, block1, block2, url_path, sleep_time, conditional=conditional)
+        self.url_pattern = re.compile(url_pattern) if url_pattern else None
+
+    def get_urls(self, validators=None):
+        """Fetch the feed and return the links of its entries.
+
+        Args:
+            validators (ValidatorCache, optional): If given, the feed is requested
+                conditionally and an empty list is returned when it has not changed.
+                Defaults to None.
+
+        Returns:
+            list: The entry links, newest first as listed by the feed.
+
+        Raises:
+            ValueError: If prefix is neither a feed nor a page advertising one.
+        """
+        url = self.prefix
+        r = fetch_page(url, validators)
+        if r.status_code == 304:
+            logger.info("{} is not modified since the last crawl, skip it.".format(url))
+            return []
+        link_list = parse_feed(r.content, url)
+        if link_list is None:
+            feeds = find_feeds(r.content, url)
+            if not feeds:
+                raise ValueError("{} is neither an RSS / Atom feed nor a page advertising one.".format(url))
+            url = feeds[0]
+            logger.info("Reading feed {} advertised by {}, set it as prefix to save a request.".format(url, self.prefix))
+            r = fetch_page(url, validators)
+            if r.status_code == 304:
+                logger.info("{} is not modified since the last crawl, skip it.".format(url))
+                return []
+            link_list = parse_feed(r.content, url) or []
+
+        if self.url_pattern is not None:
+            link_list = [link for link in link_list if self.url_pattern.search(link)]
+        if (validators is not None) and (r.status_code == 200):
+            validators.update(url, r.headers)
+        return link_list
+
+    def crawl_link(self):
+        """Poll the feed and save the links of its new entries to url_path."""
+        validator_cache = open_validator_cache(self.url_path) if self.conditional else nullcontext()
+        with validator_cache as validators, open_link_index(self.url_path) as seen, JsonlWriter(self.url_path) as writer:
+            new = 0
+            for link in self.get_urls(validators=validators):
+                if not seen.add(link):
+                    continue
+                writer.write({"link": link})
+                new += 1
+        logger.info("Found {} new entries in the feed of {}.".format(new, self.prefix))
+
+    def check_link_result(self):
+        """Print the entry links of the feed."""
+        print(self.get_urls())
@@ -2,20 +2,27 @@ import asyncio
 import pandas as pd
 from pathlib import Path
 from collections import defaultdict
-from typing import List, Optional
+from typing import List, Optional, Union
 import sys
 import os
 from loguru import logger
-from .crawl_link import Scan, Scroll, OnePage, Click
+from .crawl_link import Scan, Scroll, OnePage, Click, Sitemap, Feed
 from .crawl_content import Crawl
 from .async_crawl_link import AsyncScan
 from .async_crawl_content import AsyncCrawl
 from .utils import (
     add_new_website, 
+    update_website_config,
     delete_website_config_by_idx, 
     deduplicate_by_value, 
     get_root_path,
-    filter_null_data
+    filter_null_data,
+    get_output_path,
+    rate_limiter,
+    configure_html_parser,
+    configure_browser_pool,
+    AUTO_PAGES,
+    DEFAULT_MAX_SHARD_BYTES
 )
 
 
@@ -31,12 +38,72 @@ class Pipeline:
             websites.json or imgtxt_webs.json.
         log_path (`str`, *optional*):
             path of log file, default to None.
+        extract_workers (`int`, *optional*):
+            Number of processes used to extract text contents. If None, extraction runs
+            in the crawling process.
+        max_tasks_per_child (`int`, *optional*):
+            Number of documents an extraction process handles before being replaced.
+        raw_cache_dir (`str`, *optional*):
+            Folder of the raw document cache shared by all websites. If None, raw documents
+            are not kept and contents cannot be re-extracted without crawling again.
+        raw_cache_max_bytes (`int`, *optional*):
+            Maximum compressed size of the raw document cache.
+        warc_dir (`str`, *optional*):
+            Folder where the responses of text crawls are archived as WARC segments, one
+            subfolder per website. If None, no WARC is written.
+        near_dup_db (`str`, *optional*):
+            Path of the near-duplicate index shared by all websites, so that articles
+            syndicated across websites are kept once. If None, near duplicates are kept.
+        output_format (`str`, *optional*):
+            Format of the crawled contents: 'jsonl' for one JSONL file per website, or
+            'jsonl.zst' / 'parquet' for one folder of size-capped compressed shards per
+            website, which are neither reread nor rewritten in full on every run.
+        max_shard_bytes (`int`, *optional*):
+            Compressed size of a shard of the 'jsonl.zst' and 'parquet' formats.
+        probe_images (`bool`, *optional*):
+            Whether asynchronous image-text crawls probe every image for its size in bytes,
+            format and dimensions.
+        html_parser (`str`, *optional*):
+            Parser extracting links and images from the blocks of the pages: 'lxml',
+            'selectolax' or 'html.parser'. If None, the default set with
+            `configure_html_parser` ('lxml') is kept.
+        browser (`str`, *optional*):
+            Headless browser of the `scroll` and `click` implementations: 'edge', 'chrome' or
+            'firefox'. If None, the browser set with `configure_browser_pool` ('edge') is kept.
+        browser_pool_size (`int`, *optional*):
+            Maximum number of browsers running at the same time. If None, the size set with
+            `configure_browser_pool` (2) is kept.
     """
     def __init__(
         self, 
         website_config_path: str = None,
-        log_path: Optional[str] = None
+        log_path: Optional[str] = None,
+        extract_workers: Optional[int] = None,
+        max_tasks_per_child: Optional[int] = None,
+        raw_cache_dir: Optional[str] = None,
+        raw_cache_max_bytes: Optional[int] = None,
+        warc_dir: Optional[str] = None,
+        near_dup_db: Optional[str] = None,
+        output_format: str = "jsonl",
+        max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES,
+        probe_images: bool = False,
+        html_parser: Optional[str] = None,
+        browser: Optional[str] = None,
+        browser_pool_size: Optional[int] = None
     ):
+        self.extract_workers = extract_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.raw_cache_dir = raw_cache_dir
+        self.raw_cache_max_bytes = raw_cache_max_bytes
+        self.warc_dir = warc_dir
+        self.near_dup_db = near_dup_db
+        self.output_format = output_format
+        self.max_shard_bytes = max_shard_bytes
+        self.probe_images = probe_images
+        if html_parser is not None:
+            configure_html_parser(html_parser)
+        if (browser is not None) or (browser_pool_size is not None):
+            configure_browser_pool(size=browser_pool_size, browser=browser)
         if not website_config_path:
             config_dir = Path("config")
             config_dir.mkdir(parents=True, exist_ok=True)
@@ -54,6 +121,7 @@ class Pipeline:
         update_pages: Optional[int] = None,
         sleep_time: Optional[int] = None,
         save_dir: Optional[str] = None,
+        early_stop: Optional[int] = None
     ):
         """
         Crawl articles of website specified by idx in websites.json or imgtxt_webs.json.
@@ -62,14 +130,24 @@ class Pipeline:
             idx (`int`, *optional*):
                 Which website in websites.json or imgtxt_webs.json to crawl.
             start_page (`int`, *optional*):
-                From which page to start crawling urls.
+                From which page to start crawling urls. Ignored if an interrupted run of this website is resumed:
+                both the link and the content stages journal their progress next to the link file, and a restarted
+                run picks up exactly where the last one stopped.
             update_pages (`int`, *optional*):
                 How many pages to crawl in update mode. If not None, fuction will switch to update mode and crawl specified number of pages.
                 If None, function will switch into add mode and crawl all pages of websites.
+                In update mode, listing pages are requested with conditional GET and skipped if unchanged, and
+                websites whose config has a `feed` only poll that feed instead of their listing pages.
             sleep_time (`int`, *optional*):
-                Sleep time to prevent ban from website.
+                Sleep time to prevent ban from website. Only used if the website has no `rate_limit`
+                in website config, in which case it is converted into a limit of one request every
+                `sleep_time` seconds.
             save_dir (`str`, *optional*):
                 Folder to save link.json and articles.
+            early_stop (`int`, *optional*):
+                Only used in update mode by the `scan` and `scroll` implementations. If set, the scan stops
+                once this many consecutive listing pages held no new link, instead of always crawling
+                `update_pages` pages, and the scroll once this many scroll actions loaded no new link.
         """
         self.args_dict = defaultdict(lambda: None)
         self.website_df = pd.read_json(self.website_config_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")
@@ -82,13 +160,28 @@ class Pipeline:
             self.args_dict["suffix"] = self.website_df.iloc[idx]["suffix"]
         if not self.is_nan.iloc[idx]["root_path"]:
             self.args_dict["root_path"] = self.website_df.iloc[idx]["root_path"]
-        self.args_dict["pages"] = self.website_df.iloc[idx]["pages"]
+        # sitemap configs have no pages
+        if not self.is_nan.iloc[idx]["pages"]:
+            self.args_dict["pages"] = self.website_df.iloc[idx]["pages"]
+        # neither have `auto` configs, until the first crawl has found them
+        if ("auto_pages" in self.website_df.columns) and (not self.is_nan.iloc[idx]["auto_pages"]):
+            self.auto_pages = bool(self.website_df.iloc[idx]["auto_pages"])
+        else:
+            self.auto_pages = False
         self.args_dict["page_init_val"] = self.website_df.iloc[idx]["page_init_val"]
         self.args_dict["multiplier"] = self.website_df.iloc[idx]["multiplier"]
         if not self.is_nan.iloc[idx]["block1"]:
             self.args_dict["block1"] = self.website_df.iloc[idx]["block1"]
         if not self.is_nan.iloc[idx]["block2"].all():
             self.args_dict["block2"] = self.website_df.iloc[idx]["block2"]
+        for key in ["url_pattern", "since"]:
+            if (key in self.website_df.columns) and (not self.is_nan.iloc[idx][key]):
+                self.args_dict[key] = self.website_df.iloc[idx][key]
+        # feed of a website crawled with another implementation, polled in update mode
+        if ("feed" in self.website_df.columns) and (not self.is_nan.iloc[idx]["feed"]):
+            self.feed = self.website_df.iloc[idx]["feed"]
+        else:
+            self.feed = None
 
         self.dir_ = self.website_df.iloc[idx]["dir_"]
         self.class_ = self.website_df.iloc[idx]["class_"]
@@ -99,11 +192,13 @@ class Pipeline:
 
         if save_dir is not None:
             self.save_dir = Path(save_dir) / "data" / self.class_ / self.dir_
-            self.save_path = Path(self.save_dir) / "{}.json".format(self.name)
         else:
             self.save_dir = Path("data") / self.class_ / self.dir_
-            self.save_path = Path(self.save_dir) / "{}.json".format(self.name)
+        # image-text pairs are small and kept as JSONL
+        output_format = self.output_format if self.img_txt_block is None else "jsonl"
+        self.save_path = get_output_path(self.save_dir, self.name, output_format)
 
+        # sharded outputs never hold null contents, so only JSONL files are filtered
         if os.path.isfile(self.save_path):
             filter_null_data(self.save_path)
 
@@ -123,13 +218,41 @@ class Pipeline:
                 url_path = Path(self.urls_dir) / "{}_link.json".format(self.name)
         self.args_dict["url_path"] = url_path
         self.implementation = self.website_df.iloc[idx]["implementation"]
-        self.async_ = self.website_df.iloc[idx]["async_"]
+        # image-text configs written before `async_` was saved for them lack the column
+        if ("async_" in self.website_df.columns) and (not self.is_nan.iloc[idx]["async_"]):
+            self.async_ = bool(self.website_df.iloc[idx]["async_"])
+        else:
+            self.async_ = False
+
+        # politeness is enforced by the per-host rate limiter shared by all fetchers
+        rate_limit = None
+        burst = 1
+        if ("rate_limit" in self.website_df.columns) and (not self.is_nan.iloc[idx]["rate_limit"]):
+            rate_limit = float(self.website_df.iloc[idx]["rate_limit"])
+            if ("burst" in self.website_df.columns) and (not self.is_nan.iloc[idx]["burst"]):
+                burst = int(self.website_df.iloc[idx]["burst"])
+        elif sleep_time:
+            rate_limit = 1 / sleep_time
+        if rate_limit is not None:
+            rate_limiter.configure(self.args_dict["prefix"], rate=rate_limit, burst=burst)
+            if self.args_dict["root_path"] is not None:
+                rate_limiter.configure(self.args_dict["root_path"], rate=rate_limit, burst=burst)
 
         if update_pages:
-            self.args_dict["pages"] = self.args_dict["pages"] if self.args_dict["pages"] <= update_pages else update_pages
+            if self.args_dict["pages"] is not None:
+                self.args_dict["pages"] = self.args_dict["pages"] if self.args_dict["pages"] <= update_pages else update_pages
+            elif self.auto_pages:
+                # the recent pages are enough to update, no need to probe the whole archive
+                self.args_dict["pages"] = update_pages
             indices = self.website_df["idx"].to_list()
             if idx not in indices:
                 raise ValueError("In update mode but assigned index does not exist in website.json file.")
+            # skip listing pages which are not modified since the last crawl, and sitemap
+            # entries which are not modified since the last run
+            self.args_dict["conditional"] = True
+            self.args_dict["early_stop"] = early_stop
+        elif self.auto_pages and (self.args_dict["pages"] is None):
+            self.args_dict["pages"] = AUTO_PAGES
         
         urls_folder_path = Path(self.urls_dir)
         urls_folder_path.mkdir(parents=True, exist_ok=True)
@@ -138,14 +261,30 @@ class Pipeline:
 
         # start scanning the links
         logger.info("Getting urls from {}!".format(self.name))
-        if self.implementation not in ["scan", "scroll", "onepage", "click"]:
-            raise ValueError("The implementation can only be `scan`, `scroll`, `onepage`, or `click` but got `{}`.".format(self.implementation))
+        if self.implementation not in ["scan", "scroll", "onepage", "click", "sitemap", "feed"]:
+            raise ValueError("The implementation can only be `scan`, `scroll`, `onepage`, `click`, `sitemap`, or `feed` but got `{}`.".format(self.implementation))
+        elif update_pages and (self.feed is not None):
+            # a conditional request to the feed replaces the listing pages
+            feed = Feed(
+                self.feed,
+                url_path=self.args_dict["url_path"],
+                conditional=True,
+                url_pattern=self.args_dict["url_pattern"]
+            )
+            feed.crawl_link()
         elif self.implementation == "scan":
+            scan = AsyncScan(**self.args_dict) if self.async_ else Scan(**self.args_dict)
+            if self.args_dict["pages"] == AUTO_PAGES:
+                # probed before the crawl, so that later runs reuse the number of pages
+                # found even if this one is interrupted
+                update_website_config(
+                    int(self.website_df.iloc[idx]["idx"]),
+                    {"pages": scan.resolve_pages()},
+                    website_config_path=self.website_config_path
+                )
             if self.async_:
-                scan = AsyncScan(**self.args_dict)
-                asyncio.run(scan.crawl_link())
+                asyncio.run(scan.crawl_link(start_page=start_page))
             else:
-                scan = Scan(**self.args_dict)
                 scan.crawl_link(start_page=start_page)
         elif self.implementation == "scroll":
             scroll = Scroll(**self.args_dict)
@@ -156,27 +295,67 @@ class Pipeline:
         elif self.implementation == "click":
             click = Click(**self.args_dict)
             click.crawl_link()
+        elif self.implementation == "sitemap":
+            sitemap = Sitemap(**self.args_dict)
+            sitemap.crawl_link()
+        elif self.implementation == "feed":
+            feed = Feed(**self.args_dict)
+            feed.crawl_link()
 
         deduplicate_by_value(self.args_dict["url_path"], key="link")
         
         # Start crawling the websites
         logger.info("Crawling contents in urls from {}!".format(self.name))
         if self.img_txt_block is not None:
-            crawl = Crawl(self.args_dict["url_path"], crawl_type="img-text")
-            crawl.crawl_contents(save_path=self.save_path, sleep_time=sleep_time, img_txt_block=self.img_txt_block)
+            if self.async_:
+                crawl = AsyncCrawl(
+                    self.args_dict["url_path"],
+                    crawl_type="img-text",
+                    streaming=True,
+                    probe_images=self.probe_images
+                )
+                asyncio.run(crawl.crawl_contents(save_path=self.save_path, img_txt_block=self.img_txt_block))
+            else:
+                crawl = Crawl(self.args_dict["url_path"], crawl_type="img-text")
+                crawl.crawl_contents(save_path=self.save_path, img_txt_block=self.img_txt_block)
         else:
+            warc_dir = Path(self.warc_dir) / self.dir_ / self.name if self.warc_dir is not None else None
             if self.async_:
-                crawl = AsyncCrawl(self.args_dict["url_path"], crawl_type="text")
+                crawl = AsyncCrawl(
+                    self.args_dict["url_path"],
+                    crawl_type="text",
+                    streaming=True,
+                    extract_workers=self.extract_workers,
+                    max_tasks_per_child=self.max_tasks_per_child,
+                    raw_cache_dir=self.raw_cache_dir,
+                    raw_cache_max_bytes=self.raw_cache_max_bytes,
+                    warc_dir=warc_dir,
+                    near_dup_db=self.near_dup_db,
+                    output_format=self.output_format,
+                    max_shard_bytes=self.max_shard_bytes
+                )
                 asyncio.run(crawl.crawl_contents(save_path=self.save_path))
             else:
-                crawl = Crawl(self.args_dict["url_path"], crawl_type="text")
-                crawl.crawl_contents(save_path=self.save_path, sleep_time=sleep_time, img_txt_block=self.img_txt_block)
+                crawl = Crawl(
+                    self.args_dict["url_path"],
+                    crawl_type="text",
+                    extract_workers=self.extract_workers,
+                    max_tasks_per_child=self.max_tasks_per_child,
+                    raw_cache_dir=self.raw_cache_dir,
+                    raw_cache_max_bytes=self.raw_cache_max_bytes,
+                    warc_dir=warc_dir,
+                    near_dup_db=self.near_dup_db,
+                    output_format=self.output_format,
+                    max_shard_bytes=self.max_shard_bytes
+                )
+                crawl.crawl_contents(save_path=self.save_path, img_txt_block=self.img_txt_block)
 
     def start_all(
         self,
         start_idx: Optional[int] = 0,
         update_pages: Optional[int] = None,
-        save_dir: Optional[str] = None
+        save_dir: Optional[str] = None,
+        early_stop: Optional[int] = None
     ):
         """
         Crawl all websites in website config json file.
@@ -189,18 +368,23 @@ class Pipeline:
                 If None, function will switch into add mode and crawl all pages of websites.
             save_dir (`str`, *optional*):
                 Folder to save link.json and articles.
+            early_stop (`int`, *optional*):
+                In update mode, number of consecutive listing pages (or scroll actions) without new link
+                after which the scan (or scroll) of a website stops. None crawls `update_pages` pages of
+                every website.
         """
         self.website_df = pd.read_json(self.website_config_path, lines=True, engine="pyarrow", dtype_backend="pyarrow")
         length = len(self.website_df)
         if update_pages:
             logger.info("Start updating pipeline.")
             pages = self.website_df["pages"].to_list()
-            pages = [page if page <= update_pages else update_pages for page in pages]
+            # sitemap and feed configs have no pages and keep update_pages
+            pages = [page if ((not pd.isna(page)) and page <= update_pages) else update_pages for page in pages]
             for i in range(start_idx, length):
                 if not self.website_df.iloc[i]["update"]:
                     continue
                 try:
-                    self.start_by_idx(idx=i, update_pages=pages[i], save_dir=save_dir)
+                    self.start_by_idx(idx=i, update_pages=pages[i], save_dir=save_dir, early_stop=early_stop)
                 except KeyboardInterrupt:
                     logger.info("Shutting down program manually.")
                     break
@@ -226,7 +410,7 @@ class Pipeline:
         prefix: str = None,
         suffix: Optional[int] = None,
         root_path: Optional[int] = None,
-        pages: int = None,
+        pages: Union[int, str] = None,
         page_init_val: Optional[int] = 1,
         multiplier: Optional[int] = 1,
         block1: List[str] = None,
@@ -237,7 +421,12 @@ class Pipeline:
         start_page: Optional[int] = 0,
         sleep_time: Optional[int] = None,
         save_dir: Optional[str] = None,
-        update: Optional[bool] = True
+        update: Optional[bool] = True,
+        rate_limit: Optional[float] = None,
+        burst: Optional[int] = None,
+        url_pattern: Optional[str] = None,
+        since: Optional[str] = None,
+        feed: Optional[str] = None
     ):
         """
         Add new website into config json file and crawl website.
@@ -260,8 +449,10 @@ class Pipeline:
                 Suffix of the URL if exists.
             root_path (`str`, *optional*):
                 Root of the URL if URLs in tags are presented in relative fashion.
-            pages (`int`):
-                Number of crawling pages.
+            pages (`int` or `str`):
+                Number of crawling pages. For ``scan``, ``"auto"`` finds the number of pages by
+                probing the listing pages and records it as `pages` in the config json file, where
+                later runs reuse it. Set `pages` back to null in the file to probe again.
             page_init_val (`int`, default=1):
                 Initial value of page.
             multiplier (`int`, default=1):
@@ -275,8 +466,10 @@ class Pipeline:
                 Block for crawling img-text pair on the website.
             implementation (`str`):
                 Type of crawling method to crawl URLs on the website. The implementation should
-                be one of ``scan``, ``scroll``, ``onepage``, or ``click``, otherwise it will
-                raise an error.
+                be one of ``scan``, ``scroll``, ``onepage``, ``click``, ``sitemap``, or ``feed``,
+                otherwise it will raise an error. ``sitemap`` reads the sitemaps listed in the
+                robots.txt of prefix (or prefix itself if it is a sitemap), and ``feed`` reads the
+                RSS / Atom feed at prefix; neither needs pages nor block1.
             async_ (`bool`, *optional*, default=False):
                 If True, crawling website in an asynchronous fashion.
             start_page (int, *optional*, default=0):
@@ -287,6 +480,19 @@ class Pipeline:
                 Folder to save link.json and articles.
             update (`bool`, *optional*, default=True):
                 Update or not during updating mode.
+            rate_limit (`float`, *optional*):
+                Maximum number of requests per second sent to the website.
+            burst (`int`, *optional*):
+                Number of requests allowed at once after an idle period when `rate_limit` is set.
+            url_pattern (`str`, *optional*):
+                Regular expression the links found in the sitemaps should match. Only used by
+                the ``sitemap`` implementation.
+            since (`str`, *optional*):
+                ISO date; only sitemap entries modified after it are crawled. Only used by the
+                ``sitemap`` implementation.
+            feed (`str`, *optional*):
+                URL of the RSS / Atom feed of the website. If given, update mode polls the feed
+                instead of crawling the listing pages.
 
         Example:
             ::
@@ -330,7 +536,12 @@ class Pipeline:
             website_config_path = self.website_config_path,
             page_init_val = page_init_val,
             multiplier = multiplier,
-            update=update
+            update=update,
+            rate_limit=rate_limit,
+            burst=burst,
+            url_pattern=url_pattern,
+            since=since,
+            feed=feed
         )
 
         try:
@@ -74,7 +74,8 @@ class Task:
         task_name: str = "update_all_task",
         start_idx: Optional[int] = 0,
         update_pages: int = 10,
-        save_dir: Optional[str] = None
+        save_dir: Optional[str] = None,
+        early_stop: Optional[int] = 2
     ):
         """Execute a scheduled update task for all websites.
 
@@ -85,8 +86,11 @@ class Task:
             task_name (str): Name of the task. Defaults to `"update_all_task"`.
             start_idx (Optional[int]): Starting index in the website configuration
                 to begin crawling. Defaults to 0.
-            update_pages (int): Number of pages to update per website. Defaults to 10.
+            update_pages (int): Maximum number of pages to update per website. Defaults to 10.
             save_dir (Optional[str]): Directory to save extracted data. Optional.
+            early_stop (Optional[int]): The scan of a website stops once this many
+                consecutive listing pages held no new link. None always crawls
+                update_pages pages. Defaults to 2.
 
         Returns:
             None
@@ -100,7 +104,8 @@ class Task:
         self.pipeline.start_all(
             start_idx=start_idx,
             update_pages=update_pages,
-            save_dir=save_dir
+            save_dir=save_dir,
+            early_stop=early_stop
         )
 
         if self.notify:
@@ -115,6 +120,7 @@ class Task:
         idx: Optional[int] = 0,
         update_pages: Optional[int] = None,
         save_dir: Optional[str] = None,
+        early_stop: Optional[int] = 2
     ):
         """Execute a scheduled task for a specific website by index.
 
@@ -128,6 +134,8 @@ class Task:
                 Defaults to 0.
             update_pages (Optional[int]): Number of pages to update. Optional.
             save_dir (Optional[str]): Directory to save extracted data. Optional.
+            early_stop (Optional[int]): In update mode, the scan stops once this
+                many consecutive listing pages held no new link. Defaults to 2.
 
         Returns:
             None
@@ -141,7 +149,8 @@ class Task:
         self.pipeline.start_by_idx(
             idx=idx,
             update_pages=update_pages,
-            save_dir=save_dir
+            save_dir=save_dir,
+            early_stop=early_stop
         )
 
         if self.notify:
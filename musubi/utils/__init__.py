@@ -1,4 +1,24 @@
 from ..utils.helpers import *
 from ..utils.analyze import *
 from .filter import *
+from .seen import *
+from .extraction import *
+from .pdf import *
+from .fetch import *
+from .writer import *
+from .sink import *
+from .rate_limit import *
+from .retry import *
+from .journal import *
+from .near_dup import *
+from .image import *
+from .parser import *
+from .browser import *
+from .http import *
+from .conditional import *
+from .sitemap import *
+from .feed import *
+from .pagination import *
+from .raw_cache import *
+from .warc import *
 from ..utils.env import *
\ No newline at end of file
@@ -2,9 +2,9 @@ import pandas as pd
 import os
 from pathlib import Path
 from loguru import logger
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 import time
+from .browser import get_browser_pool
 
 
 os.environ["SE_DRIVER_MIRROR_URL"] = "https://msedgedriver.microsoft.com"
@@ -52,7 +52,7 @@ class ConfigAnalyzer:
         """Analyze and return implementation method distribution statistics.
 
         This method counts how many websites use each type of crawler implementation
-        (scan, scroll, onepage, click) and returns the distribution.
+        (scan, scroll, onepage, click, sitemap, feed) and returns the distribution.
 
         Returns:
             dict: A dictionary containing implementation statistics with the following keys:
@@ -61,15 +61,18 @@ class ConfigAnalyzer:
                 - 'scroll' (int): Number of websites using the Scroll implementation.
                 - 'onepage' (int): Number of websites using the OnePage implementation.
                 - 'click' (int): Number of websites using the Click implementation.
+                - 'sitemap' (int): Number of websites using the Sitemap implementation.
+                - 'feed' (int): Number of websites using the Feed implementation.
 
         Note:
             - Implementation types are identified by the 'implementation' field in
               the configuration.
-            - The four recognized implementation types correspond to different
+            - The six recognized implementation types correspond to different
               crawler classes: Scan (paginated), Scroll (infinite scroll),
-              OnePage (single page), and Click (load more button).
+              OnePage (single page), Click (load more button), Sitemap
+              (sitemaps listed in robots.txt), and Feed (RSS / Atom feed).
         """
-        type_class = ["scan", "scroll", "onepage", "click"]
+        type_class = ["scan", "scroll", "onepage", "click", "sitemap", "feed"]
         type_list = self.df["implementation"].to_list()
         all_num = len(type_list)
         type_dict = {"all_num": all_num}
@@ -94,32 +97,25 @@ class WebsiteNavigationAnalyzer:
     Note:
         - The analyzer tests navigation patterns in priority order: buttons (click),
           scrolling (scroll), pagination (scan), then defaults to single page (onepage).
-        - Requires Microsoft Edge WebDriver to be installed.
-        - The browser runs in headless mode for automated analysis.
+        - The browser is borrowed from the shared ``BrowserPool`` (headless Edge by
+          default, see ``configure_browser_pool``).
     """
     def __init__(self, url):
         self.url = url
         self.driver = None
         
     def setup_selenium(self):
-        """Initialize the Selenium WebDriver with optimized settings.
-
-        This method creates a headless Edge browser instance configured for
-        automated website analysis. The driver is stored in self.driver.
+        """Take a Selenium WebDriver from the shared browser pool.
 
         Returns:
-            None: Sets self.driver with the initialized WebDriver instance.
+            None: Sets self.driver with the WebDriver instance.
 
         Note:
             - The browser runs in headless mode (no visible window).
-            - Window size is set to 1920x1080 for consistent rendering.
-            - GPU acceleration is disabled for better compatibility in headless mode.
+            - The browser starts from a blank page, without the cookies and
+              storage of the websites it visited before.
         """
-        options = webdriver.EdgeOptions()
-        options.add_argument('--headless')
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920x1080")
-        self.driver = webdriver.Edge(options=options)
+        self.driver = get_browser_pool().acquire()
         
     def analyze_navigation_type(self):
         """Analyze and determine the website's navigation pattern.
@@ -137,7 +133,8 @@ class WebsiteNavigationAnalyzer:
                 - 'onepage': Website displays all content on a single page.
 
         Note:
-            - The WebDriver is automatically closed after analysis, even if errors occur.
+            - The WebDriver is given back to the browser pool after analysis, even
+              if errors occur.
             - Waits 2 seconds after loading the page for initial content to render.
             - Tests are performed in priority order to select the most specific
               navigation type.
@@ -164,7 +161,8 @@ class WebsiteNavigationAnalyzer:
             
         finally:
             if self.driver:
-                self.driver.quit()
+                get_browser_pool().release(self.driver)
+                self.driver = None
 
     def check_pagination(self):
         """Check if the website uses traditional pagination links.
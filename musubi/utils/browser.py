@@ -0,0 +1,431 @@
+import os
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import Optional
+from loguru import logger
+from selenium import webdriver
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+BROWSERS = ("edge", "chrome", "firefox")
+
+
+# Collects the href of the first link of every block from index start in one
+# WebDriver round trip, and returns it with the number of blocks, or null if the
+# blocks did not change and onlyChanged is set. Hrefs are resolved against the
+# base of the document, or joined to root_path when it is given, as the static
+# crawlers do.
+_COLLECT_LINKS_JS = """
+const [selector, rootPath, start, onlyChanged] = arguments;
+const blocks = document.querySelectorAll(selector);
+if (onlyChanged && (blocks.length === start)) {
+    return null;
+}
+// fewer blocks than before: the page replaced or recycled them, read them all again
+const from = blocks.length < start ? 0 : start;
+const base = rootPath ? rootPath.replace(/\\/+$/, "") + "/" : null;
+const links = [];
+for (let i = from; i < blocks.length; i++) {
+    const block = blocks[i];
+    const a = block.matches("a[href]") ? block : block.querySelector("a[href]");
+    if (!a) {
+        continue;
+    }
+    const href = a.getAttribute("href").trim();
+    if (!href) {
+        continue;
+    }
+    if (base && !/^([a-z][a-z0-9+.-]*:|\\/\\/)/i.test(href)) {
+        links.push(base + href.replace(/^\\/+/, ""));
+        continue;
+    }
+    try {
+        links.push(new URL(href, document.baseURI).href);
+    } catch (e) {
+        // not a valid URL
+    }
+}
+return [links, blocks.length];
+"""
+
+
+def _css_string(value: str):
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def block_css_selector(tag: Optional[str], class_: str, exact: bool = True):
+    """Return the CSS selector of the blocks of a website config.
+
+    Args:
+        tag (str, optional): Tag of the blocks, or None for any tag.
+        class_ (str): Class of the blocks.
+        exact (bool, optional): If True, the class attribute has to be class_ as a
+            whole, as for ``BlockSelector``. Otherwise the blocks only need to have
+            every class of class_, as with ``By.CLASS_NAME``. Defaults to True.
+
+    Returns:
+        str: The CSS selector.
+    """
+    if exact:
+        return "{}[class={}]".format(tag or "*", _css_string(class_))
+    return (tag or "") + "".join("[class~={}]".format(_css_string(name)) for name in class_.split()) or "*"
+
+
+def collect_links(driver, selector: str, root_path: Optional[str] = None):
+    """Return the links of the blocks matching selector with a single script execution.
+
+    Reading every block with ``find_elements``, ``find_element`` and
+    ``get_attribute`` costs a WebDriver round trip per call, i.e. thousands of
+    requests to the driver on a long feed. The script instead walks the DOM in the
+    browser and returns every link at once.
+
+    Args:
+        driver (WebDriver): Selenium driver of the page.
+        selector (str): CSS selector of the blocks, see ``block_css_selector``.
+            The link of a block is the block itself if it is an ``<a>``, otherwise
+            its first ``<a>`` with an href.
+        root_path (str, optional): If given, relative hrefs are appended to it
+            instead of being resolved against the page URL. Defaults to None.
+
+    Returns:
+        list: Absolute URLs of the links, in document order.
+    """
+    return collect_new_links(driver, selector, root_path=root_path)[0]
+
+
+def collect_new_links(
+    driver,
+    selector: str,
+    start: int = 0,
+    root_path: Optional[str] = None,
+    timeout: Optional[float] = None,
+    poll_frequency: float = 0.25
+):
+    """Return the links of the blocks after the first start ones, optionally waiting for them.
+
+    Used to extract links incrementally while a page grows: start is the number
+    of blocks returned by the previous call, so that every block is read once. If
+    the page has fewer blocks than start (e.g. a feed recycling its elements), all
+    blocks are read again and the caller is expected to skip the known links.
+
+    Args:
+        driver (WebDriver): Selenium driver of the page.
+        selector (str): CSS selector of the blocks, see ``block_css_selector``.
+        start (int, optional): Number of blocks already read. Defaults to 0.
+        root_path (str, optional): See ``collect_links``. Defaults to None.
+        timeout (float, optional): If given, the page is polled until the number
+            of blocks differs from start, for at most timeout seconds. Each poll is
+            a single script execution that returns the links once they are there.
+            Defaults to None, reading the blocks at once.
+        poll_frequency (float, optional): Seconds between two polls. Defaults to 0.25.
+
+    Returns:
+        tuple: ``(links, count)``, the absolute URLs of the new blocks and the
+            number of blocks of the page, or None if the blocks did not change
+            within timeout.
+    """
+    if timeout is None:
+        return tuple(driver.execute_script(_COLLECT_LINKS_JS, selector, root_path, start, False) or ([], 0))
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(
+            lambda d: d.execute_script(_COLLECT_LINKS_JS, selector, root_path, start, True)
+        )
+    except TimeoutException:
+        return None
+    return tuple(result)
+
+
+def create_driver(browser: str = "edge", headless: bool = True):
+    """Start a WebDriver of the given browser with the settings of the crawlers.
+
+    Args:
+        browser (str, optional): 'edge', 'chrome' (Chromium) or 'firefox'. The
+            matching browser has to be installed; Selenium Manager downloads the
+            driver. Defaults to 'edge'.
+        headless (bool, optional): Whether the browser runs without a window.
+            Defaults to True.
+
+    Returns:
+        WebDriver: The started driver, with a 1920x1080 window.
+    """
+    if browser not in BROWSERS:
+        raise ValueError("Browser should be one of {} but got `{}`.".format(", ".join(BROWSERS), browser))
+    if browser == "firefox":
+        options = webdriver.FirefoxOptions()
+        if headless:
+            options.add_argument("-headless")
+        options.add_argument("--width=1920")
+        options.add_argument("--height=1080")
+        return webdriver.Firefox(options=options)
+
+    options = webdriver.EdgeOptions() if browser == "edge" else webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    # /dev/shm is small in containers, and Chromium refuses to sandbox itself as root
+    options.add_argument("--disable-dev-shm-usage")
+    if hasattr(os, "geteuid") and (os.geteuid() == 0):
+        options.add_argument("--no-sandbox")
+    if browser == "edge":
+        return webdriver.Edge(options=options)
+    return webdriver.Chrome(options=options)
+
+
+def get_driver_memory(driver):
+    """Return the resident memory in MiB of the driver and its browser processes.
+
+    Requires the optional ``psutil`` package.
+
+    Returns:
+        float: The memory in MiB, or None if it cannot be measured.
+    """
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if (psutil is None) or (process is None):
+        return None
+    try:
+        root = psutil.Process(process.pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return None
+    rss = 0
+    for child in processes:
+        try:
+            rss += child.memory_info().rss
+        except psutil.Error:
+            # exited in the meantime
+            continue
+    return rss / (1024 * 1024)
+
+
+def _reset_driver(driver):
+    # leave nothing of the previous website to the next one: extra windows,
+    # storage, cookies and the page itself
+    try:
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.execute_script("try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}")
+        if hasattr(driver, "execute_cdp_cmd"):
+            # Chromium clears the cookies of every domain, not only of the current one
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        else:
+            driver.delete_all_cookies()
+        driver.get("about:blank")
+        return True
+    except WebDriverException as e:
+        logger.warning(f"Failed to reset browser, restarting it: {e!r}")
+        return False
+
+
+class BrowserPool:
+    """A bounded pool of headless browsers shared by the Selenium-based crawlers.
+
+    Starting a browser takes seconds, which a crawl of many scroll or click
+    websites used to pay for every website. Drivers are instead started on demand,
+    up to size of them, and returned to the pool after each website, cleared of
+    its windows, storage and cookies, so that the next website starts from a
+    blank page. A driver is restarted after max_uses websites or when its browser
+    uses more than max_memory_mb, as long-lived browsers tend to grow.
+
+    Args:
+        size (int, optional): Maximum number of drivers alive at once. Defaults to 2.
+        browser (str, optional): 'edge', 'chrome' or 'firefox', see
+            ``create_driver``. Defaults to 'edge'.
+        headless (bool, optional): Whether the browsers run without a window.
+            Defaults to True.
+        max_uses (int, optional): Number of websites after which a driver is
+            restarted. None never restarts it. Defaults to 50.
+        max_memory_mb (float, optional): Resident memory in MiB of a browser and
+            its driver above which the driver is restarted when returned. Requires
+            the optional ``psutil`` package. Defaults to None, not measured.
+
+    Example:
+        ::
+
+            pool = BrowserPool(size=2, browser="chrome")
+            with pool.driver() as driver:
+                driver.get(url)
+            pool.close()
+    """
+    def __init__(
+        self,
+        size: int = 2,
+        browser: str = "edge",
+        headless: bool = True,
+        max_uses: Optional[int] = 50,
+        max_memory_mb: Optional[float] = None
+    ):
+        self._check(size, browser, max_memory_mb)
+        self.size = size
+        self.browser = browser
+        self.headless = headless
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.condition = threading.Condition()
+        self.idle = []
+        # driver -> [number of websites served, generation of the settings it was started with]
+        self.drivers = {}
+        self.starting = 0
+        self.generation = 0
+
+    @staticmethod
+    def _check(size: Optional[int], browser: Optional[str], max_memory_mb: Optional[float]):
+        if (size is not None) and (size < 1):
+            raise ValueError("Size of browser pool should be positive but got {}.".format(size))
+        if (browser is not None) and (browser not in BROWSERS):
+            raise ValueError("Browser should be one of {} but got `{}`.".format(", ".join(BROWSERS), browser))
+        if (max_memory_mb is not None) and (psutil is None):
+            raise ImportError("Argument `max_memory_mb` requires the psutil package: `pip install psutil`.")
+
+    def configure(
+        self,
+        size: Optional[int] = None,
+        browser: Optional[str] = None,
+        headless: Optional[bool] = None,
+        max_uses: Optional[int] = None,
+        max_memory_mb: Optional[float] = None
+    ):
+        """Change the settings of the pool; arguments left to None keep their current value.
+
+        Idle drivers are closed, and busy ones when they are released, so that
+        every driver handed out afterwards follows the new settings.
+        """
+        self._check(size, browser, max_memory_mb)
+        with self.condition:
+            if size is not None:
+                self.size = size
+            if browser is not None:
+                self.browser = browser
+            if headless is not None:
+                self.headless = headless
+            if max_uses is not None:
+                self.max_uses = max_uses
+            if max_memory_mb is not None:
+                self.max_memory_mb = max_memory_mb
+            # waiting acquirers may start a driver if size grew
+            self.condition.notify_all()
+        self.close()
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Take a driver from the pool, starting one if fewer than size are alive.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a driver when all of them
+                are busy. Defaults to None, waiting as long as needed.
+
+        Returns:
+            WebDriver: A driver on a blank page, to be given back with ``release``.
+
+        Raises:
+            TimeoutError: If no driver was released within timeout.
+        """
+        with self.condition:
+            while not self.idle and (len(self.drivers) + self.starting >= self.size):
+                if not self.condition.wait(timeout):
+                    raise TimeoutError("No browser released within {} seconds.".format(timeout))
+            if self.idle:
+                return self.idle.pop()
+            self.starting += 1
+            browser, headless, generation = self.browser, self.headless, self.generation
+
+        try:
+            driver = create_driver(browser, headless)
+        except BaseException:
+            with self.condition:
+                self.starting -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.starting -= 1
+            self.drivers[driver] = [0, generation]
+        logger.debug(f"Started {browser} browser, {len(self.drivers)} alive.")
+        return driver
+
+    def release(self, driver):
+        """Give back a driver taken with ``acquire``, restarting it if it is worn out or broken."""
+        with self.condition:
+            state = self.drivers.get(driver)
+            if state is None:
+                raise ValueError("The driver does not belong to this browser pool.")
+            state[0] += 1
+            uses, outdated = state[0], state[1] != self.generation
+
+        if outdated:
+            restart = True
+        elif (self.max_uses is not None) and (uses >= self.max_uses):
+            logger.info(f"Restarting browser after {uses} websites.")
+            restart = True
+        else:
+            memory = get_driver_memory(driver) if self.max_memory_mb is not None else None
+            if (memory is not None) and (memory > self.max_memory_mb):
+                logger.info(f"Restarting browser using {memory:.0f} MiB.")
+                restart = True
+            else:
+                restart = not _reset_driver(driver)
+
+        if restart:
+            self._quit(driver)
+        else:
+            with self.condition:
+                self.idle.append(driver)
+                self.condition.notify()
+
+    @contextmanager
+    def driver(self, timeout: Optional[float] = None):
+        """Context manager taking a driver from the pool and giving it back on exit."""
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Failed to quit browser: {e!r}")
+        with self.condition:
+            self.drivers.pop(driver, None)
+            self.condition.notify()
+
+    def close(self):
+        """Quit the idle drivers. Busy drivers are quit when they are released."""
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.generation += 1
+        for driver in idle:
+            self._quit(driver)
+
+
+browser_pool = BrowserPool()
+atexit.register(browser_pool.close)
+
+
+def configure_browser_pool(
+    size: Optional[int] = None,
+    browser: Optional[str] = None,
+    headless: Optional[bool] = None,
+    max_uses: Optional[int] = None,
+    max_memory_mb: Optional[float] = None
+):
+    """Configure the browser pool shared by ``Scroll``, ``Click`` and ``WebsiteNavigationAnalyzer``.
+
+    Arguments left to None keep their current value, see ``BrowserPool`` for their
+    meaning and defaults.
+    """
+    browser_pool.configure(size, browser, headless, max_uses, max_memory_mb)
+
+
+def get_browser_pool():
+    """Return the browser pool shared by the Selenium-based crawlers."""
+    return browser_pool
@@ -0,0 +1,155 @@
+import sqlite3
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Union
+from .seen import hash_url
+from .http import get_session
+
+
+def get_validator_cache_path(url_path: Union[str, Path]):
+    """Return the path of the HTTP validator cache stored next to a ``*_link.json`` file."""
+    return Path(url_path).with_suffix(".validators.db")
+
+
+class ValidatorCache:
+    """A persistent cache of HTTP validators (``ETag`` and ``Last-Modified``) backed by SQLite.
+
+    The validators of successfully processed URLs are stored, and sent back as
+    ``If-None-Match`` / ``If-Modified-Since`` the next time the URL is requested.
+    If the server answers ``304 Not Modified`` the page has not changed since the
+    last crawl, and both its download and its parsing can be skipped.
+
+    Validators are only committed on ``commit`` or ``close``. Close the cache after
+    the writer of the records parsed from the cached pages, so that a page is never
+    marked as unchanged while its records are lost in a crash.
+
+    Args:
+        db_path (str or Path): Path of the SQLite database.
+
+    Example:
+        ::
+
+            with ValidatorCache("crawler/test/test_link.validators.db") as validators:
+                response = conditional_get(url, validators)
+                if response.status_code != 304:
+                    ...
+                    validators.update(url, response.headers)
+    """
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS validators (hash INTEGER PRIMARY KEY, etag TEXT, last_modified TEXT)"
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM validators").fetchone()[0]
+
+    def get(self, url: str):
+        """Return the stored ``(etag, last_modified)`` of a URL, or None if it has none."""
+        return self.conn.execute(
+            "SELECT etag, last_modified FROM validators WHERE hash = ?", (hash_url(url),)
+        ).fetchone()
+
+    def request_headers(self, url: str):
+        """Build the conditional request headers of a URL.
+
+        Args:
+            url (str): URL to request.
+
+        Returns:
+            dict: ``If-None-Match`` and/or ``If-Modified-Since`` headers, empty if
+                no validator of the URL is stored.
+        """
+        headers = {}
+        row = self.get(url)
+        if row is not None:
+            etag, last_modified = row
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def update(self, url: str, headers: Mapping[str, str]):
+        """Store the validators found in the headers of a successful response.
+
+        Args:
+            url (str): Requested URL.
+            headers (Mapping): Response headers. Both ``requests`` and ``aiohttp``
+                headers are case-insensitive mappings and can be passed directly.
+
+        Returns:
+            bool: True if a validator was stored, False if the response had none.
+        """
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not (etag or last_modified):
+            self.conn.execute("DELETE FROM validators WHERE hash = ?", (hash_url(url),))
+            return False
+        self.conn.execute(
+            "INSERT OR REPLACE INTO validators (hash, etag, last_modified) VALUES (?, ?, ?)",
+            (hash_url(url), etag, last_modified)
+        )
+        return True
+
+    def clear(self):
+        """Remove every stored validator."""
+        self.conn.execute("DELETE FROM validators")
+        self.commit()
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        """Commit and close the database."""
+        if self.conn is None:
+            return
+        self.commit()
+        self.conn.close()
+        self.conn = None
+
+
+def open_validator_cache(url_path: Union[str, Path]):
+    """Open the validator cache of the pages whose links are saved in a ``*_link.json`` file."""
+    return ValidatorCache(get_validator_cache_path(url_path))
+
+
+def conditional_get(
+    url: str,
+    validators: Optional[ValidatorCache] = None,
+    headers: Optional[Dict[str, str]] = None,
+    **kwargs
+):
+    """Send a GET request through the shared session, conditional on stored validators.
+
+    The validators of the response are not stored automatically: call
+    ``validators.update(url, response.headers)`` once the page has been processed,
+    so that a page failing to parse is fetched in full again next time.
+
+    Args:
+        url (str): URL to request.
+        validators (ValidatorCache, optional): Cache of validators. If None, a plain
+            GET request is sent. Defaults to None.
+        headers (dict, optional): Additional request headers. Defaults to None.
+        **kwargs: Additional keyword arguments passed to ``requests.Session.get``.
+
+    Returns:
+        requests.Response: The response. Its status code is 304 if the page has not
+            changed since its validators were stored.
+    """
+    if validators is None:
+        return get_session().get(url, headers=headers, **kwargs)
+
+    request_headers = validators.request_headers(url)
+    if headers:
+        request_headers.update(headers)
+    return get_session().get(url, headers=request_headers, **kwargs)
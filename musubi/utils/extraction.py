@@ -0,0 +1,340 @@
+import sys
+import pymupdf
+import pymupdf4llm
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from trafilatura import extract
+from loguru import logger
+from .sink import open_content_writer, remove_output, replace_output
+
+
+def extract_html(downloaded: Union[str, bytes]):
+    """Extract the main text of a downloaded HTML page as markdown.
+
+    This function is defined at module level so that it can be sent to the
+    worker processes of an extraction pool.
+
+    Args:
+        downloaded (str or bytes): Raw HTML document.
+
+    Returns:
+        str: The extracted markdown, or None if nothing could be extracted.
+    """
+    return extract(downloaded, favor_precision=True, output_format="markdown")
+
+
+def extract_pdf(data: bytes):
+    """Convert the raw bytes of a PDF file into markdown.
+
+    Args:
+        data (bytes): Raw PDF document.
+
+    Returns:
+        str: The converted markdown.
+    """
+    with pymupdf.open(stream=data, filetype="pdf") as doc:
+        return pymupdf4llm.to_markdown(doc)
+
+
+def extract_text(data: Union[str, bytes]):
+    """Return a plain text document as it is, decoded to a string.
+
+    UTF-8 is tried first, then the encoding guessed by ``charset_normalizer``.
+
+    Args:
+        data (str or bytes): Raw text document.
+
+    Returns:
+        str: The decoded text, or None if it is empty.
+    """
+    if isinstance(data, bytes):
+        try:
+            data = data.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            from charset_normalizer import from_bytes
+            best = from_bytes(data).best()
+            data = str(best) if best is not None else data.decode("utf-8", errors="replace")
+    data = data.strip()
+    return data or None
+
+
+_extractors = {}
+_content_types = {}
+_magic_numbers = []
+
+# binary formats which are never worth downloading in full
+_BINARY_CONTENT_TYPES = (
+    "image/",
+    "audio/",
+    "video/",
+    "font/",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/vnd.rar",
+    "application/x-tar",
+    "application/octet-stream",
+)
+_BINARY_MAGIC_NUMBERS = (
+    b"\x89PNG",
+    b"\xff\xd8\xff",
+    b"GIF8",
+    b"RIFF",
+    b"PK\x03\x04",
+    b"\x1f\x8b",
+    b"7z\xbc\xaf",
+    b"Rar!",
+    b"OggS",
+    b"ID3",
+    b"\x00\x00\x01\x00",
+)
+
+
+def register_extractor(
+    kind: str,
+    func: Callable,
+    content_types: Iterable[str] = (),
+    magic_numbers: Iterable[bytes] = ()
+):
+    """Register the extractor of a kind of document.
+
+    Downloaded documents are dispatched to extractors by ``sniff_kind``, first
+    from their leading bytes and then from their ``Content-Type``. Registering an
+    existing kind replaces its extractor.
+
+    Args:
+        kind (str): Name of the kind, e.g. 'html'.
+        func (Callable): Function turning the raw bytes of a document into text.
+            It must be defined at module level to be usable in an extraction pool.
+        content_types (Iterable, optional): MIME types of the kind, e.g.
+            'text/html'. Defaults to ().
+        magic_numbers (Iterable, optional): Leading bytes identifying documents of
+            the kind, e.g. b'%PDF-'. Defaults to ().
+
+    Example:
+        ::
+
+            register_extractor("json", extract_json, content_types=["application/json"])
+    """
+    _extractors[kind] = func
+    for content_type in content_types:
+        _content_types[content_type.lower()] = kind
+    for magic_number in magic_numbers:
+        _magic_numbers.append((magic_number, kind))
+
+
+def get_extractor(kind: str):
+    """Return the extractor registered for a kind of document."""
+    if kind not in _extractors:
+        raise ValueError("No extractor is registered for `{}` documents.".format(kind))
+    return _extractors[kind]
+
+
+def get_mime_type(content_type: Optional[str]):
+    """Return the lower-cased MIME type of a ``Content-Type`` header without its parameters."""
+    if not content_type:
+        return ""
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+def is_unsupported_content_type(content_type: Optional[str]):
+    """Check whether a ``Content-Type`` announces a binary format without extractor.
+
+    This lets a fetcher drop a response before reading any of its body.
+    """
+    mime_type = get_mime_type(content_type)
+    if (not mime_type) or (mime_type in _content_types):
+        return False
+    # octet-stream is often used for PDFs, so leave it to the magic numbers
+    if mime_type == "application/octet-stream":
+        return False
+    return mime_type.startswith(_BINARY_CONTENT_TYPES)
+
+
+def _looks_like_html(head: bytes):
+    start = head[:1024].lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    return start.startswith((b"<!doctype html", b"<html", b"<head", b"<body", b"<?xml")) or (b"<html" in start)
+
+
+def sniff_kind(
+    content_type: Optional[str],
+    head: bytes = b"",
+    url: Optional[str] = None
+):
+    """Guess the kind of a downloaded document.
+
+    The leading bytes of the body take precedence over the ``Content-Type``
+    header, which servers often get wrong, and the URL suffix is only used as a
+    last resort.
+
+    Args:
+        content_type (str, optional): ``Content-Type`` header of the response.
+        head (bytes, optional): First bytes of the body. Defaults to b''.
+        url (str, optional): URL of the document. Defaults to None.
+
+    Returns:
+        str: A registered kind such as 'html', 'pdf' or 'text', or None if the
+            document is an unsupported binary.
+    """
+    for magic_number, kind in _magic_numbers:
+        if head.startswith(magic_number):
+            return kind
+    if head.startswith(_BINARY_MAGIC_NUMBERS) or head[4:8] == b"ftyp":
+        return None
+
+    mime_type = get_mime_type(content_type)
+    if mime_type in _content_types:
+        kind = _content_types[mime_type]
+        # plain text servers regularly send HTML pages
+        if (kind == "text") and _looks_like_html(head):
+            return "html"
+        return kind
+    if head and _looks_like_html(head):
+        return "html"
+    if mime_type.startswith(_BINARY_CONTENT_TYPES):
+        return None
+    if url is not None and url.lower().split("?", 1)[0].endswith(".pdf"):
+        return "pdf"
+    if mime_type.startswith("text/"):
+        return "text"
+    return "html"
+
+
+register_extractor(
+    "html",
+    extract_html,
+    content_types=["text/html", "application/xhtml+xml"]
+)
+register_extractor(
+    "pdf",
+    extract_pdf,
+    content_types=["application/pdf", "application/x-pdf"],
+    magic_numbers=[b"%PDF-"]
+)
+register_extractor(
+    "text",
+    extract_text,
+    content_types=["text/plain", "text/markdown", "text/x-markdown"]
+)
+
+
+def create_extraction_pool(
+    max_workers: Optional[int] = None,
+    max_tasks_per_child: Optional[int] = None
+):
+    """Create a process pool for the CPU-bound extraction stage.
+
+    Fetching stays in the crawler while raw documents are handed to the pool,
+    so trafilatura and pymupdf4llm run on several cores instead of being
+    serialized by the GIL.
+
+    Args:
+        max_workers (int, optional): Number of worker processes. Defaults to
+            the number of CPUs.
+        max_tasks_per_child (int, optional): Number of documents a worker
+            process handles before it is replaced by a fresh one, which bounds
+            memory growth of long crawls. Only supported on Python 3.11+ and
+            ignored with a warning on older versions. Defaults to None.
+
+    Returns:
+        concurrent.futures.ProcessPoolExecutor: The extraction pool.
+    """
+    kwargs = {"max_workers": max_workers}
+    if max_tasks_per_child is not None:
+        if sys.version_info >= (3, 11):
+            kwargs["max_tasks_per_child"] = max_tasks_per_child
+        else:
+            logger.warning("Argument `max_tasks_per_child` requires Python 3.11 or later and will be ignored.")
+    return ProcessPoolExecutor(**kwargs)
+
+
+def extract_document(data: bytes, kind: str):
+    """Extract a raw document with the extractor registered for its kind."""
+    return get_extractor(kind)(data)
+
+
+def extract_documents(
+    documents: Iterable[Tuple[str, bytes, str]],
+    save_path: Union[str, Path],
+    extract_workers: Optional[int] = None,
+    max_tasks_per_child: Optional[int] = None,
+    output_format: str = "jsonl"
+):
+    """Extract raw documents which are already on disk into a content output.
+
+    This is the offline half of a crawl, used to regenerate contents from stored
+    documents (raw cache, WARC) at CPU speed. The results are first written to a
+    temporary file which then replaces save_path, so save_path is left untouched
+    if the extraction fails.
+
+    Args:
+        documents (Iterable): ``(url, data, kind)`` tuples of the documents. A
+            tuple whose kind is None holds a record of a previous output instead
+            of data, which is written as is.
+        save_path (str or Path): Path of the content output to write.
+        extract_workers (int, optional): If set, extract in a process pool with
+            this many workers. Defaults to None, extracting in the current process.
+        max_tasks_per_child (int, optional): Number of documents an extraction
+            worker handles before being replaced. Defaults to None.
+        output_format (str, optional): Format of the output, see
+            ``open_content_writer``. Defaults to 'jsonl'.
+
+    Returns:
+        int: Number of written records.
+    """
+    count = 0
+    tmp_path = Path(str(save_path) + ".tmp")
+    remove_output(tmp_path)
+
+    with open_content_writer(tmp_path, output_format) as writer:
+        if extract_workers:
+            pool = create_extraction_pool(extract_workers, max_tasks_per_child)
+            try:
+                pending = []
+
+                def drain():
+                    nonlocal count
+                    for url, future, record in pending:
+                        if future is None:
+                            writer.write(record)
+                            count += 1
+                            continue
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            logger.error(f"Failed to extract content of {url}: {e}")
+                            result = None
+                        writer.write({"content": result, "url": url})
+                        count += 1
+                    pending.clear()
+
+                for url, data, kind in documents:
+                    if kind is None:
+                        # records are kept in the order of the documents
+                        pending.append((url, None, data))
+                        continue
+                    pending.append((url, pool.submit(get_extractor(kind), data), None))
+                    if len(pending) >= 4 * extract_workers:
+                        drain()
+                drain()
+            finally:
+                pool.shutdown(cancel_futures=True)
+        else:
+            for url, data, kind in documents:
+                if kind is None:
+                    writer.write(data)
+                    count += 1
+                    continue
+                try:
+                    result = extract_document(data, kind)
+                except Exception as e:
+                    logger.error(f"Failed to extract content of {url}: {e}")
+                    result = None
+                writer.write({"content": result, "url": url})
+                count += 1
+
+    replace_output(tmp_path, save_path)
+    return count
@@ -0,0 +1,89 @@
+from typing import Optional, Union
+from urllib.parse import urljoin
+from lxml import etree
+from bs4 import SoupStrainer
+from .parser import make_soup
+
+
+FEED_TYPES = ("application/rss+xml", "application/atom+xml", "application/rdf+xml")
+_FEED_ROOTS = ("rss", "feed", "RDF")
+_ENTRY_NAMES = ("item", "entry")
+
+
+def _localname(element):
+    if not isinstance(element.tag, str):
+        # comments and processing instructions
+        return None
+    return etree.QName(element).localname
+
+
+def _entry_link(entry):
+    # RSS holds the link as text, Atom as the href of the alternate link
+    atom_link = None
+    for child in entry:
+        name = _localname(child)
+        if name == "link":
+            href = child.get("href")
+            if href is None:
+                if child.text and child.text.strip():
+                    return child.text.strip()
+                continue
+            if child.get("rel", "alternate") == "alternate":
+                return href.strip()
+            atom_link = atom_link or href.strip()
+        elif (name == "guid") and (child.get("isPermaLink", "true") == "true") and child.text:
+            atom_link = atom_link or child.text.strip()
+    return atom_link
+
+
+def parse_feed(data: Union[str, bytes], base_url: Optional[str] = None):
+    """Return the links of the entries of an RSS 2.0, RSS 1.0 or Atom feed.
+
+    Args:
+        data (str or bytes): Body of the feed.
+        base_url (str, optional): URL of the feed, against which relative links
+            are resolved. Defaults to None.
+
+    Returns:
+        list: The entry links in the order of the feed, or None if data is not a
+            feed (e.g. the HTML page of the website).
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    parser = etree.XMLParser(resolve_entities=False, no_network=True, recover=True, huge_tree=True)
+    try:
+        root = etree.fromstring(data.strip(), parser=parser)
+    except etree.XMLSyntaxError:
+        return None
+    if (root is None) or (_localname(root) not in _FEED_ROOTS):
+        return None
+
+    links = []
+    for entry in root.iter():
+        if _localname(entry) not in _ENTRY_NAMES:
+            continue
+        link = _entry_link(entry)
+        if link:
+            links.append(urljoin(base_url, link) if base_url else link)
+    return list(dict.fromkeys(links))
+
+
+def find_feeds(html: Union[str, bytes], base_url: str):
+    """Return the feeds advertised by an HTML page with ``<link rel="alternate">``.
+
+    Args:
+        html (str or bytes): HTML of the page, usually the home page of a website.
+        base_url (str): URL of the page.
+
+    Returns:
+        list: Absolute URLs of the RSS and Atom feeds of the page.
+    """
+    soup = make_soup(html, parse_only=SoupStrainer("link"))
+    feeds = []
+    for link in soup.find_all("link", href=True):
+        rel = link.get("rel") or []
+        if isinstance(rel, str):
+            rel = rel.split()
+        if ("alternate" in rel) and (link.get("type", "").lower() in FEED_TYPES):
+            feeds.append(urljoin(base_url, link["href"].strip()))
+    return list(dict.fromkeys(feeds))
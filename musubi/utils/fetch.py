@@ -0,0 +1,253 @@
+import time
+import asyncio
+from typing import Optional
+from loguru import logger
+from .http import get_session
+from .conditional import conditional_get
+from .rate_limit import rate_limiter
+from .retry import FetchError, RetryPolicy, CircuitBreaker, retry_policy, circuit_breaker
+from .extraction import sniff_kind, is_unsupported_content_type
+from .pdf import PdfSink, DEFAULT_MAX_PDF_BYTES
+
+
+_HEAD_SIZE = 64 * 1024
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _parse_length(value: Optional[str]):
+    if value and value.isdigit():
+        return int(value)
+    return None
+
+
+def _check_deadline(url: str, deadline: Optional[float]):
+    if (deadline is not None) and (time.monotonic() > deadline):
+        raise FetchError(url, "Total timeout exceeded.")
+
+
+def fetch_page(
+    url: str,
+    validators=None,
+    headers: Optional[dict] = None,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = circuit_breaker
+):
+    """Send a GET request through the shared session, retrying transient failures.
+
+    Every attempt waits for the per-host rate limit and is sent with the connect
+    and read timeouts of the retry policy.
+
+    Args:
+        url (str): URL to request.
+        validators (ValidatorCache, optional): If given, the request is conditional
+            on the validators stored for url, see ``conditional_get``.
+            Defaults to None.
+        headers (dict, optional): Additional request headers. Defaults to None.
+        policy (RetryPolicy, optional): Retry policy. Defaults to the shared one.
+        breaker (CircuitBreaker, optional): Circuit breaker of the hosts.
+            Defaults to the shared one.
+
+    Returns:
+        requests.Response: The response, whose status is not a retryable one.
+
+    Raises:
+        FetchError: If every attempt failed or the circuit of the host is open.
+    """
+    policy = policy or retry_policy
+
+    def attempt():
+        rate_limiter.wait(url)
+        response = conditional_get(url, validators, headers=headers, timeout=policy.timeout())
+        policy.check_status(url, response.status_code, response.headers)
+        return response
+
+    return policy.call(url, attempt, breaker)
+
+
+async def fetch_page_async(
+    url: str,
+    session,
+    headers: Optional[dict] = None,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = circuit_breaker,
+    semaphore: Optional[asyncio.Semaphore] = None
+):
+    """Send a GET request through an ``aiohttp.ClientSession``, retrying transient failures.
+
+    Args:
+        url (str): URL to request.
+        session (aiohttp.ClientSession): Session of the crawl.
+        headers (dict, optional): Additional request headers. Defaults to None.
+        policy (RetryPolicy, optional): Retry policy. Defaults to the shared one.
+        breaker (CircuitBreaker, optional): Circuit breaker of the hosts.
+            Defaults to the shared one.
+        semaphore (asyncio.Semaphore, optional): Concurrency slot held during each
+            attempt only, so that the rate limit and the backoff delays are waited
+            for without holding it. Defaults to None.
+
+    Returns:
+        tuple: ``(response, text)``. The response is released, and text is its
+            decoded body, or None for a ``304 Not Modified``.
+
+    Raises:
+        FetchError: If every attempt failed or the circuit of the host is open.
+    """
+    policy = policy or retry_policy
+
+    async def send():
+        async with session.get(url, headers=headers, timeout=policy.client_timeout()) as response:
+            policy.check_status(url, response.status, response.headers)
+            if response.status == 304:
+                return response, None
+            return response, await response.text()
+
+    async def attempt():
+        await rate_limiter.wait_async(url)
+        if semaphore is None:
+            return await send()
+        async with semaphore:
+            return await send()
+
+    return await policy.call_async(url, attempt, breaker)
+
+
+def _fetch_document_once(url: str, max_pdf_bytes: Optional[int], policy: RetryPolicy):
+    rate_limiter.wait(url)
+    deadline = policy.deadline()
+    with get_session().get(url, stream=True, timeout=policy.timeout()) as response:
+        policy.check_status(url, response.status_code, response.headers)
+        if response.status_code != 200:
+            return response, None, None
+        content_type = response.headers.get("Content-Type")
+        if is_unsupported_content_type(content_type):
+            logger.info(f"Skipping {url}: unsupported content type `{content_type}`.")
+            return response, None, None
+
+        chunks = response.iter_content(_HEAD_SIZE)
+        head = next(chunks, b"")
+        kind = sniff_kind(content_type, head, url)
+        if kind is None:
+            logger.info(f"Skipping {url}: unsupported binary content.")
+            return response, None, None
+
+        if kind == "pdf":
+            sink = PdfSink(url, max_pdf_bytes)
+            complete = False
+            try:
+                complete = sink.check_length(_parse_length(response.headers.get("Content-Length"))) and sink.write(head)
+                if complete:
+                    for chunk in chunks:
+                        _check_deadline(url, deadline)
+                        if not sink.write(chunk):
+                            complete = False
+                            break
+            finally:
+                path = sink.finish(complete)
+            return response, kind, path
+
+        body = [head]
+        for chunk in chunks:
+            _check_deadline(url, deadline)
+            body.append(chunk)
+        return response, kind, b"".join(body)
+
+
+def fetch_document(
+    url: str,
+    max_pdf_bytes: Optional[int] = DEFAULT_MAX_PDF_BYTES,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = circuit_breaker
+):
+    """Download a document through the shared session and sniff its kind.
+
+    The response is streamed: its ``Content-Type`` and first bytes decide which
+    extractor handles it, with no extra request. Unsupported binaries (images,
+    archives, media) are dropped before their body is downloaded, and PDFs are
+    streamed into a temporary file instead of memory. Connection errors, timeouts
+    and retryable statuses are retried according to the retry policy.
+
+    Args:
+        url (str): URL of the document.
+        max_pdf_bytes (int, optional): PDFs larger than this are skipped. None
+            means unlimited. Defaults to 100 MiB.
+        policy (RetryPolicy, optional): Retry policy. Defaults to the shared one.
+        breaker (CircuitBreaker, optional): Circuit breaker of the hosts.
+            Defaults to the shared one.
+
+    Returns:
+        tuple: ``(response, kind, data)``. kind is the registered kind of the
+            document ('html', 'pdf', 'text', ...) and data its raw bytes, or the
+            path of a temporary file for PDFs, which the caller owns. Both are None
+            if the response is not successful or the document is not supported.
+
+    Raises:
+        FetchError: If every attempt failed or the circuit of the host is open.
+    """
+    policy = policy or retry_policy
+    return policy.call(url, lambda: _fetch_document_once(url, max_pdf_bytes, policy), breaker)
+
+
+async def _fetch_document_once_async(url: str, session, max_pdf_bytes: Optional[int], policy: RetryPolicy):
+    await rate_limiter.wait_async(url)
+    async with session.get(url, timeout=policy.client_timeout()) as response:
+        policy.check_status(url, response.status, response.headers)
+        if response.status != 200:
+            return response, None, None
+        content_type = response.headers.get("Content-Type")
+        if is_unsupported_content_type(content_type):
+            logger.info(f"Skipping {url}: unsupported content type `{content_type}`.")
+            return response, None, None
+
+        head = await response.content.read(_HEAD_SIZE)
+        kind = sniff_kind(content_type, head, url)
+        if kind is None:
+            logger.info(f"Skipping {url}: unsupported binary content.")
+            return response, None, None
+
+        if kind == "pdf":
+            sink = PdfSink(url, max_pdf_bytes)
+            complete = False
+            try:
+                complete = sink.check_length(response.content_length) and sink.write(head)
+                if complete:
+                    async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+                        if not sink.write(chunk):
+                            complete = False
+                            break
+            finally:
+                path = sink.finish(complete)
+            return response, kind, path
+
+        return response, kind, head + await response.content.read()
+
+
+async def fetch_document_async(
+    url: str,
+    session,
+    max_pdf_bytes: Optional[int] = DEFAULT_MAX_PDF_BYTES,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = circuit_breaker
+):
+    """Download a document through an ``aiohttp.ClientSession`` and sniff its kind.
+
+    Args:
+        url (str): URL of the document.
+        session (aiohttp.ClientSession): Session of the crawl.
+        max_pdf_bytes (int, optional): PDFs larger than this are skipped. None
+            means unlimited. Defaults to 100 MiB.
+        policy (RetryPolicy, optional): Retry policy. Defaults to the shared one.
+        breaker (CircuitBreaker, optional): Circuit breaker of the hosts.
+            Defaults to the shared one.
+
+    Returns:
+        tuple: ``(response, kind, data)``, see ``fetch_document``.
+
+    Raises:
+        FetchError: If every attempt failed or the circuit of the host is open.
+    """
+    policy = policy or retry_policy
+    return await policy.call_async(
+        url,
+        lambda: _fetch_document_once_async(url, session, max_pdf_bytes, policy),
+        breaker
+    )
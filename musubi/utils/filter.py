@@ -39,7 +39,8 @@ def filter_null_data(path):
             except orjson.JSONDecodeError:
                 continue
 
-            if json_data.get("content") is not None:
+            # near duplicates are kept so that their pages are not crawled again
+            if (json_data.get("content") is not None) or (json_data.get("duplicate_of") is not None):
                 outfile.write(orjson.dumps(json_data).decode("utf-8") + "\n")
 
     os.replace(tmp_path, path)
\ No newline at end of file
@@ -1,3 +1,4 @@
+import os
 import orjson
 from typing import List, Optional, Union
 from loguru import logger
@@ -6,8 +7,9 @@ from tqdm import tqdm
 from pathlib import Path
 from urllib.parse import urlparse
 import re
-import requests
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
+from .http import get_session
+from .parser import make_soup
 
 
 def is_valid_format(
@@ -47,7 +49,7 @@ def add_new_website(
     prefix: str = None,
     suffix: str = None,
     root_path: Optional[str] = None,
-    pages: int = None,
+    pages: Union[int, str] = None,
     block1: list = None,
     block2: Optional[List] = None,
     img_txt_block: Optional[List] = None,
@@ -55,7 +57,12 @@ def add_new_website(
     async_: bool = False,
     page_init_val: int = 1,
     multiplier: int = 1,
-    update: Optional[bool] = True
+    update: Optional[bool] = True,
+    rate_limit: Optional[float] = None,
+    burst: Optional[int] = None,
+    url_pattern: Optional[str] = None,
+    since: Optional[str] = None,
+    feed: Optional[str] = None
 ):
     """Add a new website configuration to the website configuration file.
 
@@ -80,24 +87,39 @@ def add_new_website(
             Defaults to None.
         root_path (str, optional): Root domain path for constructing absolute URLs
             from relative links. Defaults to None.
-        pages (int): Number of pages to crawl or scroll/click times. Required parameter.
+        pages (int or str): Number of pages to crawl or scroll/click times. Required
+            parameter, except for the 'sitemap' and 'feed' implementations. For
+            'scan', 'auto' saves ``auto_pages`` instead, and the number of pages is
+            found by the first crawl and written back. Defaults to None.
         block1 (list): List containing [tag_name, class_name] for the primary HTML
-            block selector. Required parameter.
+            block selector. Required parameter, except for the 'sitemap' and
+            'feed' implementations.
         block2 (list, optional): List containing [tag_name, class_name] for a nested
             HTML block selector or clickable button. Defaults to None.
         img_txt_block (list, optional): List of selectors for extracting image-text
             pairs. If provided, only this and common parameters are saved.
             Defaults to None.
         implementation (str): Crawler type to use. Must be one of 'scan', 'scroll',
-            'onepage', or 'click'. Required parameter.
-        async_ (bool, optional): Whether to use asynchronous crawling. Only saved
-            when img_txt_block is None. Defaults to False.
+            'onepage', 'click', 'sitemap', or 'feed'. Required parameter.
+        async_ (bool, optional): Whether to use asynchronous crawling.
+            Defaults to False.
         page_init_val (int, optional): Initial value for page numbering. Only saved
             when img_txt_block is None. Defaults to 1.
         multiplier (int, optional): Multiplier for page numbers in URL generation.
             Only saved when img_txt_block is None. Defaults to 1.
         update (bool, optional): Flag indicating whether this configuration should
             be updated. Defaults to True.
+        rate_limit (float, optional): Maximum number of requests per second sent
+            to the website. If None, the default per-host limit is used.
+            Defaults to None.
+        burst (int, optional): Number of requests allowed at once after an idle
+            period when rate_limit is set. Defaults to None.
+        url_pattern (str, optional): Regular expression the links found in the
+            sitemaps should match. Only used by 'sitemap'. Defaults to None.
+        since (str, optional): ISO date; only sitemap entries modified after it
+            are crawled. Only used by 'sitemap'. Defaults to None.
+        feed (str, optional): URL of the RSS / Atom feed of the website, polled
+            instead of the listing pages in update mode. Defaults to None.
 
     Returns:
         int: The index (idx) assigned to the newly added website configuration.
@@ -107,7 +129,8 @@ def add_new_website(
         - If idx already exists or is None, a new unique index is automatically assigned.
         - If `dir_` and `name` are not provided, the function attempts to extract them
           by parsing the website's <title> tag.
-        - For 'scan' implementation, uses the second page URL for title parsing.
+        - For 'scan' implementation, uses the second page URL for title parsing,
+          and for 'sitemap' and 'feed' the home page of the website.
         - The configuration is saved in JSONL format with one entry per line.
         - Two different configuration formats are used depending on whether
           img_txt_block is provided.
@@ -136,14 +159,26 @@ def add_new_website(
         default_folder.mkdir(parents=True, exist_ok=True)
         idx = 0
 
-    if not (prefix and pages and block1 and implementation) and idx is not None:
+    auto_pages = None
+    if pages == "auto":
+        if implementation != "scan":
+            raise ValueError("Only the `scan` implementation can find its number of pages automatically.")
+        # the column stays numeric, the number of pages is found by the first crawl
+        pages, auto_pages = None, True
+
+    if implementation in ["sitemap", "feed"]:
+        is_complete = bool(prefix)
+    else:
+        is_complete = bool(prefix and (pages or auto_pages) and block1 and implementation)
+    if not is_complete and idx is not None:
         raise ValueError("Essential information for crawling website is not complete, please check carefully before changing config json file.")
     
     if dir_ is None or name is None:
-        if implementation in ["onepage", "click", "scroll"]:
+        if implementation in ["onepage", "click", "scroll", "sitemap", "feed"]:
+            title_url = get_root_path(prefix) if implementation in ["sitemap", "feed"] else prefix
             try:
-                response = requests.get(prefix)
-                soup = BeautifulSoup(response.text, "html.parser")
+                response = get_session().get(title_url)
+                soup = make_soup(response.text, parse_only=SoupStrainer("title"))
                 title_text = soup.title.string
             except Exception:
                 logger.error("Failed to parse title. Please input 'dir_' and 'name' arguments.")
@@ -154,8 +189,8 @@ def add_new_website(
             else:
                 url = prefix + str((page_init_val + 1) * multiplier)
             try:
-                response = requests.get(url)
-                soup = BeautifulSoup(response.text, "html.parser")
+                response = get_session().get(url)
+                soup = make_soup(response.text, parse_only=SoupStrainer("title"))
                 title_text = soup.title.string
             except Exception:
                 logger.error("Failed to parse title. Please input 'dir_' and 'name' arguments.")
@@ -184,11 +219,18 @@ def add_new_website(
             "suffix": suffix,
             "root_path": root_path,
             "pages": pages,
+            "auto_pages": auto_pages,
             "block1": block1,
             "block2": block2,
             "img_txt_block": img_txt_block,
             "implementation": implementation,
-            "update": update
+            "async_": async_,
+            "update": update,
+            "rate_limit": rate_limit,
+            "burst": burst,
+            "url_pattern": url_pattern,
+            "since": since,
+            "feed": feed
         }
     else:
         dictt = {
@@ -200,13 +242,19 @@ def add_new_website(
             "suffix": suffix,
             "root_path": root_path,
             "pages": pages,
+            "auto_pages": auto_pages,
             "block1": block1,
             "block2": block2,
             "implementation": implementation,
             "async_": async_,
             "page_init_val": page_init_val,
             "multiplier": multiplier,
-            "update": update
+            "update": update,
+            "rate_limit": rate_limit,
+            "burst": burst,
+            "url_pattern": url_pattern,
+            "since": since,
+            "feed": feed
         }
     with open(website_config_path, "ab") as file:
         file.write(orjson.dumps(dictt, option=orjson.OPT_NON_STR_KEYS) + b"\n")
@@ -214,6 +262,47 @@ def add_new_website(
     return idx
 
 
+def update_website_config(
+    idx: int,
+    values: dict,
+    website_config_path = Path("config") / "websites.json"
+):
+    """Update fields of the website configuration with the given index in place.
+
+    Other lines of the file are kept byte for byte, and the file is replaced
+    atomically.
+
+    Args:
+        idx (int): Value of the ``idx`` field of the website configuration.
+        values (dict): Fields to set, e.g. ``{"pages": 120}``.
+        website_config_path (optional): Path to the websites configuration file.
+            Defaults to Path("config") / "websites.json".
+
+    Raises:
+        ValueError: If no website configuration has this index.
+    """
+    website_config_path = Path(website_config_path)
+    with open(website_config_path, "rb") as file:
+        lines = file.read().splitlines()
+
+    found = False
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        config = orjson.loads(line)
+        if config.get("idx") == idx:
+            config.update(values)
+            lines[i] = orjson.dumps(config, option=orjson.OPT_NON_STR_KEYS)
+            found = True
+    if not found:
+        raise ValueError("No website with idx {} in {}.".format(idx, website_config_path))
+
+    tmp_path = website_config_path.with_name(website_config_path.name + ".tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(b"\n".join(lines) + b"\n")
+    os.replace(tmp_path, website_config_path)
+
+
 def delete_website_config_by_idx(
     idx: int,
     website_config_path = Path("config") / "websites.json"
@@ -298,6 +387,67 @@ def get_root_path(url: str):
     return root_path
 
 
+def iter_jsonl(
+    path: str,
+    key: Optional[str] = None,
+    start_idx: int = 0,
+    start_offset: int = 0,
+    offsets: bool = False
+):
+    """Lazily iterate over the records of a JSONL file.
+
+    Unlike ``pd.read_json(..., lines=True)``, the file is read line by line so
+    memory usage stays flat regardless of the size of the file.
+
+    Args:
+        path (str): Path of the JSONL file.
+        key (str, optional): If given, yield ``record[key]`` instead of the
+            whole record. Defaults to None.
+        start_idx (int, optional): Number of records to skip from the beginning
+            of the file, or from start_offset. Defaults to 0.
+        start_offset (int, optional): Byte offset of the line to start reading
+            from, e.g. one yielded with ``offsets=True`` before. Defaults to 0.
+        offsets (bool, optional): If True, yield ``(offset, record)`` tuples where
+            offset is the byte offset of the line in the file. Defaults to False.
+
+    Yields:
+        dict or Any: Each record of the file, or the value under ``key``.
+
+    Note:
+        - Blank lines are ignored and do not count towards ``start_idx``, which
+          keeps the indexing consistent with ``pd.read_json``.
+    """
+    idx = 0
+    offset = start_offset
+    with open(path, "rb") as file:
+        file.seek(start_offset)
+        for line in file:
+            line_offset = offset
+            offset += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            if idx >= start_idx:
+                record = orjson.loads(line)
+                value = record[key] if key is not None else record
+                yield (line_offset, value) if offsets else value
+            idx += 1
+
+
+def iter_file_chunks(path: Union[str, Path], chunk_size: int = 1024 * 1024):
+    """Lazily iterate over the bytes of a file, chunk_size bytes at a time.
+
+    Used to archive large documents, such as the PDFs streamed into temporary
+    files, without reading them into memory.
+    """
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
 if __name__ == "__main__":
     url = "https://www.wsdiscuss.com/category/market-dynamics/world-economy/page/"
     res = get_root_path(url)
@@ -0,0 +1,124 @@
+import threading
+import requests
+import aiohttp
+from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/120.0.0.0 Safari/537.36"
+}
+
+_http_config = {
+    "pool_connections": 32,
+    "pool_maxsize": 32,
+    "headers": DEFAULT_HEADERS,
+}
+_session = None
+_session_lock = threading.Lock()
+
+
+def configure_http(
+    pool_connections: Optional[int] = None,
+    pool_maxsize: Optional[int] = None,
+    headers: Optional[Dict[str, str]] = None
+):
+    """Configure the shared synchronous HTTP session.
+
+    The current session is closed and a new one is created with the given
+    settings on the next call to ``get_session``.
+
+    Args:
+        pool_connections (int, optional): Number of hosts whose connection pools
+            are kept. Defaults to None, keeping the current value (32).
+        pool_maxsize (int, optional): Maximum number of kept-alive connections
+            per host. Defaults to None, keeping the current value (32).
+        headers (dict, optional): Default headers sent with every request.
+            Defaults to None, keeping the current headers.
+    """
+    global _session
+    if pool_connections is not None:
+        _http_config["pool_connections"] = pool_connections
+    if pool_maxsize is not None:
+        _http_config["pool_maxsize"] = pool_maxsize
+    if headers is not None:
+        _http_config["headers"] = headers
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_session():
+    """Return the ``requests.Session`` shared by all synchronous fetchers.
+
+    Connections are pooled per host and kept alive between requests, so the
+    TCP/TLS handshake (and DNS lookup) is only paid once per connection instead
+    of once per page.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=_http_config["pool_connections"],
+                    pool_maxsize=_http_config["pool_maxsize"]
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(_http_config["headers"])
+                _session = session
+    return _session
+
+
+def create_async_session(
+    limit: int = 100,
+    limit_per_host: int = 0,
+    ttl_dns_cache: Optional[int] = 300,
+    keepalive_timeout: float = 30,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[aiohttp.ClientTimeout] = None
+):
+    """Create a pooled ``aiohttp.ClientSession`` for asynchronous fetchers.
+
+    One session should be created per crawl and shared by every request of that
+    crawl. It must be created inside a running event loop and closed afterwards,
+    preferably with ``async with``.
+
+    Args:
+        limit (int, optional): Maximum number of simultaneous connections.
+            Defaults to 100.
+        limit_per_host (int, optional): Maximum number of simultaneous
+            connections to one host, 0 means no limit. Defaults to 0.
+        ttl_dns_cache (int, optional): Seconds DNS lookups are cached.
+            Defaults to 300.
+        keepalive_timeout (float, optional): Seconds an idle connection is kept
+            alive. Defaults to 30.
+        headers (dict, optional): Default headers. Defaults to the headers of
+            the shared synchronous session.
+        timeout (aiohttp.ClientTimeout, optional): Timeouts of the session.
+            Defaults to aiohttp's default timeout.
+
+    Returns:
+        aiohttp.ClientSession: The session.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        ttl_dns_cache=ttl_dns_cache,
+        keepalive_timeout=keepalive_timeout
+    )
+    kwargs = {}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=headers if headers is not None else _http_config["headers"],
+        **kwargs
+    )
@@ -0,0 +1,156 @@
+import asyncio
+import aiohttp
+from typing import Optional
+from urllib.parse import urljoin
+from loguru import logger
+from .parser import BlockSelector
+from .rate_limit import rate_limiter
+from .retry import RetryPolicy, retry_policy
+
+
+DEFAULT_PROBE_BYTES = 64 * 1024
+# lazy-loading pages keep the real address in a data attribute and a placeholder in src
+_SRC_ATTRS = ("src", "data-src", "data-original", "data-lazy-src")
+# JPEG start-of-frame markers, which hold the dimensions of the image
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _get_src(attrs):
+    for attr in _SRC_ATTRS:
+        src = attrs.get(attr)
+        if src and (not src.startswith("data:")):
+            return src.strip()
+    return None
+
+
+def extract_image_text_pairs(content: str, url: str, img_txt_block: list):
+    """Extract the images and their captions from the image-text block of a page.
+
+    Args:
+        content (str): HTML of the page.
+        url (str): URL of the page, against which relative image addresses are
+            resolved.
+        img_txt_block (list): ``[tag_name, class_name]`` of the block holding the
+            images.
+
+    Returns:
+        list: One ``{"img_url", "caption", "url"}`` dict per image, where img_url is
+            absolute and caption is the ``alt`` text of the image.
+    """
+    img_attrs = BlockSelector(img_txt_block).attrs(content, "img")
+    if img_attrs is None:
+        logger.warning(f"No image-text block found in {url}.")
+        return []
+    img_list = []
+    for attrs in img_attrs:
+        src = _get_src(attrs)
+        if src is None:
+            continue
+        img_list.append({"img_url": urljoin(url, src), "caption": attrs.get("alt"), "url": url})
+    return img_list
+
+
+def parse_image_size(data: bytes):
+    """Read the format and dimensions of an image from its first bytes.
+
+    PNG, GIF, JPEG, WebP and BMP are supported. For JPEG, the dimensions come
+    after the metadata segments, so the first 64 KiB are usually needed.
+
+    Args:
+        data (bytes): First bytes of the image.
+
+    Returns:
+        tuple: ``(format, width, height)``, or None if the format is not supported
+            or data is too short.
+    """
+    if data.startswith(b"\x89PNG\r\n\x1a\n") and (len(data) >= 24):
+        return "png", int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+    if data[:6] in (b"GIF87a", b"GIF89a") and (len(data) >= 10):
+        return "gif", int.from_bytes(data[6:8], "little"), int.from_bytes(data[8:10], "little")
+    if data.startswith(b"BM") and (len(data) >= 26):
+        return "bmp", int.from_bytes(data[18:22], "little", signed=True), abs(int.from_bytes(data[22:26], "little", signed=True))
+    if data.startswith(b"RIFF") and (data[8:12] == b"WEBP") and (len(data) >= 30):
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            return "webp", int.from_bytes(data[26:28], "little") & 0x3FFF, int.from_bytes(data[28:30], "little") & 0x3FFF
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return "webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return "webp", int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+        return None
+    if data.startswith(b"\xff\xd8"):
+        i = 2
+        while i + 9 <= len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            if (marker == 0xFF) or (marker == 0x01) or (0xD0 <= marker <= 0xD8):
+                # fill byte or marker without payload
+                i += 1 if marker == 0xFF else 2
+                continue
+            if marker in _JPEG_SOF:
+                return "jpeg", int.from_bytes(data[i + 7:i + 9], "big"), int.from_bytes(data[i + 5:i + 7], "big")
+            i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+
+def _parse_total_size(response):
+    content_range = response.headers.get("Content-Range")
+    if content_range and ("/" in content_range):
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    if response.status == 200:
+        return response.content_length
+    return None
+
+
+async def probe_image_async(
+    url: str,
+    session: aiohttp.ClientSession,
+    probe_bytes: int = DEFAULT_PROBE_BYTES,
+    policy: Optional[RetryPolicy] = None
+):
+    """Fetch the size and dimensions of an image without downloading it.
+
+    A range request asks for the first probe_bytes bytes only, and the total size
+    is read from ``Content-Range``. Servers ignoring ranges answer with the whole
+    image, of which only the first bytes are read before the connection is
+    released. Probing is best effort: it goes through the per-host rate limit but
+    is not retried, and failures are logged and return an empty dict.
+
+    Args:
+        url (str): URL of the image.
+        session (aiohttp.ClientSession): Session of the crawl.
+        probe_bytes (int, optional): Number of bytes read to find the dimensions.
+            Defaults to 64 KiB.
+        policy (RetryPolicy, optional): Policy whose timeouts are used. Defaults
+            to the shared one.
+
+    Returns:
+        dict: ``img_bytes`` (total size in bytes), ``img_format``, ``img_width``
+            and ``img_height``, each None if unknown, or an empty dict if the image
+            could not be fetched.
+    """
+    policy = policy or retry_policy
+    await rate_limiter.wait_async(url)
+    headers = {"Range": "bytes=0-{}".format(probe_bytes - 1)}
+    try:
+        async with session.get(url, headers=headers, timeout=policy.client_timeout()) as response:
+            if response.status not in (200, 206):
+                logger.debug(f"Failed to probe image {url}: status {response.status}.")
+                return {}
+            head = b""
+            while len(head) < probe_bytes:
+                chunk = await response.content.read(probe_bytes - len(head))
+                if not chunk:
+                    break
+                head += chunk
+            total = _parse_total_size(response)
+    except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+        logger.debug(f"Failed to probe image {url}: {e}")
+        return {}
+
+    img_format, width, height = parse_image_size(head) or (None, None, None)
+    return {"img_bytes": total, "img_format": img_format, "img_width": width, "img_height": height}
@@ -0,0 +1,325 @@
+import os
+import time
+import asyncio
+import orjson
+from pathlib import Path
+from typing import Callable, Optional, Union
+from loguru import logger
+
+
+_TAIL_SIZE = 64
+
+
+def get_journal_path(url_path: Union[str, Path], stage: str):
+    """Return the path of the progress journal of a crawl stage ('link' or 'content').
+
+    Journals live next to the ``*_link.json`` file of the website, like its
+    seen-URL index.
+    """
+    return Path(url_path).with_suffix(".{}.journal".format(stage))
+
+
+def _read_tail(path: Union[str, Path], offset: int):
+    start = max(0, offset - _TAIL_SIZE)
+    with open(path, "rb") as file:
+        file.seek(start)
+        return file.read(offset - start).hex()
+
+
+class CrawlJournal:
+    """An append-only journal of the progress of one crawl run.
+
+    Items are identified by increasing integer keys (page indices for link crawls,
+    byte offsets of the lines of the link file for content crawls). Items are
+    journaled as started when they are handed to a worker, and as completed or
+    failed when their result has been written. From that, the journal keeps a
+    low-water mark below which every item is finished, plus the finished items
+    above it, which only exist while results come back out of order (e.g. from
+    the asynchronous crawlers). A restarted crawl seeks straight to the low-water
+    mark, skips the finished items above it and re-crawls the items which were in
+    flight when it stopped.
+
+    Events are buffered and appended in batches. ``on_checkpoint`` is called
+    before every batch so that the output writer can be flushed first: an item is
+    never journaled as finished before its result is on disk. Every
+    ``compact_every`` events, the journal is rewritten into a single snapshot, so
+    opening it costs the same however long the crawl has been running.
+
+    Args:
+        path (str or Path): Path of the journal.
+        source_path (str or Path, optional): File the keys are byte offsets of.
+            If the bytes before the low-water mark changed since the last run
+            (e.g. the file was rewritten by ``deduplicate_by_value``), the journal
+            is discarded. Defaults to None.
+        run (dict, optional): Settings of the run the keys refer to, e.g. the
+            listing pages of a link crawl. A journal written by a run with other
+            settings is discarded, as its keys would not designate the same items.
+            Defaults to None.
+        on_checkpoint (Callable, optional): Called before buffered events are
+            appended. Defaults to None.
+        checkpoint_every (int, optional): Number of buffered events that triggers
+            a checkpoint. Defaults to 1000.
+        checkpoint_interval (float, optional): Maximum number of seconds an event
+            stays buffered. Defaults to 5.
+        compact_every (int, optional): Number of appended events that triggers a
+            compaction. Defaults to 100000.
+        auto_checkpoint (bool, optional): If False, events are only buffered, and
+            the caller checkpoints when ``checkpoint_due`` returns True, e.g. with
+            ``checkpoint_async`` so that an event loop does not wait for the
+            output to be flushed. Defaults to True.
+
+    Example:
+        ::
+
+            with CrawlJournal(get_journal_path(url_path, "link"), on_checkpoint=writer.flush) as journal:
+                for i in range(journal.low_water, length):
+                    if journal.is_finished(i):
+                        continue
+                    journal.start(i)
+                    ...
+                    journal.complete(i)
+                journal.finish()
+    """
+    def __init__(
+        self,
+        path: Union[str, Path],
+        source_path: Optional[Union[str, Path]] = None,
+        run: Optional[dict] = None,
+        on_checkpoint: Optional[Callable] = None,
+        checkpoint_every: int = 1000,
+        checkpoint_interval: float = 5.0,
+        compact_every: int = 100000,
+        auto_checkpoint: bool = True
+    ):
+        self.path = Path(path)
+        self.source_path = source_path
+        self.run = run
+        self.on_checkpoint = on_checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+        self.compact_every = compact_every
+        self.auto_checkpoint = auto_checkpoint
+        self.checkpointing = False
+
+        self.low_water = 0
+        self.last_started = None
+        self.in_flight = set()
+        self.finished = set()
+        self.completed = 0
+        self.failed = 0
+        self.buffer = []
+        self.events = 0
+        self.last_checkpoint = time.monotonic()
+        self.file = None
+
+        self.resumed = self._load()
+        if self.resumed:
+            logger.info(
+                f"Resuming from {self.path.name}: {self.completed} completed, {self.failed} failed, "
+                f"{len(self.in_flight)} in flight."
+            )
+        # items in flight when the last run stopped stay in flight, and so below
+        # the low-water mark, until they are crawled again
+        self.compact()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _load(self):
+        if not self.path.is_file():
+            return False
+        with open(self.path, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    # torn write of a crash
+                    break
+                try:
+                    event = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    break
+                if "lwm" in event:
+                    if (self.run is not None) and (event.get("run") != self.run):
+                        logger.warning(f"{self.path.name} was written by another run, discarding it.")
+                        self._reset()
+                        return False
+                    self.low_water = event["lwm"]
+                    self.last_started = event.get("last")
+                    self.finished = set(event.get("done", ()))
+                    self.in_flight = set(event.get("flight", ()))
+                    self.completed = event.get("completed", 0)
+                    self.failed = event.get("failed", 0)
+                    tail = event.get("tail")
+                    if (self.source_path is not None) and (not self._check_source(tail)):
+                        logger.warning(f"{self.source_path} was rewritten, discarding {self.path.name}.")
+                        self._reset()
+                        return False
+                elif "s" in event:
+                    self._start(event["s"])
+                elif "c" in event:
+                    self._finish(event["c"])
+                    self.completed += 1
+                elif "f" in event:
+                    self._finish(event["f"])
+                    self.failed += 1
+        self._advance()
+        return True
+
+    def _check_source(self, tail: Optional[str]):
+        if not os.path.isfile(self.source_path):
+            return self.low_water == 0
+        if os.path.getsize(self.source_path) < self.low_water:
+            return False
+        return _read_tail(self.source_path, self.low_water) == (tail or "")
+
+    def _reset(self):
+        self.low_water = 0
+        self.last_started = None
+        self.in_flight = set()
+        self.finished = set()
+        self.completed = 0
+        self.failed = 0
+
+    def _start(self, key: int):
+        self.in_flight.add(key)
+        if (self.last_started is None) or (key > self.last_started):
+            self.last_started = key
+
+    def _finish(self, key: int):
+        self.in_flight.discard(key)
+        self.finished.add(key)
+        if (self.last_started is None) or (key > self.last_started):
+            self.last_started = key
+
+    def _advance(self):
+        if self.in_flight:
+            low_water = min(self.in_flight)
+        elif self.last_started is not None:
+            # keys are started in increasing order, so everything up to the last one is finished
+            low_water = self.last_started
+        else:
+            return
+        if low_water > self.low_water:
+            self.low_water = low_water
+            self.finished = {key for key in self.finished if key >= low_water}
+
+    def is_finished(self, key: int):
+        """Return True if the item has been completed or has failed in this run."""
+        return (key < self.low_water) or (key in self.finished)
+
+    def start(self, key: int):
+        """Journal an item as handed to a worker. Keys must be started in increasing order."""
+        self._start(key)
+        self._append({"s": key})
+
+    def complete(self, key: int):
+        """Journal an item whose result has been written."""
+        self._finish(key)
+        self.completed += 1
+        self._append({"c": key})
+
+    def fail(self, key: int):
+        """Journal an item which failed for good, e.g. recorded as a dead letter."""
+        self._finish(key)
+        self.failed += 1
+        self._append({"f": key})
+
+    def _append(self, event: dict):
+        self.buffer.append(orjson.dumps(event) + b"\n")
+        if self.auto_checkpoint and self.checkpoint_due():
+            self.checkpoint()
+
+    def checkpoint_due(self):
+        """Return True if enough events are buffered, or for long enough, to checkpoint."""
+        return bool(self.buffer) and (
+            (len(self.buffer) >= self.checkpoint_every)
+            or (time.monotonic() - self.last_checkpoint >= self.checkpoint_interval)
+        )
+
+    def _append_batch(self, batch: bytes):
+        if self.on_checkpoint is not None:
+            self.on_checkpoint()
+        self.file.write(batch)
+        self.file.flush()
+
+    def checkpoint(self):
+        """Append the buffered events to the journal, after calling on_checkpoint."""
+        self.last_checkpoint = time.monotonic()
+        if not self.buffer:
+            return
+        self._append_batch(b"".join(self.buffer))
+        self.events += len(self.buffer)
+        self.buffer.clear()
+        if self.events >= self.compact_every:
+            self.compact()
+
+    async def checkpoint_async(self):
+        """Same as ``checkpoint``, but on_checkpoint and the append run in a thread.
+
+        Events journaled while the batch is being appended are kept for the next
+        checkpoint, and a checkpoint already in progress makes this one a no-op.
+        """
+        if self.checkpointing:
+            return
+        self.last_checkpoint = time.monotonic()
+        if not self.buffer:
+            return
+        # the events of the batch are taken on the event loop, new ones go to a fresh buffer
+        batch, self.buffer = self.buffer, []
+        self.checkpointing = True
+        try:
+            await asyncio.to_thread(self._append_batch, b"".join(batch))
+        except BaseException:
+            self.buffer = batch + self.buffer
+            raise
+        finally:
+            self.checkpointing = False
+        self.events += len(batch)
+        if self.events >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the journal into a single snapshot of the progress."""
+        if self.file is not None:
+            self.file.close()
+        self._advance()
+        snapshot = {
+            "lwm": self.low_water,
+            "last": self.last_started,
+            "done": sorted(self.finished),
+            "flight": sorted(self.in_flight),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+        if self.run is not None:
+            snapshot["run"] = self.run
+        if (self.source_path is not None) and os.path.isfile(self.source_path):
+            snapshot["tail"] = _read_tail(self.source_path, min(self.low_water, os.path.getsize(self.source_path)))
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "wb") as file:
+            file.write(orjson.dumps(snapshot) + b"\n")
+        os.replace(tmp_path, self.path)
+        self.file = open(self.path, "ab")
+        self.events = 0
+
+    def finish(self):
+        """Remove the journal once the run has gone through every item."""
+        self.buffer.clear()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.path.is_file():
+            os.remove(self.path)
+        logger.info(f"Crawl finished: {self.completed} completed, {self.failed} failed.")
+
+    def close(self):
+        """Checkpoint and close the journal, keeping it for the next run."""
+        if self.file is None:
+            return
+        try:
+            self.checkpoint()
+        finally:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,280 @@
+import os
+import sqlite3
+import tempfile
+import orjson
+import numpy as np
+from pathlib import Path
+from typing import Optional, Union
+from loguru import logger
+from .seen import hash_url
+
+
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+# polynomial base of the shingle hash and constants of the splitmix64 finalizer
+_BASE = np.uint64(1000003)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+_COMMIT_EVERY = 1000
+
+
+def _normalize(text: str):
+    return " ".join(text.lower().split())
+
+
+def _mix(x: np.ndarray):
+    x = x + _GOLDEN
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def simhash(text: str, shingle_size: int = 5):
+    """Compute the 64-bit SimHash of a text from its character shingles.
+
+    The text is lower-cased and its whitespace collapsed, then every run of
+    shingle_size characters is hashed. Character shingles work for languages
+    written without spaces (e.g. Chinese) as well as for English. Hashing is
+    vectorized with numpy, so an article costs about a millisecond.
+
+    Args:
+        text (str): Text to fingerprint.
+        shingle_size (int, optional): Number of characters of a shingle.
+            Defaults to 5.
+
+    Returns:
+        int: The unsigned 64-bit fingerprint. Near-duplicate texts have
+            fingerprints within a small Hamming distance.
+    """
+    text = _normalize(text)
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype="<u4").astype(np.uint64)
+    if len(codes) < shingle_size:
+        shingle_size = max(1, len(codes))
+    count = len(codes) - shingle_size + 1
+    if count <= 0:
+        return 0
+
+    with np.errstate(over="ignore"):
+        hashes = np.zeros(count, dtype=np.uint64)
+        for i in range(shingle_size):
+            hashes = hashes * _BASE + codes[i:i + count]
+        hashes = _mix(hashes)
+
+    bits = np.unpackbits(hashes.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > count
+    return int.from_bytes(np.packbits(majority, bitorder="little").tobytes(), "little")
+
+
+def hamming_distance(a: int, b: int):
+    """Return the number of differing bits of two fingerprints."""
+    return bin(a ^ b).count("1")
+
+
+def _to_signed(value: int):
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value: int):
+    return value + (1 << 64) if value < 0 else value
+
+
+class NearDuplicateIndex:
+    """A persistent SimHash index finding near-duplicate documents, backed by SQLite.
+
+    Every document is reduced to a 64-bit SimHash, split into four 16-bit bands.
+    Two fingerprints within a Hamming distance of 3 share at least one band
+    exactly, so candidates are looked up by band in an on-disk index and only
+    those are compared bit by bit. Only fingerprints and URLs are stored, so the
+    index scales to tens of millions of documents, and one index can be shared by
+    every website to catch articles syndicated across sites.
+
+    Args:
+        db_path (str or Path): Path of the SQLite database.
+        max_distance (int, optional): Maximum Hamming distance between the
+            fingerprints of near duplicates, from 0 to 3. Defaults to 3.
+        shingle_size (int, optional): Number of characters of a shingle.
+            Defaults to 5.
+        min_length (int, optional): Texts shorter than this are too short to
+            fingerprint reliably and are never reported as duplicates.
+            Defaults to 200.
+        max_candidates (int, optional): Maximum number of documents compared per
+            band, bounding the cost of very common bands. Defaults to 1000.
+
+    Example:
+        ::
+
+            with NearDuplicateIndex("data/near_dup.db") as index:
+                original = index.add(url, content)
+                if original is not None:
+                    print(f"{url} duplicates {original}")
+    """
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        max_distance: int = 3,
+        shingle_size: int = 5,
+        min_length: int = 200,
+        max_candidates: int = 1000
+    ):
+        if not 0 <= max_distance < _BANDS:
+            raise ValueError("Argument `max_distance` should be between 0 and {} but got {}.".format(_BANDS - 1, max_distance))
+        self.db_path = db_path
+        self.max_distance = max_distance
+        self.shingle_size = shingle_size
+        self.min_length = min_length
+        self.max_candidates = max_candidates
+        self.pending = 0
+
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, url_hash INTEGER UNIQUE, url TEXT, fingerprint INTEGER)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS bands (band INTEGER, id INTEGER, PRIMARY KEY (band, id)) WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def _bands(self, fingerprint: int):
+        # the band index is kept in the key so that equal values of different bands do not collide
+        return [(i << _BAND_BITS) | ((fingerprint >> (i * _BAND_BITS)) & _BAND_MASK) for i in range(_BANDS)]
+
+    def fingerprint(self, text: Optional[str]):
+        """Return the SimHash of text, or None if it is too short to be compared."""
+        if (not text) or (len(text) < self.min_length):
+            return None
+        return simhash(text, self.shingle_size)
+
+    def find(self, fingerprint: int, url: Optional[str] = None):
+        """Return the URL of an indexed near duplicate of fingerprint, or None.
+
+        Args:
+            fingerprint (int): SimHash of the document.
+            url (str, optional): URL of the document, which never matches itself.
+                Defaults to None.
+        """
+        url_hash = hash_url(url) if url is not None else None
+        for band in self._bands(fingerprint):
+            rows = self.conn.execute(
+                "SELECT docs.url_hash, docs.url, docs.fingerprint FROM bands JOIN docs ON docs.id = bands.id "
+                "WHERE bands.band = ? LIMIT ?",
+                (band, self.max_candidates)
+            )
+            for candidate_hash, candidate_url, candidate in rows:
+                if candidate_hash == url_hash:
+                    continue
+                if hamming_distance(fingerprint, _to_unsigned(candidate)) <= self.max_distance:
+                    return candidate_url
+        return None
+
+    def add(self, url: str, text: Optional[str]):
+        """Check a document against the index and index it if it is not a near duplicate.
+
+        Args:
+            url (str): URL of the document.
+            text (str): Content of the document.
+
+        Returns:
+            str: The URL of the document it duplicates, or None if it is new (or too
+                short to be compared), in which case it has been indexed.
+        """
+        fingerprint = self.fingerprint(text)
+        if fingerprint is None:
+            return None
+        original = self.find(fingerprint, url)
+        if original is not None:
+            return original
+
+        cur = self.conn.execute(
+            "INSERT OR IGNORE INTO docs (url_hash, url, fingerprint) VALUES (?, ?, ?)",
+            (hash_url(url), url, _to_signed(fingerprint))
+        )
+        if cur.rowcount > 0:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO bands (band, id) VALUES (?, ?)",
+                [(band, cur.lastrowid) for band in self._bands(fingerprint)]
+            )
+            self.pending += 1
+            if self.pending >= _COMMIT_EVERY:
+                self.commit()
+        return None
+
+    def commit(self):
+        self.conn.commit()
+        self.pending = 0
+
+    def close(self):
+        """Commit and close the database."""
+        if self.conn is None:
+            return
+        self.commit()
+        self.conn.close()
+        self.conn = None
+
+
+def open_near_dup_index(db_path: Optional[Union[str, Path]]):
+    """Open the near-duplicate index at db_path, or return None if db_path is None."""
+    if db_path is None:
+        return None
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    return NearDuplicateIndex(db_path)
+
+
+def mark_near_duplicates(
+    path: Union[str, Path],
+    index: NearDuplicateIndex,
+    key: str = "content",
+    url_key: str = "url"
+):
+    """Mark the near-duplicate documents of a content JSONL file in one streaming pass.
+
+    Every record is checked against the index, and indexed if it is new. The
+    content of a near duplicate is replaced by None and the URL of the document
+    it duplicates is stored under ``duplicate_of``, so that the record still
+    tells the seen-URL index the page has been crawled. Records are read and
+    written one by one, so the file never has to fit in memory. Several files
+    (e.g. of different websites) can be passed through the same index.
+
+    Args:
+        path (str or Path): Path of the content JSONL file, rewritten in place.
+        index (NearDuplicateIndex): Index of the documents seen so far.
+        key (str, optional): Field holding the text. Defaults to 'content'.
+        url_key (str, optional): Field holding the URL. Defaults to 'url'.
+
+    Returns:
+        int: Number of newly marked near duplicates.
+    """
+    count = 0
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or None)
+    try:
+        with open(path, "rb") as infile, os.fdopen(fd, "wb") as outfile:
+            for line in infile:
+                line = line.strip()
+                if not line:
+                    continue
+                record = orjson.loads(line)
+                original = index.add(record.get(url_key), record.get(key))
+                if original is not None:
+                    record[key] = None
+                    record["duplicate_of"] = original
+                    count += 1
+                outfile.write(orjson.dumps(record) + b"\n")
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    index.commit()
+    logger.info(f"Marked {count} near duplicates in {path}.")
+    return count
@@ -0,0 +1,217 @@
+from typing import Callable, Optional, Union
+from urllib.parse import urlparse
+from loguru import logger
+from .http import get_session
+from .rate_limit import rate_limiter
+from .retry import RetryPolicy, CircuitBreaker, retry_policy, circuit_breaker
+
+
+AUTO_PAGES = "auto"
+DEFAULT_MAX_PAGES = 100000
+_RANGE_BYTES = 64 * 1024
+# statuses telling that a page does not exist, so that HEAD is enough
+_MISSING_STATUSES = (404, 410)
+
+
+def parse_pages(value: Union[str, int, None]):
+    """Parse a number of pages given as an int or as ``'auto'``, e.g. from the command line."""
+    if (value is None) or (value == AUTO_PAGES):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError("Number of pages should be an integer or `{}` but got `{}`.".format(AUTO_PAGES, value))
+
+
+def get_page_url(
+    prefix: str,
+    i: int,
+    suffix: Optional[str] = None,
+    page_init_val: int = 1,
+    multiplier: int = 1
+):
+    """Return the URL of the i-th listing page (starting at 0): ``prefix + (page_init_val + i) * multiplier + suffix``."""
+    url = prefix + str((page_init_val + i) * multiplier)
+    return url + suffix if suffix else url
+
+
+def _page_key(url: str):
+    parse = urlparse(url)
+    return (parse.path.rstrip("/"), parse.query)
+
+
+def _is_redirected_away(url: str, response):
+    # out-of-range pages are often redirected to the first page or the listing
+    return bool(response.history) and (_page_key(response.url) != _page_key(url))
+
+
+class PageProber:
+    """Find the links of listing pages with requests as cheap as the server allows.
+
+    A page is first requested with ``HEAD``, which is enough when the server
+    answers 404 or 410 past the last page. Otherwise only the first bytes of the
+    page are requested with a ``Range`` header, and the rest of it only if no link
+    was found in them. Each shortcut is dropped for the rest of the search as soon
+    as the server shows it does not support it (a 200 to a ``HEAD`` of an empty
+    page, or a 200 to a ranged request).
+
+    Args:
+        selector (BlockSelector): Selector of the blocks holding the links.
+        range_bytes (int, optional): Number of bytes of a ranged request.
+            Defaults to 64 KiB.
+        policy (RetryPolicy, optional): Retry policy. Defaults to the shared one.
+        breaker (CircuitBreaker, optional): Circuit breaker of the hosts.
+            Defaults to the shared one.
+    """
+    def __init__(
+        self,
+        selector,
+        range_bytes: int = _RANGE_BYTES,
+        policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = circuit_breaker
+    ):
+        self.selector = selector
+        self.range_bytes = range_bytes
+        self.policy = policy or retry_policy
+        self.breaker = breaker
+        self.use_head = True
+        self.use_range = True
+        self.requests = 0
+
+    def _send(self, method: str, url: str, headers: Optional[dict] = None):
+        def attempt():
+            rate_limiter.wait(url)
+            response = get_session().request(
+                method, url, headers=headers, allow_redirects=True, timeout=self.policy.timeout()
+            )
+            self.policy.check_status(url, response.status_code, response.headers)
+            return response
+
+        self.requests += 1
+        return self.policy.call(url, attempt, self.breaker)
+
+    def _read(self, url: str, response):
+        if (response.status_code not in (200, 206)) or _is_redirected_away(url, response):
+            return []
+        return self.selector.links(response.text)
+
+    def links(self, url: str):
+        """Return the links of the page at url, or an empty list if it is past the last page.
+
+        Raises:
+            FetchError: If a request still fails after retries.
+        """
+        if self.use_head:
+            response = self._send("HEAD", url)
+            if (response.status_code in _MISSING_STATUSES) or _is_redirected_away(url, response):
+                return []
+            if response.status_code in (405, 501):
+                self.use_head = False
+
+        links = None
+        if self.use_range:
+            # an encoded body cannot be decoded from its first bytes
+            headers = {"Range": "bytes=0-{}".format(self.range_bytes - 1), "Accept-Encoding": "identity"}
+            response = self._send("GET", url, headers)
+            if response.status_code == 206:
+                links = self._read(url, response) or None
+            else:
+                self.use_range = False
+                if response.status_code != 416:
+                    links = self._read(url, response)
+        if links is None:
+            # the blocks may start after the first bytes
+            links = self._read(url, self._send("GET", url))
+
+        if self.use_head and not links:
+            logger.debug(f"{url} is empty but HEAD succeeded, probing without HEAD.")
+            self.use_head = False
+        return links
+
+
+def find_last_page(
+    page_url: Callable[[int], str],
+    selector,
+    max_pages: int = DEFAULT_MAX_PAGES,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = circuit_breaker
+):
+    """Find the number of non-empty listing pages of a paginated website.
+
+    Pages are probed at exponentially growing distances from the first page
+    until one is past the end, then the last non-empty page is found by
+    binary search, so that an archive of n pages costs about ``2 * log2(n)`` probes
+    instead of n requests. A page is past the end if it is missing, redirected to
+    another page, or holds no link in its blocks. Websites serving the same page
+    for every out-of-range number (the first or the last one) are detected as well,
+    from two page numbers holding exactly the same links.
+
+    Args:
+        page_url (Callable[[int], str]): Function returning the URL of the i-th
+            page, starting at 0. See ``get_page_url``.
+        selector (BlockSelector): Selector of the blocks holding the links.
+        max_pages (int, optional): Upper bound of the result. Defaults to 100000.
+        policy (RetryPolicy, optional): Retry policy. Defaults to the shared one.
+        breaker (CircuitBreaker, optional): Circuit breaker of the hosts.
+            Defaults to the shared one.
+
+    Returns:
+        int: The number of pages, or 0 if the first page holds no link.
+
+    Raises:
+        FetchError: If a probe still fails after retries.
+
+    Example:
+        ::
+
+            selector = BlockSelector(["div", "entry-image"])
+            pages = find_last_page(lambda i: get_page_url("https://example.com/news?page=", i), selector)
+    """
+    prober = PageProber(selector, policy=policy, breaker=breaker)
+    contents = {}
+    first_index = {}
+    repeated = set()
+
+    def probe(i: int):
+        links = tuple(prober.links(page_url(i)))
+        contents[i] = links
+        if links:
+            if (links in first_index) and (first_index[links] != i):
+                repeated.add(links)
+            first_index[links] = min(i, first_index.get(links, i))
+
+    def is_full(i: int):
+        # the first page is kept even if out-of-range pages repeat it
+        return bool(contents[i]) and ((i == 0) or (contents[i] not in repeated))
+
+    def bounds():
+        # the last page known to be full and the first one known to be past the end;
+        # recomputed after every probe, as a repeated page turns earlier probes around
+        past = [i for i in contents if not is_full(i)]
+        hi = min(past) if past else None
+        lo = max((i for i in contents if is_full(i) and ((hi is None) or (i < hi))), default=-1)
+        return lo, hi
+
+    probe(0)
+    step = 1
+    while True:
+        lo, hi = bounds()
+        if hi is None:
+            if lo + 1 >= max_pages:
+                logger.warning(f"Every probed page up to {page_url(lo)} holds links, stopping at {max_pages} pages.")
+                break
+            i = min(lo + step, max_pages - 1)
+            step *= 2
+        elif hi - lo <= 1:
+            break
+        else:
+            i = (lo + hi) // 2
+        probe(i)
+
+    lo, hi = bounds()
+    count = lo + 1
+    if (hi is not None) and (contents[hi] in repeated) and (first_index[contents[hi]] != 0):
+        # out-of-range pages repeat the last page, which is the first of them
+        count = hi + 1
+    logger.info(f"Found {count} pages from {page_url(0)} with {prober.requests} requests.")
+    return count
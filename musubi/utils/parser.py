@@ -0,0 +1,250 @@
+import re
+import lxml.html
+from lxml import etree
+from typing import List, Optional, Union
+from bs4 import BeautifulSoup, SoupStrainer
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+
+HTML_PARSERS = ("lxml", "selectolax", "html.parser")
+_TAG_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9_:-]*$")
+_html_parser = "lxml"
+
+
+def _check_parser(parser: str):
+    if parser not in HTML_PARSERS:
+        raise ValueError("Argument `parser` should be one of {} but got `{}`.".format(", ".join(HTML_PARSERS), parser))
+    if (parser == "selectolax") and (SelectolaxParser is None):
+        raise ImportError("The `selectolax` parser requires the selectolax package: `pip install selectolax`.")
+
+
+def configure_html_parser(parser: str):
+    """Set the HTML parser used by default to extract links and images from blocks.
+
+    Args:
+        parser (str): 'lxml' (the default), 'selectolax' (requires the optional
+            ``selectolax`` package) or 'html.parser' (BeautifulSoup with the
+            standard library parser).
+    """
+    global _html_parser
+    _check_parser(parser)
+    _html_parser = parser
+
+
+def get_html_parser():
+    """Return the name of the HTML parser used by default."""
+    return _html_parser
+
+
+def make_soup(html: Union[str, bytes], parse_only: Optional[SoupStrainer] = None):
+    """Build a ``BeautifulSoup`` tree with the lxml tree builder.
+
+    For code which needs the full BeautifulSoup API. The lxml builder is several
+    times faster than 'html.parser', and parse_only keeps only the matching
+    elements, e.g. ``SoupStrainer("title")`` to read the title of a page.
+    """
+    return BeautifulSoup(html, "lxml", parse_only=parse_only)
+
+
+def _check_block(block: list):
+    if (not block) or (not isinstance(block[0], str)) or (not _TAG_PATTERN.match(block[0])):
+        raise ValueError("Invalid block `{}`, it should be [tag_name, class_name].".format(block))
+    tag = block[0].lower()
+    class_ = block[1] if len(block) > 1 else None
+    return tag, class_
+
+
+def _xpath(tag: str, class_: Optional[str], var: str):
+    # the class is passed as an XPath variable, so it never needs to be escaped
+    if class_ is None:
+        return etree.XPath(".//{}".format(tag))
+    if len(class_.split()) > 1:
+        return etree.XPath(".//{}[normalize-space(@class) = ${}]".format(tag, var))
+    return etree.XPath(".//{}[contains(concat(' ', normalize-space(@class), ' '), ${})]".format(tag, var))
+
+
+def _xpath_vars(class_: Optional[str], var: str):
+    if class_ is None:
+        return {}
+    if len(class_.split()) > 1:
+        return {var: " ".join(class_.split())}
+    return {var: " {} ".format(class_)}
+
+
+def _css(tag: str, class_: Optional[str]):
+    if class_ is None:
+        return tag
+    class_ = class_.replace("\\", "\\\\").replace('"', '\\"')
+    if len(class_.split()) > 1:
+        return '{}[class="{}"]'.format(tag, class_)
+    return '{}[class~="{}"]'.format(tag, class_)
+
+
+class BlockSelector:
+    """The ``block1`` / ``block2`` selectors of a website, compiled once for a parser.
+
+    Like the BeautifulSoup lookups it replaces, the selected blocks are every
+    element matching block1, or, if block2 is given, every element matching
+    block2 inside the first element matching block1. A class matches if it is
+    one of the classes of the element, or the whole class attribute if it holds
+    several words.
+
+    The 'lxml' parser evaluates the blocks as compiled XPath expressions, and
+    'selectolax' as CSS selectors, so only the selected elements ever become
+    Python objects. 'html.parser' builds a BeautifulSoup tree restricted to
+    the tag of block1 with a ``SoupStrainer``.
+
+    Args:
+        block1 (list): ``[tag_name, class_name]`` of the outer block.
+        block2 (list, optional): ``[tag_name, class_name]`` of the blocks inside
+            the first block1 element. Defaults to None.
+        parser (str, optional): 'lxml', 'selectolax' or 'html.parser'. Defaults
+            to the one set with ``configure_html_parser``.
+
+    Example:
+        ::
+
+            selector = BlockSelector(["div", "news-list"], ["li", "item"])
+            hrefs = selector.links(html)
+    """
+    def __init__(
+        self,
+        block1: list,
+        block2: Optional[list] = None,
+        parser: Optional[str] = None
+    ):
+        self.parser = parser or _html_parser
+        _check_parser(self.parser)
+        self.tag1, self.class1 = _check_block(block1)
+        self.tag2, self.class2 = _check_block(block2) if block2 else (None, None)
+
+        if self.parser == "lxml":
+            self.xpath1 = _xpath(self.tag1, self.class1, "class1")
+            self.xpath2 = _xpath(self.tag2, self.class2, "class2") if self.tag2 else None
+            self.vars1 = _xpath_vars(self.class1, "class1")
+            self.vars2 = _xpath_vars(self.class2, "class2")
+        elif self.parser == "selectolax":
+            self.css1 = _css(self.tag1, self.class1)
+            self.css2 = _css(self.tag2, self.class2) if self.tag2 else None
+        else:
+            # the class is matched after parsing, since a strainer compares it
+            # to the raw attribute and misses elements with several classes
+            self.strainer = SoupStrainer(self.tag1)
+
+    def _lxml_tree(self, html: Union[str, bytes]):
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        if not html.strip():
+            return None
+        try:
+            return lxml.html.document_fromstring(html, parser=lxml.html.HTMLParser(encoding="utf-8"))
+        except etree.ParserError:
+            return None
+
+    def _first_block(self, html: Union[str, bytes]):
+        # first element matching block1, in the tree of the parser
+        if self.parser == "lxml":
+            tree = self._lxml_tree(html)
+            if tree is None:
+                return None
+            matches = self.xpath1(tree, **self.vars1)
+            return matches[0] if matches else None
+        elif self.parser == "selectolax":
+            return SelectolaxParser(html).css_first(self.css1)
+        else:
+            soup = BeautifulSoup(html, "html.parser", parse_only=self.strainer)
+            return soup.find(self.tag1, class_=self.class1)
+
+    def blocks(self, html: Union[str, bytes]):
+        """Return the selected block elements, as objects of the parser."""
+        if self.tag2 is not None:
+            first = self._first_block(html)
+            if first is None:
+                return []
+            if self.parser == "lxml":
+                return self.xpath2(first, **self.vars2)
+            elif self.parser == "selectolax":
+                return first.css(self.css2)
+            return first.find_all(self.tag2, class_=self.class2)
+
+        if self.parser == "lxml":
+            tree = self._lxml_tree(html)
+            if tree is None:
+                return []
+            return self.xpath1(tree, **self.vars1)
+        elif self.parser == "selectolax":
+            return SelectolaxParser(html).css(self.css1)
+        soup = BeautifulSoup(html, "html.parser", parse_only=self.strainer)
+        return soup.find_all(self.tag1, class_=self.class1)
+
+    def _tag(self, element):
+        if self.parser == "html.parser":
+            return element.name
+        return element.tag
+
+    def _attrs(self, element):
+        if self.parser == "lxml":
+            return dict(element.attrib)
+        elif self.parser == "selectolax":
+            return dict(element.attributes)
+        return dict(element.attrs)
+
+    def _descendants(self, element, tag: str):
+        if self.parser == "lxml":
+            return list(element.iterdescendants(tag))
+        elif self.parser == "selectolax":
+            return element.css(tag)
+        return element.find_all(tag)
+
+    def links(self, html: Union[str, bytes]):
+        """Return the ``href`` of every selected block.
+
+        The href of a block is its own if it is an ``a`` tag, and the one of its
+        first ``a`` descendant otherwise. Blocks without a link are skipped.
+
+        Args:
+            html (str or bytes): HTML of the page.
+
+        Returns:
+            list: The hrefs, as written in the page.
+        """
+        hrefs = []
+        for block in self.blocks(html):
+            if self._tag(block) != "a":
+                anchors = self._descendants(block, "a")
+                if not anchors:
+                    continue
+                block = anchors[0]
+            href = self._attrs(block).get("href")
+            if href:
+                hrefs.append(href.strip())
+        return hrefs
+
+    def attrs(self, html: Union[str, bytes], tag: str):
+        """Return the attributes of every ``tag`` element inside the first block1 element.
+
+        Args:
+            html (str or bytes): HTML of the page.
+            tag (str): Name of the elements, e.g. 'img'.
+
+        Returns:
+            list: One dict of attributes per element, or None if no element
+                matches block1.
+        """
+        first = self._first_block(html)
+        if first is None:
+            return None
+        return [self._attrs(element) for element in self._descendants(first, tag)]
+
+
+def extract_block_links(
+    html: Union[str, bytes],
+    block1: list,
+    block2: Optional[list] = None,
+    parser: Optional[str] = None
+) -> List[str]:
+    """Return the hrefs of the blocks of a page, see ``BlockSelector.links``."""
+    return BlockSelector(block1, block2, parser).links(html)
@@ -0,0 +1,185 @@
+import os
+import asyncio
+import tempfile
+import pymupdf
+import pymupdf4llm
+from typing import List, Optional
+from concurrent.futures import Executor
+from loguru import logger
+
+
+DEFAULT_MAX_PDF_BYTES = 100 * 1024 * 1024
+DEFAULT_PDF_PAGES_PER_TASK = 16
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        # e.g. still opened by a cancelled worker on Windows
+        logger.warning(f"Failed to remove temporary PDF {path}: {e}")
+
+
+class PdfSink:
+    """Write the chunks of a downloaded PDF into a temporary file while enforcing a size cap.
+
+    Args:
+        url (str): URL of the PDF, used in log messages.
+        max_bytes (int, optional): Maximum size of the PDF in bytes. None means
+            unlimited.
+    """
+    def __init__(self, url: str, max_bytes: Optional[int]):
+        self.url = url
+        self.max_bytes = max_bytes
+        self.size = 0
+        fd, self.path = tempfile.mkstemp(prefix="musubi-", suffix=".pdf")
+        self.file = os.fdopen(fd, "wb")
+
+    def check_length(self, content_length: Optional[int]):
+        """Check the announced ``Content-Length`` against the size cap before downloading."""
+        if (content_length is not None) and (self.max_bytes is not None) and (content_length > self.max_bytes):
+            self.size = content_length
+            return False
+        return True
+
+    def write(self, chunk: bytes):
+        """Write a chunk, return False if the PDF exceeds the size cap."""
+        self.size += len(chunk)
+        if (self.max_bytes is not None) and (self.size > self.max_bytes):
+            return False
+        self.file.write(chunk)
+        return True
+
+    def finish(self, complete: bool):
+        """Close the file and return its path, or remove it and return None if incomplete."""
+        self.file.close()
+        if complete:
+            return self.path
+        if (self.max_bytes is not None) and (self.size > self.max_bytes):
+            logger.warning(f"Skipping {self.url}: PDF is larger than {self.max_bytes} bytes.")
+        _remove(self.path)
+        return None
+
+
+def get_pdf_page_count(path: str):
+    """Return the number of pages of a PDF file without loading its pages."""
+    with pymupdf.open(path) as doc:
+        return doc.page_count
+
+
+def split_pages(page_count: int, pages_per_task: int = DEFAULT_PDF_PAGES_PER_TASK):
+    """Split the pages of a document into consecutive ranges of at most pages_per_task pages."""
+    pages_per_task = max(1, pages_per_task)
+    return [list(range(start, min(start + pages_per_task, page_count))) for start in range(0, page_count, pages_per_task)]
+
+
+def extract_pdf_file(path: str, pages: Optional[List[int]] = None):
+    """Convert some or all pages of a PDF file into markdown.
+
+    The file is opened (and memory-mapped by MuPDF) inside the calling process,
+    so only the path and the page numbers are sent to pool workers.
+
+    Args:
+        path (str): Path of the PDF file.
+        pages (list, optional): 0-based page numbers to convert. Defaults to None,
+            converting every page.
+
+    Returns:
+        str: The converted markdown.
+    """
+    with pymupdf.open(path) as doc:
+        return pymupdf4llm.to_markdown(doc, pages=pages)
+
+
+class PdfConversion:
+    """Page ranges of one PDF being converted in a process pool.
+
+    ``result`` joins the markdown of the ranges in page order and removes the
+    temporary file, mirroring ``concurrent.futures.Future.result``.
+    """
+    def __init__(self, path: str, futures: list):
+        self.path = path
+        self.futures = futures
+
+    def result(self):
+        try:
+            return "".join(future.result() for future in self.futures)
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        for future in self.futures:
+            future.cancel()
+        _remove(self.path)
+
+
+def submit_pdf(
+    pool: Executor,
+    path: str,
+    pages_per_task: int = DEFAULT_PDF_PAGES_PER_TASK
+):
+    """Submit the page ranges of a PDF file to a process pool.
+
+    Args:
+        pool (Executor): Extraction pool.
+        path (str): Path of the PDF file, removed once the conversion is joined.
+        pages_per_task (int, optional): Number of pages converted by one task.
+            Defaults to 16.
+
+    Returns:
+        PdfConversion: Handle whose ``result()`` returns the markdown of the PDF.
+    """
+    try:
+        ranges = split_pages(get_pdf_page_count(path), pages_per_task)
+    except Exception:
+        _remove(path)
+        raise
+    if len(ranges) <= 1:
+        return PdfConversion(path, [pool.submit(extract_pdf_file, path)])
+    return PdfConversion(path, [pool.submit(extract_pdf_file, path, pages) for pages in ranges])
+
+
+def convert_pdf(path: str):
+    """Convert a PDF file into markdown in the current process and remove the file."""
+    try:
+        return extract_pdf_file(path)
+    finally:
+        _remove(path)
+
+
+async def convert_pdf_async(
+    path: str,
+    executor: Optional[Executor] = None,
+    pages_per_task: int = DEFAULT_PDF_PAGES_PER_TASK
+):
+    """Convert a PDF file into markdown without blocking the event loop and remove the file.
+
+    Page ranges are converted in parallel if executor is a process pool. With the
+    default thread executor, the document is converted in one task since pages
+    would only contend for the GIL.
+
+    Args:
+        path (str): Path of the PDF file.
+        executor (Executor, optional): Extraction pool. Defaults to None, using the
+            default thread executor of the event loop.
+        pages_per_task (int, optional): Number of pages converted by one task.
+            Defaults to 16.
+
+    Returns:
+        str: The converted markdown.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        if executor is None:
+            return await loop.run_in_executor(None, extract_pdf_file, path)
+        ranges = split_pages(get_pdf_page_count(path), pages_per_task)
+        if len(ranges) <= 1:
+            return await loop.run_in_executor(executor, extract_pdf_file, path)
+        parts = await asyncio.gather(
+            *[loop.run_in_executor(executor, extract_pdf_file, path, pages) for pages in ranges]
+        )
+        return "".join(parts)
+    finally:
+        _remove(path)
@@ -0,0 +1,135 @@
+import time
+import asyncio
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """A thread-safe token bucket limiting the rate of requests.
+
+    Tokens are refilled continuously at ``rate`` tokens per second up to
+    ``burst``. Every request reserves one token; if the bucket is empty the
+    reservation goes into debt and the caller waits until its token is due.
+    Waiting happens outside of the lock, so callers never hold a concurrency
+    slot of the bucket while sleeping.
+
+    Args:
+        rate (float): Number of requests allowed per second.
+        burst (int, optional): Maximum number of requests allowed at once after
+            an idle period. Defaults to 1.
+    """
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1
+    ):
+        if rate <= 0:
+            raise ValueError("Rate of token bucket should be positive but got {}.".format(rate))
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Reserve one token.
+
+        Returns:
+            float: Number of seconds to wait before the request may be sent.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """Block until one request may be sent."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until one request may be sent."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def get_host(url: str):
+    """Return the lower-cased host of a URL, or the argument itself if it is a bare host."""
+    netloc = urlparse(url).netloc
+    return (netloc or url).lower()
+
+
+class HostRateLimiter:
+    """Per-host rate limiter shared by all fetchers of Musubi.
+
+    Each host gets its own token bucket, so many hosts can be crawled at full
+    speed while every single host stays within its own limit.
+
+    Args:
+        default_rate (float, optional): Requests per second allowed for hosts
+            without a specific configuration. None means unlimited.
+            Defaults to None.
+        default_burst (int, optional): Burst size for hosts without a specific
+            configuration. Defaults to 1.
+    """
+    def __init__(
+        self,
+        default_rate: Optional[float] = None,
+        default_burst: int = 1
+    ):
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.buckets: Dict[str, Optional[TokenBucket]] = {}
+        self.lock = threading.Lock()
+
+    def configure(
+        self,
+        url: str,
+        rate: Optional[float],
+        burst: int = 1
+    ):
+        """Set the rate limit of the host of ``url``.
+
+        Args:
+            url (str): URL or bare host name.
+            rate (float, optional): Requests per second. None removes the limit.
+            burst (int, optional): Burst size. Defaults to 1.
+        """
+        host = get_host(url)
+        with self.lock:
+            self.buckets[host] = TokenBucket(rate, burst) if rate else None
+
+    def bucket(self, url: str):
+        """Return the token bucket of the host of ``url``, or None if unlimited."""
+        host = get_host(url)
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.default_rate, self.default_burst) if self.default_rate else None
+            return self.buckets[host]
+
+    def wait(self, url: str):
+        """Block until a request to ``url`` is allowed."""
+        bucket = self.bucket(url)
+        if bucket is not None:
+            bucket.acquire()
+
+    async def wait_async(self, url: str):
+        """Wait without blocking the event loop until a request to ``url`` is allowed."""
+        bucket = self.bucket(url)
+        if bucket is not None:
+            await bucket.acquire_async()
+
+
+rate_limiter = HostRateLimiter(default_rate=10.0, default_burst=10)
+
+
+def get_rate_limiter():
+    """Return the rate limiter shared by all fetchers."""
+    return rate_limiter
@@ -0,0 +1,331 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Union
+from loguru import logger
+from .seen import hash_url
+from .helpers import iter_jsonl, iter_file_chunks
+from .extraction import extract_documents
+from .sink import iter_records
+
+
+_COMMIT_EVERY = 1000
+
+
+class RawCache:
+    """An on-disk, content-addressed cache of raw downloaded documents.
+
+    Every document is compressed with zlib and stored once under the SHA-256 of its
+    raw bytes, so identical pages shared by several URLs take the space of one.
+    A SQLite index maps each URL to the hash of its last downloaded document and
+    records when every document was last used. When the compressed size of the
+    cache exceeds ``max_bytes``, the least recently used documents are evicted.
+
+    The cache allows the extraction stage to be rerun (e.g. after changing
+    extraction settings or upgrading trafilatura) without fetching the pages again,
+    see ``reextract_contents``.
+
+    The cache is guarded by a lock, so one cache may be shared by several threads,
+    e.g. the ones archiving the documents of the asynchronous crawler. New entries
+    are committed every 1000 documents and on close: after a crash, the documents
+    of the last uncommitted batch are missing from the index and are downloaded
+    again by the next crawl.
+
+    Args:
+        cache_dir (str or Path): Folder of the cache. Created if it does not exist.
+        max_bytes (int, optional): Maximum compressed size of the stored documents
+            in bytes. None means unlimited. Defaults to None.
+        compress_level (int, optional): zlib compression level from 0 to 9.
+            Defaults to 6.
+
+    Example:
+        ::
+
+            with RawCache("cache/raw", max_bytes=10 * 1024 ** 3) as cache:
+                cache.put(url, downloaded, kind="html")
+                data, kind = cache.get(url)
+    """
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        max_bytes: Optional[int] = None,
+        compress_level: int = 6
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+
+        self.lock = threading.RLock()
+        self.pending = 0
+        self.conn = sqlite3.connect(str(self.cache_dir / "index.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS urls (hash INTEGER PRIMARY KEY, url TEXT, digest TEXT, kind TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS urls_digest ON urls (digest)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER, accessed REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS blobs_accessed ON blobs (accessed)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __contains__(self, url: str):
+        if url is None:
+            return False
+        with self.lock:
+            cur = self.conn.execute("SELECT 1 FROM urls WHERE hash = ?", (hash_url(url),))
+            return cur.fetchone() is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def _blob_path(self, digest: str):
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def put(
+        self,
+        url: str,
+        data: bytes,
+        kind: str = "html"
+    ):
+        """Store the raw document downloaded from a URL.
+
+        Args:
+            url (str): URL of the document.
+            data (bytes or str): Raw document. Strings are encoded as UTF-8.
+            kind (str, optional): Kind of the document, used to pick the extractor
+                when re-extracting, e.g. 'html' or 'pdf'. Defaults to 'html'.
+
+        Returns:
+            str: The SHA-256 hex digest the document is stored under.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        return self._store(url, digest, kind, lambda file: file.write(zlib.compress(data, self.compress_level)))
+
+    def put_file(
+        self,
+        url: str,
+        path: Union[str, Path],
+        kind: str = "pdf"
+    ):
+        """Store the raw document downloaded from a URL into a file.
+
+        Same as ``put``, but the document is streamed from path instead of being
+        held in memory, e.g. for the PDFs ``fetch_document`` writes to temporary
+        files.
+
+        Args:
+            url (str): URL of the document.
+            path (str or Path): File holding the raw document.
+            kind (str, optional): Kind of the document. Defaults to 'pdf'.
+
+        Returns:
+            str: The SHA-256 hex digest the document is stored under.
+        """
+        sha256 = hashlib.sha256()
+        for chunk in iter_file_chunks(path):
+            sha256.update(chunk)
+
+        def write_blob(file):
+            compressor = zlib.compressobj(self.compress_level)
+            for chunk in iter_file_chunks(path):
+                file.write(compressor.compress(chunk))
+            file.write(compressor.flush())
+
+        return self._store(url, sha256.hexdigest(), kind, write_blob)
+
+    def _store(self, url: str, digest: str, kind: str, write_blob):
+        # write_blob writes the compressed document into the file it is given,
+        # and is only called if no other URL stored the same document
+        with self.lock:
+            now = time.time()
+            row = self.conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if row is None:
+                path = self._blob_path(digest)
+                path.parent.mkdir(exist_ok=True)
+                tmp_path = path.with_suffix(".tmp")
+                with open(tmp_path, "wb") as file:
+                    write_blob(file)
+                    size = file.tell()
+                os.replace(tmp_path, path)
+                self.conn.execute(
+                    "INSERT INTO blobs (digest, size, accessed) VALUES (?, ?, ?)",
+                    (digest, size, now)
+                )
+                self.total_bytes += size
+            else:
+                self.conn.execute("UPDATE blobs SET accessed = ? WHERE digest = ?", (now, digest))
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO urls (hash, url, digest, kind) VALUES (?, ?, ?, ?)",
+                (hash_url(url), url, digest, kind)
+            )
+            self.evict()
+            self.pending += 1
+            if self.pending >= _COMMIT_EVERY:
+                self.commit()
+        return digest
+
+    def get(self, url: str):
+        """Load the raw document of a URL.
+
+        Args:
+            url (str): URL of the document.
+
+        Returns:
+            tuple: ``(data, kind)`` with the raw bytes and the kind of the document,
+                or None if the URL is not cached.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT digest, kind FROM urls WHERE hash = ?", (hash_url(url),)).fetchone()
+            if row is None:
+                return None
+            digest, kind = row
+            try:
+                with open(self._blob_path(digest), "rb") as file:
+                    data = zlib.decompress(file.read())
+            except (OSError, zlib.error) as e:
+                logger.warning(f"Dropping broken cache entry of {url}: {e}")
+                self._remove_blob(digest)
+                self.commit()
+                return None
+            self.conn.execute("UPDATE blobs SET accessed = ? WHERE digest = ?", (time.time(), digest))
+            return data, kind
+
+    def _remove_blob(self, digest: str):
+        row = self.conn.execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is not None:
+            self.total_bytes -= row[0]
+        self.conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        self.conn.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+        try:
+            os.remove(self._blob_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Remove the least recently used documents until the cache fits in max_bytes.
+
+        Returns:
+            int: Number of evicted documents.
+        """
+        if (self.max_bytes is None) or (self.total_bytes <= self.max_bytes):
+            return 0
+        count = 0
+        with self.lock:
+            while self.total_bytes > self.max_bytes:
+                rows = self.conn.execute("SELECT digest FROM blobs ORDER BY accessed LIMIT 64").fetchall()
+                if not rows:
+                    break
+                for digest, in rows:
+                    if self.total_bytes <= self.max_bytes:
+                        break
+                    self._remove_blob(digest)
+                    count += 1
+        return count
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+            self.pending = 0
+
+    def close(self):
+        """Commit and close the index of the cache."""
+        with self.lock:
+            if self.conn is None:
+                return
+            self.commit()
+            self.conn.close()
+            self.conn = None
+
+
+def open_raw_cache(
+    cache_dir: Optional[Union[str, Path]],
+    max_bytes: Optional[int] = None
+):
+    """Open the raw document cache in cache_dir, or return None if cache_dir is None."""
+    if cache_dir is None:
+        return None
+    return RawCache(cache_dir, max_bytes=max_bytes)
+
+
+def reextract_contents(
+    url_path: Union[str, Path],
+    save_path: Union[str, Path],
+    cache: RawCache,
+    extract_workers: Optional[int] = None,
+    max_tasks_per_child: Optional[int] = None,
+    output_format: str = "jsonl"
+):
+    """Regenerate the content file of a website from the raw document cache.
+
+    Every link of url_path whose document is cached is extracted again, without
+    any network access, and the results replace the content of save_path. Records
+    of save_path marked with ``duplicate_of`` are kept as they are, as are the
+    records of links whose document was evicted from the cache. Links neither
+    cached nor in save_path are skipped and left for the next crawl.
+
+    Args:
+        url_path (str or Path): Path of the ``*_link.json`` file of the website.
+        save_path (str or Path): Path of the content output to regenerate.
+        cache (RawCache): Cache holding the raw documents.
+        extract_workers (int, optional): If set, extract in a process pool with
+            this many workers. Defaults to None, extracting in the current process.
+        max_tasks_per_child (int, optional): Number of documents an extraction
+            worker handles before being replaced. Defaults to None.
+        output_format (str, optional): Format of the output, see
+            ``open_content_writer``. Defaults to 'jsonl'.
+
+    Returns:
+        int: Number of regenerated records.
+    """
+    missing = 0
+    evicted = {link for link in iter_jsonl(url_path, key="link") if link not in cache}
+    # only the records which are not regenerated are held in memory
+    kept = {}
+    if os.path.exists(save_path):
+        for record in iter_records(save_path):
+            if (record.get("url") in evicted) or (record.get("duplicate_of") is not None):
+                kept[record.get("url")] = record
+
+    def iter_cached():
+        nonlocal missing
+        for link in iter_jsonl(url_path, key="link"):
+            if link in kept:
+                yield link, kept.pop(link), None
+                continue
+            cached = cache.get(link)
+            if cached is None:
+                missing += 1
+                continue
+            data, kind = cached
+            yield link, data, kind
+
+    count = extract_documents(
+        iter_cached(),
+        save_path,
+        extract_workers=extract_workers,
+        max_tasks_per_child=max_tasks_per_child,
+        output_format=output_format
+    )
+    cache.commit()
+    if missing:
+        logger.warning(f"{missing} links of {url_path} are neither in the raw cache nor in {save_path} and were skipped.")
+    return count
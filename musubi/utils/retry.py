@@ -0,0 +1,502 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import aiohttp
+import requests
+from pathlib import Path
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional, Union
+from loguru import logger
+from .rate_limit import get_host
+from .helpers import iter_jsonl
+from .writer import JsonlWriter
+
+
+DEFAULT_RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+# errors of the request itself, retrying them would fail the same way
+_PERMANENT_ERRORS = (
+    requests.exceptions.InvalidURL,
+    requests.exceptions.MissingSchema,
+    requests.exceptions.InvalidSchema,
+    requests.exceptions.InvalidHeader,
+    aiohttp.InvalidURL,
+)
+# requests exceptions and asyncio.TimeoutError are subclasses of OSError
+_TRANSIENT_ERRORS = (OSError, aiohttp.ClientError, asyncio.TimeoutError)
+# longest sleep between two checks of an open circuit, so that waiting requests
+# go on soon after a probe closed it
+_CIRCUIT_POLL = 1.0
+
+
+class FetchError(Exception):
+    """A fetch which failed for good, after retries if the failure was transient.
+
+    Args:
+        url (str): URL of the failed request.
+        message (str): Description of the failure.
+        status (int, optional): HTTP status code of the last response, if any.
+        retry_after (float, optional): Seconds the server asked to wait before
+            the next request, if any.
+    """
+    def __init__(
+        self,
+        url: str,
+        message: str,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ):
+        super().__init__(message)
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(FetchError):
+    """A request refused because the circuit of its host is open."""
+
+
+def parse_retry_after(value: Optional[str]):
+    """Parse a ``Retry-After`` header given in seconds or as an HTTP date.
+
+    Returns:
+        float: Seconds to wait, or None if value is missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker shared by all fetchers of Musubi.
+
+    Once ``failure_threshold`` consecutive URLs of a host fail (each after its
+    retries), its circuit opens and requests to it are held back for
+    ``recovery_time`` seconds instead of hammering a host which is down. After
+    that, a single probe request is let through: its success closes the circuit,
+    its failure opens it again.
+
+    Args:
+        failure_threshold (int, optional): Number of consecutive failures which
+            opens the circuit of a host. Defaults to 5.
+        recovery_time (float, optional): Seconds a circuit stays open before a
+            probe request is allowed. Defaults to 60.
+    """
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_time: float = 60.0
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_time = recovery_time
+        # host -> [consecutive failures, monotonic time until which requests are refused]
+        self.circuits: Dict[str, list] = {}
+        self.lock = threading.Lock()
+
+    def allow(self, url: str):
+        """Return True if a request to the host of ``url`` may be sent."""
+        return self.retry_in(url) == 0
+
+    def retry_in(self, url: str):
+        """Return 0 if a request to the host of ``url`` may be sent, else the seconds until it may.
+
+        Like ``allow``, a return value of 0 lets the probe of a half-open circuit through.
+        """
+        host = get_host(url)
+        with self.lock:
+            circuit = self.circuits.get(host)
+            if (circuit is None) or (circuit[0] < self.failure_threshold):
+                return 0
+            now = time.monotonic()
+            if now < circuit[1]:
+                return circuit[1] - now
+            # half-open: let one probe through and hold the others back until it ends
+            circuit[1] = now + self.recovery_time
+            return 0
+
+    def is_open(self, url: str):
+        """Return True if requests to the host of ``url`` are currently refused."""
+        host = get_host(url)
+        with self.lock:
+            circuit = self.circuits.get(host)
+            return (circuit is not None) and (circuit[0] >= self.failure_threshold) \
+                and (time.monotonic() < circuit[1])
+
+    def record_success(self, url: str):
+        """Close the circuit of the host of ``url``."""
+        with self.lock:
+            self.circuits.pop(get_host(url), None)
+
+    def record_failure(self, url: str):
+        """Count a URL of the host of ``url`` which failed for good, opening its circuit at the threshold."""
+        host = get_host(url)
+        with self.lock:
+            circuit = self.circuits.setdefault(host, [0, 0.0])
+            circuit[0] += 1
+            if circuit[0] >= self.failure_threshold:
+                if circuit[0] == self.failure_threshold:
+                    logger.warning(f"Too many failures on {host}, pausing requests for {self.recovery_time}s.")
+                circuit[1] = time.monotonic() + self.recovery_time
+
+    def trip(self, url: str, duration: float):
+        """Open the circuit of the host of ``url`` for at least duration seconds."""
+        host = get_host(url)
+        with self.lock:
+            circuit = self.circuits.setdefault(host, [0, 0.0])
+            circuit[0] = max(circuit[0], self.failure_threshold)
+            circuit[1] = max(circuit[1], time.monotonic() + duration)
+
+
+class RetryPolicy:
+    """Retry transient fetch failures with exponential backoff and full jitter.
+
+    Connection errors, timeouts and responses whose status is in
+    ``retry_statuses`` are retried up to ``max_retries`` times. The n-th retry
+    waits a random delay between 0 and ``min(backoff_max, backoff_base * 2 ** n)``
+    seconds, so that workers failing together do not retry in lockstep. A
+    ``Retry-After`` header (usually sent with 429 and 503) is honoured as a lower
+    bound; if it asks for more than ``backoff_max``, the request is given up and
+    the circuit of the host is opened for that long instead.
+
+    A URL which still fails after its retries counts as one failure of its host
+    for the circuit breaker. Requests to a host whose circuit is open wait for it
+    to let them through, up to ``circuit_wait`` seconds.
+
+    Args:
+        max_retries (int, optional): Number of retries after the first attempt.
+            Defaults to 3.
+        backoff_base (float, optional): Base delay of the backoff in seconds.
+            Defaults to 0.5.
+        backoff_max (float, optional): Maximum delay between two attempts in
+            seconds. Defaults to 60.
+        retry_statuses (Iterable[int], optional): HTTP status codes that are
+            retried. Defaults to 408, 429, 500, 502, 503 and 504.
+        connect_timeout (float, optional): Seconds allowed to establish a
+            connection. Defaults to 10.
+        read_timeout (float, optional): Seconds allowed between two received
+            chunks of a response. Defaults to 30.
+        total_timeout (float, optional): Seconds allowed for a whole request,
+            body included. None means unlimited. Defaults to 300.
+        circuit_wait (float, optional): Seconds a request waits for the open
+            circuit of its host before failing with ``CircuitOpenError``. None
+            waits as long as needed. Defaults to 120.
+
+    Example:
+        ::
+
+            policy = RetryPolicy(max_retries=5)
+            response = policy.call(url, lambda: send(url), breaker=circuit_breaker)
+    """
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 60.0,
+        retry_statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+        connect_timeout: Optional[float] = 10.0,
+        read_timeout: Optional[float] = 30.0,
+        total_timeout: Optional[float] = 300.0,
+        circuit_wait: Optional[float] = 120.0
+    ):
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.circuit_wait = circuit_wait
+
+    def timeout(self):
+        """Return the ``(connect, read)`` timeout passed to ``requests``."""
+        return (self.connect_timeout, self.read_timeout)
+
+    def client_timeout(self):
+        """Return the ``aiohttp.ClientTimeout`` of one request."""
+        return aiohttp.ClientTimeout(
+            total=self.total_timeout,
+            sock_connect=self.connect_timeout,
+            sock_read=self.read_timeout
+        )
+
+    def deadline(self):
+        """Return the ``time.monotonic()`` deadline of a request starting now, or None."""
+        if self.total_timeout is None:
+            return None
+        return time.monotonic() + self.total_timeout
+
+    def check_status(self, url: str, status: int, headers=None):
+        """Raise a ``FetchError`` if a response with this status should be retried."""
+        if status in self.retry_statuses:
+            retry_after = parse_retry_after(headers.get("Retry-After")) if headers is not None else None
+            raise FetchError(url, "HTTP {}".format(status), status=status, retry_after=retry_after)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None):
+        """Return the delay in seconds before retry number attempt (starting at 0)."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _on_failure(self, url: str, error: Exception, attempt: int, breaker: Optional[CircuitBreaker]):
+        """Record a failed attempt and return the delay before the next one, or None to give up."""
+        if isinstance(error, _PERMANENT_ERRORS):
+            return None
+        retry_after = getattr(error, "retry_after", None)
+        if (retry_after is not None) and (retry_after > self.backoff_max):
+            if breaker is not None:
+                breaker.trip(url, retry_after)
+            return None
+        if attempt >= self.max_retries:
+            # one failure per URL, so that the retries of a single URL do not open the circuit
+            if breaker is not None:
+                breaker.record_failure(url)
+            return None
+        delay = self.backoff(attempt, retry_after)
+        logger.debug(f"Retrying {url} in {delay:.1f}s after: {error}")
+        return delay
+
+    def _circuit_delay(self, url: str, breaker: Optional[CircuitBreaker], waited: float):
+        """Return the seconds to sleep before checking the circuit of url again, 0 once it lets url through."""
+        if breaker is None:
+            return 0
+        delay = breaker.retry_in(url)
+        if delay == 0:
+            return 0
+        if (self.circuit_wait is not None) and (waited + delay > self.circuit_wait):
+            raise CircuitOpenError(url, "Circuit of {} is open.".format(get_host(url)))
+        return min(delay, _CIRCUIT_POLL)
+
+    def _give_up(self, url: str, error: Exception, attempt: int):
+        if isinstance(error, FetchError):
+            message = "Failed to fetch {} after {} attempts: {}".format(url, attempt + 1, error)
+            return FetchError(url, message, status=error.status, retry_after=error.retry_after)
+        return FetchError(url, "Failed to fetch {} after {} attempts: {!r}".format(url, attempt + 1, error))
+
+    def call(
+        self,
+        url: str,
+        func: Callable,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        """Call func until it succeeds or the failure is not worth retrying.
+
+        Args:
+            url (str): URL requested by func, used for the circuit breaker and in
+                error messages.
+            func (Callable): Function sending the request. It should raise
+                (e.g. with ``check_status``) on a retryable response.
+            breaker (CircuitBreaker, optional): Circuit breaker of the hosts.
+                Defaults to None.
+
+        Returns:
+            The return value of func.
+
+        Raises:
+            CircuitOpenError: If the circuit of the host stayed open for circuit_wait
+                seconds.
+            FetchError: If every attempt failed or the failure is permanent.
+        """
+        waited = 0.0
+        for attempt in range(self.max_retries + 1):
+            while True:
+                delay = self._circuit_delay(url, breaker, waited)
+                if not delay:
+                    break
+                time.sleep(delay)
+                waited += delay
+            try:
+                result = func()
+            except (FetchError, *_TRANSIENT_ERRORS) as e:
+                delay = self._on_failure(url, e, attempt, breaker)
+                if delay is None:
+                    raise self._give_up(url, e, attempt) from e
+                time.sleep(delay)
+                continue
+            if breaker is not None:
+                breaker.record_success(url)
+            return result
+
+    async def call_async(
+        self,
+        url: str,
+        func: Callable,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        """Await func until it succeeds or the failure is not worth retrying.
+
+        Same as ``call``, but func is a coroutine function and backoff delays do
+        not block the event loop.
+        """
+        waited = 0.0
+        for attempt in range(self.max_retries + 1):
+            while True:
+                delay = self._circuit_delay(url, breaker, waited)
+                if not delay:
+                    break
+                await asyncio.sleep(delay)
+                waited += delay
+            try:
+                result = await func()
+            except (FetchError, *_TRANSIENT_ERRORS) as e:
+                delay = self._on_failure(url, e, attempt, breaker)
+                if delay is None:
+                    raise self._give_up(url, e, attempt) from e
+                await asyncio.sleep(delay)
+                continue
+            if breaker is not None:
+                breaker.record_success(url)
+            return result
+
+
+retry_policy = RetryPolicy()
+circuit_breaker = CircuitBreaker()
+
+
+def configure_retry(
+    max_retries: Optional[int] = None,
+    backoff_base: Optional[float] = None,
+    backoff_max: Optional[float] = None,
+    connect_timeout: Optional[float] = None,
+    read_timeout: Optional[float] = None,
+    total_timeout: Optional[float] = None,
+    circuit_wait: Optional[float] = None,
+    failure_threshold: Optional[int] = None,
+    recovery_time: Optional[float] = None
+):
+    """Configure the retry policy and the circuit breaker shared by all fetchers.
+
+    Arguments left to None keep their current value, see ``RetryPolicy`` and
+    ``CircuitBreaker`` for their meaning and defaults.
+    """
+    if max_retries is not None:
+        retry_policy.max_retries = max(0, max_retries)
+    if backoff_base is not None:
+        retry_policy.backoff_base = backoff_base
+    if backoff_max is not None:
+        retry_policy.backoff_max = backoff_max
+    if connect_timeout is not None:
+        retry_policy.connect_timeout = connect_timeout
+    if read_timeout is not None:
+        retry_policy.read_timeout = read_timeout
+    if total_timeout is not None:
+        retry_policy.total_timeout = total_timeout
+    if circuit_wait is not None:
+        retry_policy.circuit_wait = circuit_wait
+    if failure_threshold is not None:
+        circuit_breaker.failure_threshold = max(1, failure_threshold)
+    if recovery_time is not None:
+        circuit_breaker.recovery_time = recovery_time
+
+
+def get_retry_policy():
+    """Return the retry policy shared by all fetchers."""
+    return retry_policy
+
+
+def get_circuit_breaker():
+    """Return the circuit breaker shared by all fetchers."""
+    return circuit_breaker
+
+
+def get_dead_letter_path(path: Union[str, Path]):
+    """Return the path of the dead-letter file stored next to a link or content output."""
+    path = Path(path)
+    if path.suffix != ".json":
+        # sharded content folders have no suffix to replace
+        return path.with_name(path.name + ".failed.jsonl")
+    return path.with_suffix(".failed.jsonl")
+
+
+class DeadLetterWriter:
+    """Record URLs whose fetch failed for good into a dead-letter JSONL file.
+
+    Every record holds the URL, the error, the last HTTP status (if any) and the
+    time of the failure. The file is only created once a first failure is
+    recorded, and it can be fed back to the crawler for a later retry pass, see
+    ``load_dead_letters`` and ``compact_dead_letters``.
+
+    Args:
+        path (str or Path): Path of the dead-letter file.
+    """
+    def __init__(self, path: Union[str, Path]):
+        self.path = path
+        self.writer = None
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, url: str, error: Exception):
+        """Record the failure of url."""
+        if self.writer is None:
+            self.writer = JsonlWriter(self.path)
+        self.writer.write({
+            "url": url,
+            "error": str(error),
+            "status": getattr(error, "status", None),
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        })
+        self.count += 1
+
+    def flush(self):
+        """Block until every failure recorded so far has been written to the file."""
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if self.count:
+            logger.warning(f"{self.count} URLs failed and were recorded in {self.path}.")
+
+
+def load_dead_letters(path: Union[str, Path]):
+    """Return the unique URLs of a dead-letter file in order, or [] if it does not exist."""
+    if not os.path.isfile(path):
+        return []
+    return list(dict.fromkeys(iter_jsonl(path, key="url")))
+
+
+def compact_dead_letters(path: Union[str, Path], done):
+    """Rewrite a dead-letter file, dropping the URLs in done and keeping one record per URL.
+
+    Args:
+        path (str or Path): Path of the dead-letter file.
+        done (Container): URLs which have been fetched since, e.g. a ``SeenIndex``.
+
+    Returns:
+        int: Number of URLs left in the file. The file is removed if none is left.
+    """
+    if not os.path.isfile(path):
+        return 0
+    records = {}
+    for record in iter_jsonl(path):
+        url = record.get("url")
+        if (url is not None) and (url not in done):
+            records[url] = record
+    if not records:
+        os.remove(path)
+        return 0
+    tmp_path = str(path) + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    with JsonlWriter(tmp_path) as writer:
+        writer.write_many(records.values())
+    os.replace(tmp_path, path)
+    return len(records)
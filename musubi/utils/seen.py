@@ -0,0 +1,271 @@
+import os
+import sqlite3
+import hashlib
+import orjson
+from pathlib import Path
+from typing import Iterable, Optional, Union
+from urllib.parse import urlsplit, urlunsplit
+from .sink import read_manifest, iter_shard_records
+
+
+_TAIL_SIZE = 64
+_SYNC_BATCH = 10000
+
+
+def normalize_url(url: str):
+    """Normalize a URL before hashing it into a seen-URL index.
+
+    The scheme and host are lower-cased, default ports and fragments are
+    dropped, and an empty path becomes ``/``. Query strings are kept as they
+    are since they often identify different articles.
+
+    Args:
+        url (str): URL to normalize.
+
+    Returns:
+        str: The normalized URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parts.path or "/"
+    return urlunsplit((scheme, netloc, path, parts.query, ""))
+
+
+def hash_url(url: str):
+    """Hash a normalized URL into a signed 64-bit integer key."""
+    digest = hashlib.blake2b(normalize_url(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def get_seen_index_path(url_path: Union[str, Path]):
+    """Return the path of the seen-URL index stored next to a ``*_link.json`` file."""
+    return Path(url_path).with_suffix(".seen.db")
+
+
+class SeenIndex:
+    """A persistent, hashed set of already seen URLs backed by SQLite.
+
+    Every URL is normalized and hashed into a 64-bit integer primary key, so
+    membership checks and inserts cost a single index lookup instead of a scan
+    over a Python list. The index can be tied to a JSONL file: on opening, only
+    the lines appended since the last synchronization are read, and the index
+    is rebuilt from scratch if the file was rewritten in the meantime (e.g. by
+    ``deduplicate_by_value`` or ``filter_null_data``). The index can also be tied
+    to a sharded output folder (see ``ShardedWriter``), in which case only the
+    URL column of the shards closed since the last synchronization and of the
+    open shard is read.
+
+    The JSONL file is the source of truth: URLs added with ``add`` are only
+    committed together with a synchronization, so after a crash the index never
+    claims a URL whose record did not reach the file.
+
+    Args:
+        db_path (str or Path): Path of the SQLite database.
+        table (str, optional): Name of the set inside the database. Several sets
+            (e.g. ``link`` and ``content``) can share one database file.
+            Defaults to 'link'.
+        jsonl_path (str or Path, optional): JSONL file or sharded output folder
+            whose records populate the index. Defaults to None.
+        key (str, optional): Field of the JSONL records holding the URL. Required
+            if jsonl_path is given. Defaults to None.
+
+    Example:
+        ::
+
+            with SeenIndex("crawler/test/test_link.seen.db", jsonl_path="crawler/test/test_link.json", key="link") as seen:
+                if link not in seen:
+                    seen.add(link)
+    """
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        table: str = "link",
+        jsonl_path: Optional[Union[str, Path]] = None,
+        key: Optional[str] = None
+    ):
+        if not table.isidentifier():
+            raise ValueError("Invalid table name `{}` for seen index.".format(table))
+        if (jsonl_path is not None) and (key is None):
+            raise ValueError("Argument `key` is required when `jsonl_path` is given.")
+        self.db_path = db_path
+        self.table = "seen_" + table
+        self.name = table
+        self.jsonl_path = jsonl_path
+        self.key = key
+
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS {} (hash INTEGER PRIMARY KEY)".format(self.table))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state (name TEXT PRIMARY KEY, offset INTEGER, tail BLOB)"
+        )
+        self.conn.commit()
+
+        if self.jsonl_path is not None:
+            self.sync()
+
+    def __contains__(self, url: str):
+        if url is None:
+            return False
+        cur = self.conn.execute("SELECT 1 FROM {} WHERE hash = ?".format(self.table), (hash_url(url),))
+        return cur.fetchone() is not None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM {}".format(self.table)).fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, url: str):
+        """Add a URL to the index.
+
+        Args:
+            url (str): URL to add.
+
+        Returns:
+            bool: True if the URL was not in the index before, False otherwise.
+        """
+        cur = self.conn.execute("INSERT OR IGNORE INTO {} (hash) VALUES (?)".format(self.table), (hash_url(url),))
+        return cur.rowcount > 0
+
+    def update(self, urls: Iterable[str]):
+        """Add many URLs to the index in a single batch."""
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO {} (hash) VALUES (?)".format(self.table),
+            ((hash_url(url),) for url in urls if url is not None)
+        )
+        self.commit()
+
+    def clear(self):
+        """Remove every URL from the index and reset its synchronization state."""
+        self.conn.execute("DELETE FROM {}".format(self.table))
+        self.conn.execute("DELETE FROM sync_state WHERE name = ?", (self.name,))
+        self.commit()
+
+    def commit(self):
+        self.conn.commit()
+
+    def _read_tail(self, file, offset: int):
+        start = max(0, offset - _TAIL_SIZE)
+        file.seek(start)
+        return file.read(offset - start)
+
+    def sync(self):
+        """Bring the index up to date with the JSONL file it is tied to.
+
+        Only lines appended after the last synchronization are read. If the file
+        has been truncated or rewritten, the index is rebuilt from the whole file.
+        An incomplete trailing line (e.g. after a crash) is left for the next sync.
+        """
+        if self.jsonl_path is None:
+            return
+        if os.path.isdir(self.jsonl_path):
+            self._sync_shards()
+            return
+        row = self.conn.execute("SELECT offset, tail FROM sync_state WHERE name = ?", (self.name,)).fetchone()
+        offset, tail = row if row is not None else (0, b"")
+
+        if not os.path.isfile(self.jsonl_path):
+            if offset:
+                self.clear()
+            return
+
+        with open(self.jsonl_path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if (size < offset) or (self._read_tail(file, offset) != tail):
+                self.clear()
+                offset = 0
+
+            file.seek(offset)
+            batch = []
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    value = orjson.loads(line).get(self.key)
+                except (orjson.JSONDecodeError, AttributeError):
+                    continue
+                if value is not None:
+                    batch.append((hash_url(value),))
+                if len(batch) >= _SYNC_BATCH:
+                    self.conn.executemany("INSERT OR IGNORE INTO {} (hash) VALUES (?)".format(self.table), batch)
+                    batch = []
+            if batch:
+                self.conn.executemany("INSERT OR IGNORE INTO {} (hash) VALUES (?)".format(self.table), batch)
+            tail = self._read_tail(file, offset)
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sync_state (name, offset, tail) VALUES (?, ?, ?)",
+            (self.name, offset, tail)
+        )
+        self.commit()
+
+    def _sync_shards(self):
+        # offset counts the closed shards already read, tail identifies the folder
+        manifest = read_manifest(self.jsonl_path)
+        row = self.conn.execute("SELECT offset, tail FROM sync_state WHERE name = ?", (self.name,)).fetchone()
+        offset, tail = row if row is not None else (0, b"")
+        if manifest is None:
+            if offset:
+                self.clear()
+            return
+
+        manifest_id = manifest["id"].encode("utf-8")
+        if (tail != manifest_id) or (len(manifest["shards"]) < offset):
+            self.clear()
+            offset = 0
+        shards = manifest["shards"][offset:]
+        if manifest.get("open") is not None:
+            # the open shard is still growing, so it is read again on every sync
+            shards.append(manifest["open"])
+
+        batch = []
+        for shard in shards:
+            for record in iter_shard_records(self.jsonl_path, shard, columns=[self.key]):
+                if record[self.key] is not None:
+                    batch.append((hash_url(record[self.key]),))
+                if len(batch) >= _SYNC_BATCH:
+                    self.conn.executemany("INSERT OR IGNORE INTO {} (hash) VALUES (?)".format(self.table), batch)
+                    batch = []
+        if batch:
+            self.conn.executemany("INSERT OR IGNORE INTO {} (hash) VALUES (?)".format(self.table), batch)
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sync_state (name, offset, tail) VALUES (?, ?, ?)",
+            (self.name, len(manifest["shards"]), manifest_id)
+        )
+        self.commit()
+
+    def close(self):
+        """Synchronize with the tied JSONL file, commit and close the database."""
+        if self.conn is None:
+            return
+        self.sync()
+        self.commit()
+        self.conn.close()
+        self.conn = None
+
+
+def open_link_index(url_path: Union[str, Path]):
+    """Open the seen-URL index of the links saved in a ``*_link.json`` file."""
+    return SeenIndex(get_seen_index_path(url_path), table="link", jsonl_path=url_path, key="link")
+
+
+def open_content_index(url_path: Union[str, Path], save_path: Union[str, Path]):
+    """Open the seen-URL index of the contents saved in save_path.
+
+    The index lives next to the ``*_link.json`` file of the website so that the
+    data folder only contains crawled contents.
+    """
+    return SeenIndex(get_seen_index_path(url_path), table="content", jsonl_path=save_path, key="url")
@@ -0,0 +1,370 @@
+import os
+import uuid
+import shutil
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+from loguru import logger
+from .helpers import iter_jsonl
+from .writer import JsonlWriter
+
+
+OUTPUT_FORMATS = ("jsonl", "jsonl.zst", "parquet")
+DEFAULT_MAX_SHARD_BYTES = 64 * 1024 * 1024
+MANIFEST_NAME = "manifest.json"
+_READ_SIZE = 1024 * 1024
+
+
+def _check_format(output_format: str):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            "Argument `output_format` should be one of {} but got `{}`.".format(", ".join(OUTPUT_FORMATS), output_format)
+        )
+
+
+def get_output_path(save_dir: Union[str, Path], name: str, output_format: str = "jsonl"):
+    """Return where the contents of a website are saved for an output format.
+
+    JSONL output is a single ``{name}.json`` file, sharded output a ``{name}``
+    folder holding the shards and their manifest.
+    """
+    _check_format(output_format)
+    if output_format == "jsonl":
+        return Path(save_dir) / "{}.json".format(name)
+    return Path(save_dir) / name
+
+
+def read_manifest(path: Union[str, Path]):
+    """Return the manifest of a sharded output folder, or None if it has none."""
+    manifest_path = Path(path) / MANIFEST_NAME
+    if not manifest_path.is_file():
+        return None
+    with open(manifest_path, "rb") as file:
+        return orjson.loads(file.read())
+
+
+def _write_manifest(path: Union[str, Path], manifest: dict):
+    manifest_path = Path(path) / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_path, manifest_path)
+
+
+def _list_shards(manifest: dict):
+    shards = list(manifest["shards"])
+    if manifest.get("open") is not None:
+        shards.append(manifest["open"])
+    return shards
+
+
+def _iter_lines(path: Union[str, Path], start: int, end: int):
+    # frames are independent, so any frame boundary is a valid place to start decompressing
+    with open(path, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+    stream = pa.CompressedInputStream(pa.BufferReader(data), "zstd")
+    pending = b""
+    while True:
+        chunk = stream.read(_READ_SIZE)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+def _project(record: dict, columns: Optional[List[str]]):
+    if columns is None:
+        return record
+    return {column: record.get(column) for column in columns}
+
+
+def iter_shard_records(path: Union[str, Path], shard: dict, columns: Optional[List[str]] = None):
+    """Iterate over the records of one shard listed in the manifest of path."""
+    shard_path = Path(path) / shard["name"]
+    if shard["name"].endswith(".parquet"):
+        parquet_file = pq.ParquetFile(shard_path)
+        if columns is not None:
+            names = parquet_file.schema_arrow.names
+            read_columns = [column for column in columns if column in names]
+        else:
+            read_columns = None
+        for batch in parquet_file.iter_batches(columns=read_columns):
+            for record in batch.to_pylist():
+                yield _project(record, columns)
+    else:
+        for line in _iter_lines(shard_path, 0, shard["bytes"]):
+            yield _project(orjson.loads(line), columns)
+
+
+def iter_records(path: Union[str, Path], columns: Optional[List[str]] = None):
+    """Lazily iterate over the records of a content output, whatever its format.
+
+    Args:
+        path (str or Path): A JSONL file, or a sharded output folder.
+        columns (list, optional): If given, only these fields are returned. Parquet
+            shards then only read these columns from disk, so e.g. listing the
+            crawled URLs does not decompress any content. Defaults to None.
+
+    Yields:
+        dict: Each record of the output.
+
+    Example:
+        ::
+
+            urls = [record["url"] for record in iter_records("data/中文/test/test", columns=["url"])]
+    """
+    if not os.path.isdir(path):
+        for record in iter_jsonl(path):
+            yield _project(record, columns)
+        return
+    manifest = read_manifest(path)
+    if manifest is None:
+        return
+    for shard in _list_shards(manifest):
+        yield from iter_shard_records(path, shard, columns)
+
+
+def is_empty_output(path: Union[str, Path]):
+    """Return True if a content output does not exist or holds no record."""
+    if os.path.isdir(path):
+        manifest = read_manifest(path)
+        return (manifest is None) or all(shard["records"] == 0 for shard in _list_shards(manifest))
+    return (not os.path.isfile(path)) or (os.stat(path).st_size == 0)
+
+
+def remove_output(path: Union[str, Path]):
+    """Remove a content output, either a JSONL file or a sharded folder."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.isfile(path):
+        os.remove(path)
+
+
+def replace_output(src: Union[str, Path], dst: Union[str, Path]):
+    """Move a content output to dst, replacing the one there."""
+    if os.path.isdir(src):
+        old_path = Path(str(dst) + ".old")
+        remove_output(old_path)
+        if os.path.exists(dst):
+            os.replace(dst, old_path)
+        os.replace(src, dst)
+        remove_output(old_path)
+    else:
+        os.replace(src, dst)
+
+
+class ShardedWriter(JsonlWriter):
+    """A content writer saving records into size-capped, compressed shards.
+
+    Records are written into a folder of shards listed in a small
+    ``manifest.json``. Every batch is appended to the open shard as one zstd frame
+    of JSONL lines, and the manifest is updated after each batch, so a flushed
+    record survives a crash like with ``JsonlWriter``. Once the open shard reaches
+    ``max_shard_bytes``, it is closed and a new one started. With the 'parquet'
+    format, closed shards are converted into zstd-compressed Parquet files with
+    row groups of ``row_group_size`` records, whose columns can be read on their
+    own (e.g. only the URLs with ``iter_records(path, columns=["url"])``).
+
+    Closed shards are never rewritten, so reopening the folder costs the same
+    however large it is. The open shard is kept on close and appended to by the
+    next run.
+
+    Args:
+        path (str or Path): Folder of the shards, created if needed.
+        output_format (str, optional): 'jsonl.zst' or 'parquet'. Defaults to
+            'jsonl.zst'.
+        max_shard_bytes (int, optional): Compressed size at which the open shard
+            is closed. Defaults to 64 MiB.
+        row_group_size (int, optional): Number of records of a Parquet row group.
+            Defaults to 10000.
+        skip_empty (str, optional): If given, records whose value for this field is
+            None are not stored, unless they mark a near duplicate, as
+            ``filter_null_data`` would remove them from a JSONL file. Defaults to None.
+        **kwargs: Arguments of ``JsonlWriter`` (batch_size, flush_interval, fsync,
+            max_queue_size).
+
+    Raises:
+        ValueError: If the folder holds shards of another format.
+
+    Example:
+        ::
+
+            with ShardedWriter("data/中文/test/test", output_format="parquet") as writer:
+                writer.write({"content": "...", "url": "https://example.com/1"})
+    """
+    def __init__(
+        self,
+        path: Union[str, Path],
+        output_format: str = "jsonl.zst",
+        max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES,
+        row_group_size: int = 10000,
+        skip_empty: Optional[str] = None,
+        **kwargs
+    ):
+        if output_format == "jsonl":
+            raise ValueError("Use `JsonlWriter` to write a single JSONL file.")
+        _check_format(output_format)
+        self.output_format = output_format
+        self.max_shard_bytes = max_shard_bytes
+        self.row_group_size = row_group_size
+        self.skip_empty = skip_empty
+        self.codec = pa.Codec("zstd")
+
+        Path(path).mkdir(parents=True, exist_ok=True)
+        self.manifest = read_manifest(path)
+        if self.manifest is None:
+            self.manifest = {"id": uuid.uuid4().hex, "format": output_format, "shards": [], "open": None}
+        elif self.manifest["format"] != output_format:
+            raise ValueError(
+                "{} holds `{}` shards, not `{}` ones.".format(path, self.manifest["format"], output_format)
+            )
+        super().__init__(path, **kwargs)
+
+    def write(self, record: dict):
+        """Queue one record to be written to the open shard."""
+        if (self.skip_empty is not None) and (record.get(self.skip_empty) is None) \
+                and (record.get("duplicate_of") is None):
+            self._check()
+            return
+        super().write(record)
+
+    def _staging_name(self, index: int):
+        return "part-{:05d}.jsonl.zst".format(index)
+
+    def _open(self):
+        self.file = None
+        index = len(self.manifest["shards"])
+        if self.output_format == "parquet":
+            # staging files left by a crash right after their conversion
+            for i in range(index):
+                stale_path = Path(self.path) / self._staging_name(i)
+                if stale_path.is_file():
+                    os.remove(stale_path)
+
+        staging_path = Path(self.path) / self._staging_name(index)
+        open_shard = self.manifest["open"]
+        committed = open_shard["bytes"] if open_shard is not None else 0
+        if staging_path.is_file() and (os.path.getsize(staging_path) > committed):
+            # drop the frames written after the last manifest update
+            logger.warning(f"Truncating {staging_path} to its last committed frame.")
+            with open(staging_path, "r+b") as file:
+                file.truncate(committed)
+
+    def _write(self, lines: list):
+        if self.manifest["open"] is None:
+            name = self._staging_name(len(self.manifest["shards"]))
+            self.manifest["open"] = {"name": name, "records": 0, "bytes": 0}
+            self.file = open(Path(self.path) / name, "wb")
+        elif self.file is None:
+            self.file = open(Path(self.path) / self.manifest["open"]["name"], "ab")
+
+        frame = self.codec.compress(b"".join(lines), asbytes=True)
+        self.file.write(frame)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.manifest["open"]["records"] += len(lines)
+        self.manifest["open"]["bytes"] += len(frame)
+        _write_manifest(self.path, self.manifest)
+
+        if self.manifest["open"]["bytes"] >= self.max_shard_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self.file.close()
+        self.file = None
+        shard = self.manifest["open"]
+        if self.output_format == "parquet":
+            staging_path = Path(self.path) / shard["name"]
+            shard = self._convert(shard)
+        self.manifest["shards"].append(shard)
+        self.manifest["open"] = None
+        _write_manifest(self.path, self.manifest)
+        if self.output_format == "parquet":
+            os.remove(staging_path)
+        logger.info(f"Closed shard {shard['name']} of {self.path} with {shard['records']} records.")
+
+    def _iter_batches(self, shard: dict):
+        batch = []
+        for line in _iter_lines(Path(self.path) / shard["name"], 0, shard["bytes"]):
+            batch.append(orjson.loads(line))
+            if len(batch) >= self.row_group_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _convert(self, shard: dict):
+        # a first pass finds a schema covering every batch, e.g. fields only some records have
+        schemas = [pa.Table.from_pylist(batch).schema for batch in self._iter_batches(shard)]
+        schema = pa.unify_schemas(schemas, promote_options="permissive")
+        name = shard["name"].replace(".jsonl.zst", ".parquet")
+        parquet_path = Path(self.path) / name
+        with pq.ParquetWriter(parquet_path, schema, compression="zstd") as writer:
+            for batch in self._iter_batches(shard):
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema), row_group_size=self.row_group_size)
+        return {"name": name, "records": shard["records"], "bytes": os.path.getsize(parquet_path)}
+
+    def _release(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def open_content_writer(
+    path: Union[str, Path],
+    output_format: str = "jsonl",
+    max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES,
+    skip_empty: Optional[str] = None
+):
+    """Open the writer of a content output in the given format.
+
+    Args:
+        path (str or Path): A JSONL file for 'jsonl', a folder of shards otherwise.
+        output_format (str, optional): 'jsonl', 'jsonl.zst' or 'parquet'.
+            Defaults to 'jsonl'.
+        max_shard_bytes (int, optional): Compressed size of a shard. Defaults to
+            64 MiB.
+        skip_empty (str, optional): Field whose None values are not stored in
+            shards, see ``ShardedWriter``. Ignored for JSONL. Defaults to None.
+
+    Returns:
+        JsonlWriter: A ``JsonlWriter`` or a ``ShardedWriter``.
+    """
+    _check_format(output_format)
+    if output_format == "jsonl":
+        return JsonlWriter(path)
+    return ShardedWriter(path, output_format=output_format, max_shard_bytes=max_shard_bytes, skip_empty=skip_empty)
+
+
+def write_records(
+    records: Iterable[dict],
+    path: Union[str, Path],
+    output_format: str = "jsonl",
+    max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES
+):
+    """Write records into a new content output, replacing path once complete.
+
+    This converts existing outputs, e.g. a JSONL file into Parquet shards with
+    ``write_records(iter_records("test.json"), "test", "parquet")``.
+
+    Returns:
+        int: Number of written records.
+    """
+    count = 0
+    tmp_path = Path(str(path) + ".tmp")
+    remove_output(tmp_path)
+    with open_content_writer(tmp_path, output_format, max_shard_bytes) as writer:
+        for record in records:
+            writer.write(record)
+            count += 1
+    replace_output(tmp_path, path)
+    return count
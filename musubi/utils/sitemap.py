@@ -0,0 +1,352 @@
+import os
+import re
+import zlib
+import orjson
+from collections import deque
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Optional, Union
+from urllib.parse import urljoin, urlparse
+from lxml import etree
+from loguru import logger
+from .http import get_session
+from .conditional import conditional_get
+from .rate_limit import rate_limiter
+from .retry import FetchError, RetryPolicy, CircuitBreaker, retry_policy, circuit_breaker
+
+
+_CHUNK_SIZE = 64 * 1024
+_GZIP_MAGIC = b"\x1f\x8b"
+_SITEMAP_SUFFIXES = (".xml", ".xml.gz", ".txt", ".gz")
+# `tag` of the pull parser, matching the elements with or without the sitemap namespace
+_ENTRY_TAGS = ("{*}url", "{*}sitemap")
+
+
+def get_sitemap_state_path(url_path: Union[str, Path]):
+    """Return the path of the sitemap crawl state stored next to a ``*_link.json`` file."""
+    return Path(url_path).with_suffix(".sitemap.json")
+
+
+def load_last_run(url_path: Union[str, Path]):
+    """Return the start time of the last complete sitemap crawl of a website, or None."""
+    path = get_sitemap_state_path(url_path)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "rb") as file:
+            return parse_lastmod(orjson.loads(file.read()).get("last_run"))
+    except (orjson.JSONDecodeError, AttributeError):
+        logger.warning(f"Ignoring unreadable sitemap state {path}.")
+        return None
+
+
+def save_last_run(url_path: Union[str, Path], time: datetime):
+    """Record the start time of a complete sitemap crawl, replacing the state atomically."""
+    path = get_sitemap_state_path(url_path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(orjson.dumps({"last_run": time.isoformat(timespec="seconds")}))
+    os.replace(tmp_path, path)
+
+
+def parse_lastmod(value: Optional[str]):
+    """Parse a W3C datetime as found in ``<lastmod>`` into an aware UTC datetime.
+
+    Every precision allowed by the sitemap protocol is accepted, from ``2024`` to
+    ``2024-05-01T12:30:15.5+08:00``. Dates without a timezone are taken as UTC.
+
+    Args:
+        value (str): Value of the lastmod element.
+
+    Returns:
+        datetime: The parsed time, or None if value is empty or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    try:
+        if len(value) == 4:
+            time = datetime(int(value), 1, 1)
+        elif len(value) == 7:
+            time = datetime(int(value[:4]), int(value[5:7]), 1)
+        else:
+            # fromisoformat of older Pythons only accepts 3 or 6 fractional digits
+            match = re.match(r"^(.*T\d\d:\d\d:\d\d)\.(\d+)(.*)$", value)
+            if match:
+                value = "{}.{}{}".format(match.group(1), match.group(2)[:6].ljust(6, "0"), match.group(3))
+            time = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    return time.astimezone(timezone.utc)
+
+
+def is_sitemap_url(url: str):
+    """Return True if url points to a sitemap file rather than to a website."""
+    return urlparse(url).path.lower().endswith(_SITEMAP_SUFFIXES)
+
+
+def parse_robots_sitemaps(text: str, base_url: str):
+    """Return the sitemap URLs declared with ``Sitemap:`` lines in a robots.txt."""
+    sitemaps = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        name, sep, value = line.partition(":")
+        if sep and (name.strip().lower() == "sitemap") and value.strip():
+            sitemaps.append(urljoin(base_url, value.strip()))
+    return list(dict.fromkeys(sitemaps))
+
+
+def find_sitemaps(
+    url: str,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = circuit_breaker
+):
+    """Find the sitemaps of a website from its robots.txt.
+
+    Args:
+        url (str): Any URL of the website.
+        policy (RetryPolicy, optional): Retry policy. Defaults to the shared one.
+        breaker (CircuitBreaker, optional): Circuit breaker of the hosts.
+            Defaults to the shared one.
+
+    Returns:
+        list: The sitemaps declared in robots.txt, or ``/sitemap.xml`` if it declares
+            none or cannot be fetched.
+    """
+    parse = urlparse(url)
+    root = parse.scheme + "://" + parse.netloc
+    robots_url = root + "/robots.txt"
+    policy = policy or retry_policy
+
+    def attempt():
+        rate_limiter.wait(robots_url)
+        response = get_session().get(robots_url, timeout=policy.timeout())
+        policy.check_status(robots_url, response.status_code, response.headers)
+        return response
+
+    sitemaps = []
+    try:
+        response = policy.call(robots_url, attempt, breaker)
+        if response.status_code == 200:
+            sitemaps = parse_robots_sitemaps(response.text, root)
+    except FetchError as e:
+        logger.warning(f"Failed to read {robots_url}: {e}")
+    if not sitemaps:
+        logger.info(f"No sitemap declared in {robots_url}, trying {root}/sitemap.xml.")
+        sitemaps = [root + "/sitemap.xml"]
+    return sitemaps
+
+
+class _SitemapParser:
+    # incremental parser of one sitemap body: gzip is detected from the first
+    # bytes, XML is pull-parsed and plain text sitemaps are split into lines
+    def __init__(self):
+        self.decompressor = None
+        self.xml = None
+        self.text = None
+        self.head = b""
+        self.started = False
+
+    def _start(self, data: bytes):
+        if data.startswith(_GZIP_MAGIC):
+            self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            data = self.decompressor.decompress(data)
+        head = data.lstrip(b"\xef\xbb\xbf \t\r\n")
+        if head.startswith(b"<"):
+            self.xml = etree.XMLPullParser(
+                events=("end",), tag=_ENTRY_TAGS, resolve_entities=False, no_network=True, huge_tree=True
+            )
+        else:
+            self.text = b""
+        self.started = True
+        return data
+
+    def feed(self, data: bytes):
+        if not self.started:
+            self.head += data
+            if len(self.head) < 2:
+                # gzip detection needs the first two bytes
+                return []
+            data = self._start(self.head)
+        elif self.decompressor is not None:
+            data = self.decompressor.decompress(data)
+        return self._parse(data)
+
+    def close(self):
+        data = b""
+        if not self.started:
+            if not self.head:
+                return []
+            data = self._start(self.head)
+        if self.decompressor is not None:
+            data += self.decompressor.flush()
+        entries = self._parse(data)
+        if self.xml is not None:
+            self.xml.close()
+            entries += self._read_xml()
+        elif self.text:
+            entries += self._parse(b"\n")
+        return entries
+
+    def _parse(self, data: bytes):
+        if self.xml is not None:
+            if data:
+                self.xml.feed(data)
+            return self._read_xml()
+        self.text += data
+        *lines, self.text = self.text.split(b"\n")
+        entries = []
+        for line in lines:
+            line = line.strip().decode("utf-8", errors="replace")
+            if line.startswith("http"):
+                entries.append(("url", line, None))
+        return entries
+
+    def _read_xml(self):
+        entries = []
+        for _, element in self.xml.read_events():
+            loc = element.findtext("{*}loc")
+            if loc is not None and loc.strip():
+                entries.append((etree.QName(element).localname, loc.strip(), parse_lastmod(element.findtext("{*}lastmod"))))
+            # drop the parsed entries, so that memory does not grow with the sitemap
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+        return entries
+
+
+def iter_sitemap(
+    url: str,
+    validators=None,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = circuit_breaker
+):
+    """Stream the entries of one sitemap file.
+
+    The body is downloaded in chunks and parsed as it arrives, so memory stays
+    bounded however large the sitemap is. Gzip sitemaps are detected from their
+    first bytes (whether or not the server sets ``Content-Encoding``), and plain
+    text sitemaps (one URL per line) are supported as well.
+
+    Args:
+        url (str): URL of the sitemap.
+        validators (ValidatorCache, optional): If given, the sitemap is requested
+            conditionally and nothing is yielded if it has not changed. Validators
+            are not stored, see ``conditional_get``. Defaults to None.
+        policy (RetryPolicy, optional): Retry policy of the request. Defaults to
+            the shared one.
+        breaker (CircuitBreaker, optional): Circuit breaker of the hosts.
+            Defaults to the shared one.
+
+    Yields:
+        tuple: ``(kind, loc, lastmod)``, where kind is 'url' for a page and
+            'sitemap' for a child sitemap of a sitemap index, and lastmod is an
+            aware datetime or None.
+
+    Raises:
+        FetchError: If the request failed after retries, or the body could not be
+            downloaded or parsed.
+    """
+    policy = policy or retry_policy
+
+    def attempt():
+        rate_limiter.wait(url)
+        response = conditional_get(url, validators, stream=True, timeout=policy.timeout())
+        try:
+            policy.check_status(url, response.status_code, response.headers)
+        except FetchError:
+            response.close()
+            raise
+        return response
+
+    response = policy.call(url, attempt, breaker)
+    with response:
+        if response.status_code == 304:
+            logger.info(f"{url} is not modified since the last crawl, skip it.")
+            return
+        if response.status_code != 200:
+            raise FetchError(url, "HTTP {}".format(response.status_code), status=response.status_code)
+        headers = response.headers
+        parser = _SitemapParser()
+        try:
+            for chunk in response.iter_content(_CHUNK_SIZE):
+                yield from parser.feed(chunk)
+            yield from parser.close()
+        except (etree.XMLSyntaxError, zlib.error, OSError) as e:
+            raise FetchError(url, "Failed to parse sitemap {}: {!r}".format(url, e)) from e
+    if validators is not None:
+        validators.update(url, headers)
+
+
+def iter_sitemap_links(
+    sitemaps: Iterable[str],
+    url_pattern: Optional[str] = None,
+    since: Optional[datetime] = None,
+    validators=None,
+    on_error: Optional[Callable] = None,
+    on_done: Optional[Callable] = None,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = circuit_breaker
+):
+    """Stream the page URLs of a set of sitemaps, following sitemap indexes.
+
+    Child sitemaps of an index are read after the index itself, and those whose
+    ``lastmod`` is not newer than since are skipped without being downloaded.
+    The sitemaps passed in are always requested in full, since an index without
+    lastmod may be unchanged while its children are not; with validators, only
+    the children are requested conditionally.
+
+    Args:
+        sitemaps (Iterable[str]): URLs of the sitemaps or sitemap indexes.
+        url_pattern (str, optional): Regular expression the page URLs should
+            match (``re.search``). Defaults to None, keeping every page.
+        since (datetime, optional): Only pages whose lastmod is newer are kept.
+            Pages without lastmod are always kept. Defaults to None.
+        validators (ValidatorCache, optional): Validators of the child sitemaps.
+            Defaults to None.
+        on_error (Callable, optional): Called with ``(url, error)`` when a sitemap
+            fails. If None, the error is raised. Defaults to None.
+        on_done (Callable, optional): Called with the URL of every sitemap read
+            successfully. Defaults to None.
+        policy (RetryPolicy, optional): Retry policy. Defaults to the shared one.
+        breaker (CircuitBreaker, optional): Circuit breaker of the hosts.
+            Defaults to the shared one.
+
+    Yields:
+        str: URLs of the pages, in the order of the sitemaps.
+    """
+    pattern = re.compile(url_pattern) if url_pattern else None
+    pending = deque((url, False) for url in sitemaps)
+    visited = set()
+    while pending:
+        url, child = pending.popleft()
+        if url in visited:
+            continue
+        visited.add(url)
+        children = []
+        try:
+            for kind, loc, lastmod in iter_sitemap(url, validators if child else None, policy, breaker):
+                if kind == "sitemap":
+                    if (since is None) or (lastmod is None) or (lastmod > since):
+                        children.append((urljoin(url, loc), True))
+                    continue
+                if (since is not None) and (lastmod is not None) and (lastmod <= since):
+                    continue
+                if (pattern is not None) and (not pattern.search(loc)):
+                    continue
+                yield loc
+        except FetchError as e:
+            if on_error is None:
+                raise
+            on_error(url, e)
+            continue
+        if on_done is not None:
+            on_done(url)
+        # children are read right after their index, depth first
+        pending.extendleft(reversed(children))
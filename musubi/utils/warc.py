@@ -0,0 +1,424 @@
+import os
+import gzip
+import uuid
+import base64
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from typing import Iterable, List, Mapping, Optional, Union
+from loguru import logger
+from .helpers import iter_file_chunks
+from .extraction import extract_documents, sniff_kind
+
+
+WARC_VERSION = "WARC/1.1"
+# the body handed over by requests / aiohttp is already decoded, so these
+# headers would not describe the stored payload anymore
+_DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+def _warc_date():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _record_id():
+    return "<urn:uuid:{}>".format(uuid.uuid4())
+
+
+def _format_sha1(sha1):
+    return "sha1:" + base64.b32encode(sha1.digest()).decode("ascii")
+
+
+def _sha1_digest(data: bytes):
+    return _format_sha1(hashlib.sha1(data))
+
+
+def _format_headers(headers: Optional[Mapping[str, str]], drop: set = frozenset()):
+    lines = []
+    if headers is not None:
+        for name, value in headers.items():
+            if name.lower() in drop:
+                continue
+            lines.append("{}: {}\r\n".format(name, value))
+    return "".join(lines)
+
+
+def _http_head(status: int, reason: Optional[str], headers: Optional[Mapping[str, str]], body_length: int):
+    return (
+        "HTTP/1.1 {} {}\r\n".format(status, reason or "")
+        + _format_headers(headers, drop=_DROPPED_HEADERS)
+        + "Content-Length: {}\r\n\r\n".format(body_length)
+    ).encode("utf-8", errors="replace")
+
+
+class WarcWriter:
+    """Archive HTTP requests and responses into rotating gzip-compressed WARC files.
+
+    Every WARC record is written as its own gzip member, so segments can be read
+    by any WARC tool and records can be located by byte offset. A new segment,
+    starting with a ``warcinfo`` record, is opened once the current one exceeds
+    ``max_segment_bytes``. Writing is guarded by a lock, so one writer may be
+    shared by several threads.
+
+    Args:
+        warc_dir (str or Path): Folder of the WARC segments. Created if it does not
+            exist.
+        prefix (str, optional): Prefix of the segment file names. Defaults to
+            'musubi'.
+        max_segment_bytes (int, optional): Size in bytes after which a new segment
+            is started. Defaults to 1 GiB.
+        compress_level (int, optional): gzip compression level from 0 to 9.
+            Defaults to 6.
+
+    Example:
+        ::
+
+            with WarcWriter("warc/test") as warc:
+                response = get_session().get(url)
+                warc.write_response(
+                    url,
+                    response.status_code,
+                    response.reason,
+                    response.headers,
+                    response.content,
+                    request_headers=response.request.headers
+                )
+    """
+    def __init__(
+        self,
+        warc_dir: Union[str, Path],
+        prefix: str = "musubi",
+        max_segment_bytes: int = 1024 ** 3,
+        compress_level: int = 6
+    ):
+        self.warc_dir = Path(warc_dir)
+        self.warc_dir.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_segment_bytes = max_segment_bytes
+        self.compress_level = compress_level
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.serial = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open_segment(self):
+        if self.file is not None:
+            self.file.close()
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        while True:
+            self.path = self.warc_dir / "{}-{}-{:05d}.warc.gz".format(self.prefix, timestamp, self.serial)
+            self.serial += 1
+            if not self.path.exists():
+                break
+        self.file = open(self.path, "ab")
+        info = "software: musubi\r\nformat: WARC File Format 1.1\r\n".encode("utf-8")
+        self._write_record(
+            "warcinfo",
+            info,
+            content_type="application/warc-fields",
+            extra_headers={"WARC-Filename": self.path.name}
+        )
+
+    def _write_record(
+        self,
+        warc_type: str,
+        block: bytes,
+        content_type: str,
+        url: Optional[str] = None,
+        record_id: Optional[str] = None,
+        extra_headers: Optional[Mapping[str, str]] = None,
+        block_length: Optional[int] = None,
+        block_digest: Optional[str] = None
+    ):
+        # block is either bytes, or an iterable of chunks of block_length bytes
+        # whose digest is block_digest, streamed into the gzip member
+        streamed = not isinstance(block, bytes)
+        headers = {
+            "WARC-Type": warc_type,
+            "WARC-Record-ID": record_id or _record_id(),
+            "WARC-Date": _warc_date(),
+        }
+        if url is not None:
+            headers["WARC-Target-URI"] = url
+        if extra_headers:
+            headers.update(extra_headers)
+        headers["WARC-Block-Digest"] = block_digest if streamed else _sha1_digest(block)
+        headers["Content-Type"] = content_type
+        headers["Content-Length"] = str(block_length if streamed else len(block))
+
+        head = (WARC_VERSION + "\r\n" + _format_headers(headers) + "\r\n").encode("utf-8")
+        if not streamed:
+            self.file.write(gzip.compress(head + block + b"\r\n\r\n", compresslevel=self.compress_level))
+            return
+        with gzip.GzipFile(filename="", mode="wb", compresslevel=self.compress_level, fileobj=self.file) as member:
+            member.write(head)
+            for chunk in block:
+                member.write(chunk)
+            member.write(b"\r\n\r\n")
+
+    def write_response(
+        self,
+        url: str,
+        status: int,
+        reason: Optional[str],
+        headers: Optional[Mapping[str, str]],
+        body: bytes,
+        request_headers: Optional[Mapping[str, str]] = None
+    ):
+        """Archive one GET request and its response.
+
+        Args:
+            url (str): Requested URL.
+            status (int): HTTP status code of the response.
+            reason (str, optional): HTTP reason phrase of the response.
+            headers (Mapping, optional): Response headers.
+            body (bytes): Decoded response body.
+            request_headers (Mapping, optional): Headers sent with the request.
+                Defaults to None.
+
+        Note:
+            - ``Content-Encoding``, ``Transfer-Encoding`` and ``Content-Length``
+              response headers are replaced by the length of the decoded body,
+              since HTTP clients hand over bodies already decoded.
+        """
+        body = body or b""
+        response_block = _http_head(status, reason, headers, len(body)) + body
+        with self.lock:
+            response_id = self._write_response_record(
+                url,
+                response_block,
+                extra_headers={"WARC-Payload-Digest": _sha1_digest(body)}
+            )
+            self._write_request_record(url, request_headers, response_id)
+
+    def write_response_file(
+        self,
+        url: str,
+        status: int,
+        reason: Optional[str],
+        headers: Optional[Mapping[str, str]],
+        body_path: Union[str, Path],
+        request_headers: Optional[Mapping[str, str]] = None
+    ):
+        """Archive one GET request and its response, whose body is in a file.
+
+        Same as ``write_response``, but the body is streamed from body_path
+        instead of being held in memory, e.g. for the PDFs ``fetch_document``
+        writes to temporary files.
+        """
+        body_length = os.path.getsize(body_path)
+        http_head = _http_head(status, reason, headers, body_length)
+        payload_sha1 = hashlib.sha1()
+        block_sha1 = hashlib.sha1(http_head)
+        for chunk in iter_file_chunks(body_path):
+            payload_sha1.update(chunk)
+            block_sha1.update(chunk)
+
+        def iter_block():
+            yield http_head
+            yield from iter_file_chunks(body_path)
+
+        with self.lock:
+            response_id = self._write_response_record(
+                url,
+                iter_block(),
+                extra_headers={"WARC-Payload-Digest": _format_sha1(payload_sha1)},
+                block_length=len(http_head) + body_length,
+                block_digest=_format_sha1(block_sha1)
+            )
+            self._write_request_record(url, request_headers, response_id)
+
+    def _write_response_record(self, url: str, block, **kwargs):
+        if (self.file is None) or (self.file.tell() >= self.max_segment_bytes):
+            self._open_segment()
+        response_id = _record_id()
+        self._write_record(
+            "response",
+            block,
+            content_type="application/http;msgtype=response",
+            url=url,
+            record_id=response_id,
+            **kwargs
+        )
+        return response_id
+
+    def _write_request_record(self, url: str, request_headers: Optional[Mapping[str, str]], response_id: str):
+        parts = urlsplit(url)
+        path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        request_block = "GET {} HTTP/1.1\r\nHost: {}\r\n{}\r\n".format(
+            path, parts.netloc, _format_headers(request_headers, drop={"host"})
+        ).encode("utf-8", errors="replace")
+        self._write_record(
+            "request",
+            request_block,
+            content_type="application/http;msgtype=request",
+            url=url,
+            extra_headers={"WARC-Concurrent-To": response_id}
+        )
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+    def close(self):
+        """Close the current segment."""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def open_warc_writer(
+    warc_dir: Optional[Union[str, Path]],
+    max_segment_bytes: int = 1024 ** 3
+):
+    """Open a WARC writer in warc_dir, or return None if warc_dir is None."""
+    if warc_dir is None:
+        return None
+    return WarcWriter(warc_dir, max_segment_bytes=max_segment_bytes)
+
+
+class WarcRecord:
+    """A record read from a WARC file.
+
+    Args:
+        headers (dict): WARC headers of the record.
+        block (bytes): Content block of the record.
+    """
+    def __init__(self, headers: dict, block: bytes):
+        self.headers = headers
+        self.block = block
+
+    @property
+    def type(self):
+        return self.headers.get("WARC-Type")
+
+    @property
+    def url(self):
+        return self.headers.get("WARC-Target-URI")
+
+    def parse_http(self):
+        """Split the block of a ``response`` record into status, headers and body.
+
+        Returns:
+            tuple: ``(status, headers, body)`` with the status code, a dict of
+                lower-cased header names and the raw body.
+        """
+        head, _, body = self.block.partition(b"\r\n\r\n")
+        lines = head.decode("utf-8", errors="replace").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, headers, body
+
+
+def iter_warc(path: Union[str, Path]):
+    """Iterate over the records of a WARC file, gzip-compressed or not.
+
+    Args:
+        path (str or Path): Path of the WARC file.
+
+    Yields:
+        WarcRecord: Each record of the file.
+    """
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rb") as file:
+        while True:
+            line = file.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue
+            if not line.startswith(b"WARC/"):
+                raise ValueError("Invalid WARC record in {}: {!r}".format(path, line[:50]))
+            headers = {}
+            while True:
+                line = file.readline()
+                if (not line) or (not line.strip()):
+                    break
+                name, _, value = line.decode("utf-8").partition(":")
+                headers[name.strip()] = value.strip()
+            block = file.read(int(headers.get("Content-Length", 0)))
+            yield WarcRecord(headers, block)
+
+
+def get_warc_paths(warc_path: Union[str, Path]):
+    """Return the WARC files in warc_path sorted by name, or [warc_path] if it is a file."""
+    warc_path = Path(warc_path)
+    if warc_path.is_dir():
+        return sorted(p for p in warc_path.iterdir() if p.name.endswith((".warc", ".warc.gz")))
+    return [warc_path]
+
+
+def iter_warc_documents(warc_paths: Iterable[Union[str, Path]]):
+    """Iterate over the successful responses archived in WARC files.
+
+    Args:
+        warc_paths (Iterable): Paths of the WARC files, read in order.
+
+    Yields:
+        tuple: ``(url, body, kind)`` of every ``200`` response whose kind has a
+            registered extractor, see ``sniff_kind``.
+    """
+    for path in warc_paths:
+        for record in iter_warc(path):
+            if record.type != "response":
+                continue
+            try:
+                status, headers, body = record.parse_http()
+            except (ValueError, IndexError):
+                logger.warning(f"Skipping malformed response of {record.url} in {path}.")
+                continue
+            if (status != 200) or (not body):
+                continue
+            kind = sniff_kind(headers.get("content-type"), body[:1024], record.url)
+            if kind is not None:
+                yield record.url, body, kind
+
+
+def replay_warc_contents(
+    warc_paths: Union[str, Path, List[Union[str, Path]]],
+    save_path: Union[str, Path],
+    extract_workers: Optional[int] = None,
+    max_tasks_per_child: Optional[int] = None,
+    output_format: str = "jsonl"
+):
+    """Regenerate a content file by feeding archived responses through extraction.
+
+    No network access is made, so this reruns the extraction stage at CPU speed
+    and gives reproducible inputs for benchmarking it.
+
+    Args:
+        warc_paths (str, Path or list): A WARC file, a folder of WARC segments, or
+            a list of WARC files.
+        save_path (str or Path): Path of the content output to write.
+        extract_workers (int, optional): If set, extract in a process pool with
+            this many workers. Defaults to None, extracting in the current process.
+        max_tasks_per_child (int, optional): Number of documents an extraction
+            worker handles before being replaced. Defaults to None.
+        output_format (str, optional): Format of the output, see
+            ``open_content_writer``. Defaults to 'jsonl'.
+
+    Returns:
+        int: Number of written records.
+    """
+    if isinstance(warc_paths, (str, Path)):
+        warc_paths = get_warc_paths(warc_paths)
+    return extract_documents(
+        iter_warc_documents(warc_paths),
+        save_path,
+        extract_workers=extract_workers,
+        max_tasks_per_child=max_tasks_per_child,
+        output_format=output_format
+    )
@@ -0,0 +1,159 @@
+import os
+import time
+import queue
+import threading
+import orjson
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+
+_CLOSE = object()
+
+
+class JsonlWriter:
+    """A buffered JSONL writer running on a dedicated thread.
+
+    Records are handed over through a queue and appended to the output file in
+    batches, either when ``batch_size`` records are buffered or when
+    ``flush_interval`` seconds have passed since the last flush. The file is
+    opened once for the lifetime of the writer, so crawlers produce large
+    sequential appends instead of opening and closing the file for every record.
+    ``write`` never blocks on disk I/O and is safe to call from an event loop.
+
+    Args:
+        path (str or Path): Path of the JSONL file. Records are appended if the
+            file exists.
+        batch_size (int, optional): Number of buffered records that triggers a
+            flush. Defaults to 1000.
+        flush_interval (float, optional): Maximum number of seconds a record stays
+            in the buffer. Defaults to 1.0.
+        fsync (bool, optional): If True, call ``os.fsync`` after every flush so
+            that flushed records survive a power loss. Defaults to False.
+        max_queue_size (int, optional): Maximum number of records waiting to be
+            buffered; ``write`` blocks when it is reached. 0 means unbounded.
+            Defaults to 0.
+
+    Example:
+        ::
+
+            with JsonlWriter("crawler/test/test_link.json") as writer:
+                writer.write({"link": "https://example.com/1"})
+    """
+    def __init__(
+        self,
+        path: Union[str, Path],
+        batch_size: int = 1000,
+        flush_interval: float = 1.0,
+        fsync: bool = False,
+        max_queue_size: int = 0
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="musubi-jsonl-writer", daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+        if self.closed:
+            raise ValueError("Write to a closed JsonlWriter.")
+
+    def write(self, record: dict):
+        """Queue one record to be appended to the file."""
+        self._check()
+        self.queue.put(record)
+
+    def write_many(self, records: Iterable[dict]):
+        """Queue several records to be appended to the file."""
+        for record in records:
+            self.write(record)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every record queued so far has been written to the file."""
+        self._check()
+        event = threading.Event()
+        self.queue.put(event)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        # the writer thread may die right after the check, leaving the event unset
+        while not event.wait(0.1):
+            if not self.thread.is_alive():
+                break
+            if (deadline is not None) and (time.monotonic() >= deadline):
+                break
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        """Flush the remaining records, stop the writer thread and close the file."""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(_CLOSE)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _open(self):
+        self.file = open(self.path, "ab")
+
+    def _write(self, lines: list):
+        self.file.write(b"".join(lines))
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def _release(self):
+        self.file.close()
+
+    def _flush(self, buffer: list):
+        if buffer:
+            self._write(buffer)
+            buffer.clear()
+
+    def _run(self):
+        buffer = []
+        try:
+            self._open()
+            try:
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    try:
+                        item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        item = None
+
+                    if item is _CLOSE:
+                        self._flush(buffer)
+                        return
+                    elif isinstance(item, threading.Event):
+                        self._flush(buffer)
+                        item.set()
+                    elif item is not None:
+                        buffer.append(orjson.dumps(item, option=orjson.OPT_NON_STR_KEYS) + b"\n")
+
+                    if (len(buffer) >= self.batch_size) or (time.monotonic() >= deadline):
+                        self._flush(buffer)
+                        deadline = time.monotonic() + self.flush_interval
+            finally:
+                self._release()
+        except Exception as e:
+            self.error = e
+            # unblock anyone waiting for a flush
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
@@ -0,0 +1,137 @@
+import pytest
+from ..musubi.crawl_link import Scroll
+from ..musubi.utils import browser, block_css_selector, collect_links, collect_new_links, iter_jsonl, BrowserPool
+
+
+class FakePage:
+    """Driver of an infinite-scroll page whose blocks hold links, loading step blocks per scroll."""
+    def __init__(self, links, loaded, step):
+        self.links = links
+        self.loaded = loaded
+        self.step = step
+        self.scripts = 0
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script, *args):
+        self.scripts += 1
+        if "scrollBy" in script:
+            self.loaded = min(self.loaded + self.step, len(self.links))
+            return None
+        selector, root_path, start, only_changed = args
+        if only_changed and (self.loaded == start):
+            return None
+        return [self.links[start if self.loaded >= start else 0:self.loaded], self.loaded]
+
+
+class FakePool:
+    """Pool lending the same driver and counting what is given back."""
+    def __init__(self, driver):
+        self.driver = driver
+        self.released = 0
+
+    def acquire(self, timeout=None):
+        return self.driver
+
+    def release(self, driver):
+        self.released += 1
+
+
+class FakeDriver:
+    """Driver recording the resets done by the browser pool."""
+    def __init__(self, browser, headless):
+        self.browser = browser
+        self.window_handles = ["main"]
+        self.switch_to = self
+        self.urls = []
+        self.quitted = False
+
+    def window(self, handle):
+        pass
+
+    def execute_script(self, script, *args):
+        pass
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        self.urls.append(url)
+
+    def quit(self):
+        self.quitted = True
+
+
+def test_block_css_selector():
+    assert block_css_selector("div", "news item") == 'div[class="news item"]'
+    assert block_css_selector(None, 'say "hi"') == '*[class="say \\"hi\\""]'
+    assert block_css_selector(None, "news item", exact=False) == '[class~="news"][class~="item"]'
+    assert block_css_selector("li", "", exact=False) == "li"
+
+
+def test_collect_new_links():
+    page = FakePage(["https://example.com/news/{}".format(i) for i in range(5)], loaded=3, step=2)
+    # one round trip to the driver whatever the number of blocks
+    assert collect_links(page, 'div[class="item"]') == page.links[:3]
+    assert page.scripts == 1
+    assert collect_new_links(page, "div", start=3) == ([], 3)
+    assert collect_new_links(page, "div", start=3, timeout=0.1, poll_frequency=0.02) is None
+    page.loaded = 5
+    assert collect_new_links(page, "div", start=3, timeout=0.1) == (page.links[3:], 5)
+
+
+def test_scroll_incremental(tmp_path):
+    url_path = tmp_path / "test_link.json"
+    page = FakePage(["https://example.com/news/{}".format(i) for i in range(10)], loaded=4, step=3)
+    pool = FakePool(page)
+
+    scroll = Scroll("https://example.com/news", pages=20, block1=["div", "item"], url_path=url_path, sleep_time=0.1, browser_pool=pool)
+    scroll.browse_website()
+    assert list(scroll.iter_links()) == [page.links[:4], page.links[4:7], page.links[7:10]]
+    scroll.release_browser()
+
+    # stops once the page does not grow, instead of scrolling 20 times
+    page.loaded = 4
+    scroll.crawl_link()
+    assert list(iter_jsonl(url_path, key="link")) == page.links
+    assert (pool.released == 2) and (scroll.driver is None)
+
+    # nothing new after 2 scroll actions
+    page.loaded = 4
+    page.links = page.links + ["https://example.com/news/{}".format(i) for i in range(10, 30)]
+    scroll = Scroll("https://example.com/news", pages=20, block1=["div", "item"], url_path=url_path, sleep_time=0.1, early_stop=2, browser_pool=pool)
+    scroll.crawl_link()
+    assert page.loaded == 10
+
+
+def test_browser_pool(monkeypatch):
+    monkeypatch.setattr(browser, "create_driver", FakeDriver)
+    pool = BrowserPool(size=2, max_uses=3)
+    first = pool.acquire()
+    pool.release(first)
+    # the driver is reused, on a blank page
+    with pool.driver() as driver:
+        assert (driver is first) and (driver.urls[-1] == "about:blank")
+        second = pool.acquire()
+        assert second is not first
+        with pytest.raises(TimeoutError):
+            pool.acquire(timeout=0.05)
+    pool.release(second)
+
+    # restarted after 3 websites
+    for _ in range(2):
+        with pool.driver() as driver:
+            assert driver is second
+    assert second.quitted and (second not in pool.drivers)
+
+    # drivers started before a change of settings are not handed out again
+    pool.configure(browser="firefox")
+    assert first.quitted
+    with pool.driver() as driver:
+        assert driver.browser == "firefox"
+    with pytest.raises(ValueError):
+        pool.release(FakeDriver("edge", True))
+    with pytest.raises(ValueError):
+        pool.configure(browser="safari")
+    pool.close()
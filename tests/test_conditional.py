@@ -0,0 +1,19 @@
+from ..musubi.utils import open_validator_cache
+
+
+def test_validator_cache(tmp_path):
+    url_path = tmp_path / "test_link.json"
+    url = "https://example.com/page/1"
+
+    with open_validator_cache(url_path) as validators:
+        assert validators.request_headers(url) == {}
+        assert validators.update(url, {"ETag": '"abc"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"})
+
+    with open_validator_cache(url_path) as validators:
+        assert validators.request_headers(url) == {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"
+        }
+        # a response without validators drops the stale ones
+        assert not validators.update(url, {})
+        assert len(validators) == 0
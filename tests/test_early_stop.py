@@ -0,0 +1,78 @@
+import asyncio
+from ..musubi.crawl_link import Scan
+from ..musubi.async_crawl_link import AsyncScan
+from ..musubi.utils import iter_jsonl, CrawlJournal, get_journal_path
+
+
+# pages 0-1 hold new links, the following ones only the links of page 0
+LISTING = {0: ["https://example.com/a/1", "https://example.com/a/2"], 1: ["https://example.com/a/3"]}
+
+
+def listing(page):
+    i = int(page.rsplit("=", 1)[1]) - 1
+    return LISTING.get(i, LISTING[0])
+
+
+def test_scan_early_stop(tmp_path, monkeypatch):
+    url_path = tmp_path / "test_link.json"
+    scanned = []
+
+    def get_urls(self, page, validators=None):
+        scanned.append(page)
+        return listing(page)
+
+    monkeypatch.setattr(Scan, "get_urls", get_urls)
+    scan = Scan("https://example.com/list?page=", pages=10, block1=["div", "item"], url_path=url_path, early_stop=2)
+    scan.crawl_link()
+
+    assert len(scanned) == 4
+    assert list(iter_jsonl(url_path, key="link")) == LISTING[0] + LISTING[1]
+
+
+def test_async_scan_early_stop(tmp_path, monkeypatch):
+    url_path = tmp_path / "test_link.json"
+    scanned = []
+
+    async def get_urls(self, session=None, page=None, validators=None, dead_letters=None):
+        scanned.append(page)
+        return listing(page)
+
+    monkeypatch.setattr(AsyncScan, "get_urls", get_urls)
+    scan = AsyncScan("https://example.com/list?page=", pages=10, block1=["div", "item"], url_path=url_path, early_stop=2)
+    asyncio.run(scan.crawl_link())
+
+    # windows of 2 pages: [0, 1] has new links, [2, 3] does not
+    assert len(scanned) == 4
+    assert list(iter_jsonl(url_path, key="link")) == LISTING[0] + LISTING[1]
+
+
+def test_update_keeps_full_crawl_journal(tmp_path, monkeypatch):
+    url_path = tmp_path / "test_link.json"
+    scanned = []
+
+    def get_urls(self, page, validators=None):
+        scanned.append(page)
+        return listing(page)
+
+    monkeypatch.setattr(Scan, "get_urls", get_urls)
+    prefix = "https://example.com/list?page="
+    # a full crawl of 50 pages interrupted at page 39
+    full = Scan(prefix, pages=50, block1=["div", "item"], url_path=url_path)
+    journal_path = get_journal_path(url_path, "link")
+    journal = CrawlJournal(journal_path, run=full.journal_run())
+    for i in range(40):
+        journal.start(i)
+        journal.complete(i)
+    journal.close()
+
+    # the update scans its 10 newest pages and leaves the journal of the full crawl
+    update = Scan(prefix, pages=10, block1=["div", "item"], url_path=url_path, conditional=True)
+    update.crawl_link()
+    assert len(scanned) == 10
+    assert CrawlJournal(journal_path, run=full.journal_run()).low_water == 39
+
+    # a full crawl of another number of pages does not resume it
+    scanned.clear()
+    Scan(prefix, pages=45, block1=["div", "item"], url_path=url_path).crawl_link()
+    assert len(scanned) == 45
+    assert not journal_path.exists()
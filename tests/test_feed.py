@@ -0,0 +1,41 @@
+from ..musubi.utils import parse_feed, find_feeds
+
+
+def test_parse_rss():
+    rss = b"""<?xml version="1.0" encoding="UTF-8"?>
+    <rss version="2.0"><channel>
+        <title>News</title>
+        <link>https://example.com/</link>
+        <item><title>First</title><link>https://example.com/news/1</link></item>
+        <item><title>Second</title><guid isPermaLink="true">https://example.com/news/2</guid></item>
+        <item><title>Relative</title><link>/news/3</link></item>
+        <item><title>Again</title><link>https://example.com/news/1</link></item>
+    </channel></rss>"""
+    assert parse_feed(rss, "https://example.com/feed") == [
+        "https://example.com/news/1",
+        "https://example.com/news/2",
+        "https://example.com/news/3",
+    ]
+
+
+def test_parse_atom():
+    atom = """<?xml version="1.0" encoding="utf-8"?>
+    <feed xmlns="http://www.w3.org/2005/Atom">
+        <link href="https://example.com/" rel="alternate"/>
+        <entry>
+            <link rel="enclosure" href="https://example.com/a.mp3"/>
+            <link rel="alternate" href="https://example.com/posts/1"/>
+        </entry>
+        <entry><link href="https://example.com/posts/2"/></entry>
+    </feed>"""
+    assert parse_feed(atom) == ["https://example.com/posts/1", "https://example.com/posts/2"]
+    assert parse_feed("<html><body><p>not a feed</p></body></html>") is None
+
+
+def test_find_feeds():
+    html = """<html><head>
+        <link rel="stylesheet" href="/style.css">
+        <link rel="alternate" type="application/rss+xml" href="/feed.xml">
+        <link rel="alternate" type="application/atom+xml" href="https://example.com/atom">
+    </head><body></body></html>"""
+    assert find_feeds(html, "https://example.com/news/") == ["https://example.com/feed.xml", "https://example.com/atom"]
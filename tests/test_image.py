@@ -0,0 +1,34 @@
+import struct
+from ..musubi.utils import extract_image_text_pairs, parse_image_size
+
+
+def test_extract_image_text_pairs():
+    html = """
+    <div class="gallery">
+        <img src="/img/1.jpg" alt="first">
+        <img src="data:image/gif;base64,R0lGOD" data-src="2.png" alt="second">
+        <img alt="no source">
+    </div>
+    <img src="/outside.jpg" alt="outside">
+    """
+    pairs = extract_image_text_pairs(html, "https://example.com/news/a.html", ["div", "gallery"])
+    assert pairs == [
+        {"img_url": "https://example.com/img/1.jpg", "caption": "first", "url": "https://example.com/news/a.html"},
+        {"img_url": "https://example.com/news/2.png", "caption": "second", "url": "https://example.com/news/a.html"},
+    ]
+    assert extract_image_text_pairs(html, "https://example.com/", ["div", "missing"]) == []
+
+
+def test_parse_image_size():
+    png = b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\rIHDR" + struct.pack(">II", 640, 480)
+    gif = b"GIF89a" + struct.pack("<HH", 320, 200)
+    # SOI, an APP0 segment, then a baseline start-of-frame
+    jpeg = b"\xff\xd8" + b"\xff\xe0" + struct.pack(">H", 16) + b"\x00" * 14 \
+        + b"\xff\xc0" + struct.pack(">HBHH", 17, 8, 1080, 1920) + b"\x00" * 10
+    webp = b"RIFF" + b"\x00" * 4 + b"WEBPVP8X" + b"\x00" * 8 + (799).to_bytes(3, "little") + (599).to_bytes(3, "little")
+
+    assert parse_image_size(png) == ("png", 640, 480)
+    assert parse_image_size(gif) == ("gif", 320, 200)
+    assert parse_image_size(jpeg) == ("jpeg", 1920, 1080)
+    assert parse_image_size(webp) == ("webp", 800, 600)
+    assert parse_image_size(b"not an image") is None
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from ..musubi.utils import CrawlJournal, iter_jsonl
+
+
+def test_resume_after_out_of_order_crash(tmp_path):
+    path = tmp_path / "test_link.content.journal"
+    journal = CrawlJournal(path, checkpoint_every=1)
+    for key in range(5):
+        journal.start(key)
+    # results come back out of order, then the crawler crashes with 1 and 3 in flight
+    journal.complete(0)
+    journal.complete(2)
+    journal.fail(4)
+    journal.file.close()
+
+    journal = CrawlJournal(path)
+    assert journal.resumed
+    assert journal.low_water == 1
+    assert [key for key in range(journal.low_water, 5) if not journal.is_finished(key)] == [1, 3]
+    assert (journal.completed, journal.failed) == (2, 1)
+
+    journal.start(1)
+    journal.complete(1)
+    journal.start(3)
+    journal.complete(3)
+    journal.close()
+    journal = CrawlJournal(path)
+    assert journal.low_water == 4
+    assert journal.is_finished(4)
+    journal.finish()
+    assert not path.exists()
+    assert not CrawlJournal(path).resumed
+
+
+def test_offsets_and_rewritten_source(tmp_path):
+    url_path = tmp_path / "test_link.json"
+    url_path.write_text("".join('{"link": "https://example.com/%d"}\n' % i for i in range(4)))
+    items = list(iter_jsonl(url_path, key="link", offsets=True))
+    assert list(iter_jsonl(url_path, key="link", start_offset=items[2][0])) == ["https://example.com/2", "https://example.com/3"]
+
+    path = tmp_path / "test_link.content.journal"
+    journal = CrawlJournal(path, source_path=url_path)
+    for key, _ in items[:3]:
+        journal.complete(key)
+    journal.close()
+    assert CrawlJournal(path, source_path=url_path).low_water == items[2][0]
+
+    # offsets do not point to the same links anymore once the file is rewritten
+    url_path.write_text("".join('{"link": "https://example.org/%d"}\n' % i for i in range(4)))
+    journal = CrawlJournal(path, source_path=url_path)
+    assert not journal.resumed
+    assert journal.low_water == 0
+
+
+def test_checkpoint_async(tmp_path):
+    path = tmp_path / "test_link.link.journal"
+    threads = []
+    journal = CrawlJournal(
+        path,
+        on_checkpoint=lambda: threads.append(threading.current_thread()),
+        checkpoint_every=2,
+        auto_checkpoint=False
+    )
+    for key in range(3):
+        journal.start(key)
+        journal.complete(key)
+    # buffered until the caller checkpoints
+    assert journal.checkpoint_due() and (len(journal.buffer) == 6)
+    asyncio.run(journal.checkpoint_async())
+    assert (not journal.buffer) and (threads[0] is not threading.main_thread())
+    journal.file.close()
+    assert CrawlJournal(path).low_water == 2
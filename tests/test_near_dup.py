@@ -0,0 +1,48 @@
+import orjson
+from ..musubi.utils import NearDuplicateIndex, simhash, hamming_distance, mark_near_duplicates
+
+
+ARTICLE = " ".join(
+    "The city council approved the new budget on Tuesday after a long debate about public transport number {}.".format(i)
+    for i in range(20)
+)
+
+
+def test_simhash():
+    edited = ARTICLE.replace("Tuesday", "Wednesday", 1) + " Share this article."
+    other = " ".join("A recipe for lemon cake with {} eggs and a cup of sugar.".format(i) for i in range(40))
+
+    assert hamming_distance(simhash(ARTICLE), simhash(edited)) <= 3
+    assert hamming_distance(simhash(ARTICLE), simhash(other)) > 3
+
+
+def test_near_duplicate_index(tmp_path):
+    with NearDuplicateIndex(tmp_path / "near_dup.db") as index:
+        assert index.add("https://a.com/1", ARTICLE) is None
+        # the same document crawled again is not its own duplicate
+        assert index.add("https://a.com/1", ARTICLE) is None
+        assert index.add("https://b.com/1", ARTICLE + " Read more.") == "https://a.com/1"
+        # short texts are never compared
+        assert index.add("https://b.com/2", "Short.") is None
+
+    with NearDuplicateIndex(tmp_path / "near_dup.db") as index:
+        assert len(index) == 1
+        assert index.add("https://c.com/1", ARTICLE) == "https://a.com/1"
+
+
+def test_mark_near_duplicates(tmp_path):
+    path = tmp_path / "content.json"
+    records = [
+        {"content": ARTICLE, "url": "https://a.com/1"},
+        {"content": ARTICLE.upper(), "url": "https://b.com/1"},
+        {"content": None, "url": "https://b.com/2"},
+    ]
+    path.write_bytes(b"".join(orjson.dumps(record) + b"\n" for record in records))
+
+    with NearDuplicateIndex(tmp_path / "near_dup.db") as index:
+        assert mark_near_duplicates(path, index) == 1
+
+    marked = [orjson.loads(line) for line in path.read_bytes().splitlines()]
+    assert marked[0] == records[0]
+    assert marked[1] == {"content": None, "url": "https://b.com/1", "duplicate_of": "https://a.com/1"}
+    assert marked[2] == records[2]
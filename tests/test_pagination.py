@@ -0,0 +1,121 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pytest
+from ..musubi.crawl_link import Scan
+from ..musubi.async_crawl_link import AsyncScan
+from ..musubi.utils import BlockSelector, find_last_page, get_page_url, parse_pages, update_website_config
+
+
+SELECTOR = BlockSelector(["div", "item"])
+
+
+def serve(last, past="404", ranges=True, padding=0):
+    """Serve listing pages 1 to last; past tells what pages after the last one return."""
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def page(self):
+            n = int(parse_qs(urlparse(self.path).query)["page"][0])
+            if n > last:
+                if past == "404":
+                    return 404, None, None
+                if past == "redirect":
+                    return 302, None, "/list?page=1"
+                if past == "last":
+                    n = last
+                else:
+                    return 200, b"<html><body><p>No more news.</p></body></html>", None
+            items = "".join('<div class="item"><a href="/news/{}-{}">news</a></div>'.format(n, k) for k in range(3))
+            return 200, "<html><body>{}{}</body></html>".format(" " * padding, items).encode(), None
+
+        def send(self, head):
+            requests.append(self.command)
+            status, body, location = self.page()
+            body = body or b""
+            byte_range = self.headers.get("Range")
+            if (status == 200) and ranges and byte_range:
+                end = int(byte_range.split("-")[1])
+                body = body[:end + 1]
+                status = 206
+            self.send_response(status)
+            if location:
+                self.send_header("Location", location)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self.send(head=False)
+
+        def do_HEAD(self):
+            self.send(head=True)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    prefix = "http://127.0.0.1:{}/list?page=".format(server.server_address[1])
+    return server, prefix, requests
+
+
+@pytest.mark.parametrize("past", ["404", "redirect", "empty", "last"])
+def test_find_last_page(past):
+    server, prefix, requests = serve(37, past=past)
+    try:
+        assert find_last_page(lambda i: get_page_url(prefix, i), SELECTOR) == 37
+    finally:
+        server.shutdown()
+    # exponential then binary search instead of one request per page
+    assert requests.count("GET") < 20
+
+
+def test_find_last_page_full_get():
+    # the blocks are after the first bytes, so ranged requests fall back to a full GET
+    server, prefix, _ = serve(100, past="empty", padding=70 * 1024)
+    try:
+        assert find_last_page(lambda i: get_page_url(prefix, i), SELECTOR) == 100
+        assert find_last_page(lambda i: get_page_url(prefix, i), BlockSelector(["div", "missing"])) == 0
+    finally:
+        server.shutdown()
+
+
+@pytest.mark.parametrize("scan_class", [Scan, AsyncScan])
+def test_scan_resolves_auto_pages_lazily(scan_class):
+    server, prefix, requests = serve(12, past="404", ranges=False)
+    try:
+        scan = scan_class(prefix, pages="auto", block1=["div", "item"])
+        # creating the crawler sends no request
+        assert requests == []
+        assert scan.pages == "auto"
+        assert scan.resolve_pages() == 12
+        assert scan.pages_lst[-1] == get_page_url(prefix, 11)
+        count = len(requests)
+        assert scan.resolve_pages() == 12
+        assert len(requests) == count
+    finally:
+        server.shutdown()
+
+
+def test_find_last_page_max_pages():
+    server, prefix, _ = serve(100, past="404", ranges=False)
+    try:
+        assert find_last_page(lambda i: get_page_url(prefix, i), SELECTOR, max_pages=20) == 20
+    finally:
+        server.shutdown()
+
+
+def test_update_website_config(tmp_path):
+    path = tmp_path / "websites.json"
+    path.write_bytes(b'{"idx":0,"pages":5}\n{"idx":1,"pages":null,"auto_pages":true}\n')
+    update_website_config(1, {"pages": 120}, website_config_path=path)
+    assert path.read_bytes() == b'{"idx":0,"pages":5}\n{"idx":1,"pages":120,"auto_pages":true}\n'
+    with pytest.raises(ValueError):
+        update_website_config(2, {"pages": 1}, website_config_path=path)
+
+    assert parse_pages("auto") == "auto"
+    assert parse_pages("12") == 12
+    with pytest.raises(ValueError):
+        parse_pages("many")
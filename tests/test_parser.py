@@ -0,0 +1,50 @@
+import pytest
+from ..musubi.utils import BlockSelector, extract_block_links
+
+
+HTML = """
+<html><body>
+<ul class="news-list main">
+    <li class="item"><a href="/news/1">first</a></li>
+    <li class="item top"><span><a href="https://example.com/news/2">second</a></span></li>
+    <li class="item"><span>no link</span></li>
+    <li class="ad"><a href="/ad">ad</a></li>
+</ul>
+<ul class="news-list">
+    <li class="item"><a href="/news/3">third</a></li>
+</ul>
+<a class="more" href="/more/1">more</a>
+<a class="more" href=" /more/2 ">more</a>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_block_selector_links(parser):
+    # block2 only looks inside the first block1 element
+    selector = BlockSelector(["ul", "news-list"], ["li", "item"], parser=parser)
+    assert selector.links(HTML) == ["/news/1", "https://example.com/news/2"]
+
+    # without block2, every element of block1 is a block
+    assert extract_block_links(HTML, ["li", "item"], parser=parser) == ["/news/1", "https://example.com/news/2", "/news/3"]
+    assert extract_block_links(HTML, ["a", "more"], parser=parser) == ["/more/1", "/more/2"]
+    # a multi-word class has to match the whole attribute
+    assert extract_block_links(HTML, ["li", "item top"], parser=parser) == ["https://example.com/news/2"]
+
+    assert BlockSelector(["div", "missing"], ["li", "item"], parser=parser).links(HTML) == []
+    assert extract_block_links("", ["li", "item"], parser=parser) == []
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_block_selector_attrs(parser):
+    html = '<div class="gallery"><img src="1.jpg" alt="one"><p><img data-src="2.jpg"></p></div><img src="3.jpg">'
+    selector = BlockSelector(["div", "gallery"], parser=parser)
+    assert selector.attrs(html, "img") == [{"src": "1.jpg", "alt": "one"}, {"data-src": "2.jpg"}]
+    assert BlockSelector(["div", "missing"], parser=parser).attrs(html, "img") is None
+
+
+def test_block_selector_invalid():
+    with pytest.raises(ValueError):
+        BlockSelector(["div", "news"], parser="unknown")
+    with pytest.raises(ValueError):
+        BlockSelector(["div[@x]", "news"])
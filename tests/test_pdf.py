@@ -0,0 +1,10 @@
+from ..musubi.utils import split_pages
+
+
+def test_split_pages():
+    assert split_pages(0, 16) == []
+    assert split_pages(5, 16) == [[0, 1, 2, 3, 4]]
+    ranges = split_pages(40, 16)
+    assert [len(pages) for pages in ranges] == [16, 16, 8]
+    # ranges are consecutive so that joining them keeps the page order
+    assert sum(ranges, []) == list(range(40))
@@ -0,0 +1,21 @@
+import time
+from ..musubi.utils import TokenBucket, HostRateLimiter
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    delay = bucket.reserve()
+    assert 0.05 < delay <= 0.1
+
+
+def test_host_rate_limiter():
+    limiter = HostRateLimiter(default_rate=None)
+    limiter.configure("https://example.com/page/1", rate=20, burst=1)
+    assert limiter.bucket("https://other.com/") is None
+
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.wait("https://EXAMPLE.com/article")
+    assert time.monotonic() - start >= 0.09
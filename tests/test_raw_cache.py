@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+from ..musubi.utils import RawCache, reextract_contents, iter_jsonl
+
+
+def test_raw_cache(tmp_path):
+    page = b"<html><body>" + b"musubi " * 1000 + b"</body></html>"
+
+    with RawCache(tmp_path / "raw") as cache:
+        digest = cache.put("https://example.com/1", page)
+        # identical documents are stored once
+        assert cache.put("https://example.com/2", page) == digest
+        assert len(cache) == 2
+
+    with RawCache(tmp_path / "raw") as cache:
+        assert cache.get("https://example.com/1") == (page, "html")
+        assert cache.get("https://example.com/3") is None
+
+
+def test_raw_cache_eviction(tmp_path):
+    with RawCache(tmp_path / "raw", max_bytes=150, compress_level=0) as cache:
+        cache.put("https://example.com/1", b"a" * 100)
+        cache.put("https://example.com/2", b"b" * 100)
+        # the least recently used document is evicted first
+        assert "https://example.com/1" not in cache
+        assert "https://example.com/2" in cache
+        assert cache.total_bytes <= 150
+
+
+def test_raw_cache_put_file(tmp_path):
+    pdf = b"%PDF-1.7\n" + bytes(range(256)) * 4000
+    path = tmp_path / "document.pdf"
+    path.write_bytes(pdf)
+    with RawCache(tmp_path / "raw") as cache:
+        # streamed from the file, stored as if put from memory
+        digest = cache.put_file("https://example.com/1.pdf", path)
+        assert cache.put("https://example.com/2.pdf", pdf, kind="pdf") == digest
+        assert cache.get("https://example.com/1.pdf") == (pdf, "pdf")
+
+
+def test_raw_cache_threads(tmp_path):
+    pages = {"https://example.com/{}".format(i): "page {}".format(i % 4).encode() * 100 for i in range(16)}
+    cache = RawCache(tmp_path / "raw")
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda item: cache.put(*item), pages.items()))
+    # entries are committed in batches, and on close
+    assert (len(cache), cache.pending) == (16, 16)
+    cache.close()
+    with RawCache(tmp_path / "raw") as cache:
+        assert all(cache.get(url) == (page, "html") for url, page in pages.items())
+
+
+def test_reextract_keeps_evicted_records(tmp_path):
+    url_path = tmp_path / "test_link.json"
+    save_path = tmp_path / "test.jsonl"
+    links = ["https://example.com/{}".format(i) for i in range(4)]
+    url_path.write_text("".join('{"link": "%s"}\n' % link for link in links))
+    save_path.write_text(
+        '{"content": "old 0", "url": "https://example.com/0"}\n'
+        '{"content": "evicted", "url": "https://example.com/1"}\n'
+        '{"content": null, "url": "https://example.com/2", "duplicate_of": "https://example.com/0"}\n'
+    )
+    page = b"<html><body><article><p>" + b"Musubi re-extracts this page. " * 20 + b"</p></article></body></html>"
+    with RawCache(tmp_path / "raw") as cache:
+        for link in [links[0], links[2]]:
+            cache.put(link, page)
+        assert reextract_contents(url_path, save_path, cache) == 3
+
+    records = list(iter_jsonl(save_path))
+    assert [record["url"] for record in records] == links[:3]
+    assert "Musubi re-extracts this page." in records[0]["content"]
+    # evicted from the cache, and marked as a near duplicate
+    assert records[1] == {"content": "evicted", "url": links[1]}
+    assert records[2]["duplicate_of"] == links[0]
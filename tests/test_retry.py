@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from ..musubi.utils import (
+    fetch_page_async,
+    RetryPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    FetchError,
+    DeadLetterWriter,
+    parse_retry_after,
+    load_dead_letters,
+    compact_dead_letters
+)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_retry_until_success():
+    policy = RetryPolicy(max_retries=3, backoff_base=0)
+    attempts = []
+
+    def send():
+        attempts.append(1)
+        if len(attempts) < 3:
+            policy.check_status("https://example.com/a", 503)
+        return "ok"
+
+    assert policy.call("https://example.com/a", send) == "ok"
+    assert len(attempts) == 3
+
+
+def test_retry_gives_up():
+    policy = RetryPolicy(max_retries=2, backoff_base=0)
+    attempts = []
+
+    def send():
+        attempts.append(1)
+        raise ConnectionError("reset")
+
+    with pytest.raises(FetchError):
+        policy.call("https://example.com/a", send)
+    assert len(attempts) == 3
+
+    # a Retry-After longer than backoff_max is not waited for
+    breaker = CircuitBreaker(failure_threshold=10)
+    with pytest.raises(FetchError) as e:
+        policy.call("https://example.com/a", lambda: policy.check_status("https://example.com/a", 429, {"Retry-After": "3600"}), breaker)
+    assert e.value.status == 429
+    assert breaker.is_open("https://example.com/b")
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.headers = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def text(self):
+        return "ok"
+
+
+def test_fetch_async_semaphore(monkeypatch):
+    # the concurrency slot is held by each request, but not during the backoff
+    semaphore = asyncio.Semaphore(1)
+    statuses = [503, 200]
+    held = []
+
+    class FakeSession:
+        def get(self, url, **kwargs):
+            held.append(semaphore.locked())
+            return FakeResponse(statuses.pop(0))
+
+    sleep = asyncio.sleep
+
+    async def backoff(delay):
+        held.append(semaphore.locked())
+        await sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", backoff)
+    policy = RetryPolicy(max_retries=2, backoff_base=0.01)
+    response, text = asyncio.run(fetch_page_async("https://example.com/a", FakeSession(), policy=policy, breaker=None, semaphore=semaphore))
+    assert (response.status == 200) and (text == "ok")
+    assert held == [True, False, True]
+    assert not semaphore.locked()
+
+
+def test_circuit_breaker():
+    policy = RetryPolicy(max_retries=0, circuit_wait=0)
+    breaker = CircuitBreaker(failure_threshold=2, recovery_time=60)
+
+    def send():
+        raise TimeoutError()
+
+    for _ in range(2):
+        with pytest.raises(FetchError):
+            policy.call("https://example.com/a", send, breaker)
+    with pytest.raises(CircuitOpenError):
+        policy.call("https://example.com/b", lambda: "ok", breaker)
+    assert policy.call("https://example.org/a", lambda: "ok", breaker) == "ok"
+
+
+def test_circuit_counts_urls_and_waits():
+    # the retries of one URL count as a single failure of the host
+    policy = RetryPolicy(max_retries=3, backoff_base=0)
+    breaker = CircuitBreaker(failure_threshold=2, recovery_time=0.2)
+
+    def send():
+        raise TimeoutError()
+
+    with pytest.raises(FetchError):
+        policy.call("https://example.com/a", send, breaker)
+    assert not breaker.is_open("https://example.com/b")
+
+    # once open, requests wait for the recovery instead of failing at once
+    with pytest.raises(FetchError):
+        policy.call("https://example.com/b", send, breaker)
+    assert breaker.is_open("https://example.com/c")
+    assert policy.call("https://example.com/c", lambda: "ok", breaker) == "ok"
+    assert asyncio.run(policy.call_async("https://example.com/d", lambda: asyncio.sleep(0), breaker)) is None
+
+
+def test_dead_letters(tmp_path):
+    path = tmp_path / "test_content.failed.jsonl"
+    with DeadLetterWriter(path) as dead_letters:
+        dead_letters.add("https://example.com/1", FetchError("https://example.com/1", "HTTP 503", status=503))
+        dead_letters.add("https://example.com/2", FetchError("https://example.com/2", "HTTP 503", status=503))
+        dead_letters.add("https://example.com/1", FetchError("https://example.com/1", "HTTP 503", status=503))
+
+    assert load_dead_letters(path) == ["https://example.com/1", "https://example.com/2"]
+    assert compact_dead_letters(path, {"https://example.com/1"}) == 1
+    assert load_dead_letters(path) == ["https://example.com/2"]
+    assert compact_dead_letters(path, {"https://example.com/2"}) == 0
+    assert not path.exists()
+
+    # nothing is written without failures
+    DeadLetterWriter(tmp_path / "empty.failed.jsonl").close()
+    assert not (tmp_path / "empty.failed.jsonl").exists()
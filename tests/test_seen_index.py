@@ -0,0 +1,24 @@
+import orjson
+from ..musubi.utils import open_link_index
+
+
+def test_seen_index(tmp_path):
+    url_path = tmp_path / "test_link.json"
+    with open(url_path, "wb") as file:
+        for i in range(3):
+            file.write(orjson.dumps({"link": "https://Example.com/{}#top".format(i)}) + b"\n")
+
+    with open_link_index(url_path) as seen:
+        assert len(seen) == 3
+        assert "https://example.com/1" in seen
+        assert "https://example.com/5" not in seen
+        assert seen.add("https://example.com/5")
+        assert not seen.add("https://example.com/5")
+
+    # rewritten file should trigger a rebuild of the index
+    with open(url_path, "wb") as file:
+        file.write(orjson.dumps({"link": "https://example.com/9"}) + b"\n")
+
+    with open_link_index(url_path) as seen:
+        assert len(seen) == 1
+        assert "https://example.com/9" in seen
@@ -0,0 +1,57 @@
+import pytest
+from ..musubi.utils import ShardedWriter, SeenIndex, iter_records, read_manifest, write_records
+
+
+def make_records(count):
+    return [{"content": "article {} ".format(i) * 50, "url": "https://example.com/{}".format(i)} for i in range(count)]
+
+
+@pytest.mark.parametrize("output_format", ["jsonl.zst", "parquet"])
+def test_sharded_writer(tmp_path, output_format):
+    records = make_records(500)
+    path = tmp_path / "test"
+    with ShardedWriter(path, output_format=output_format, max_shard_bytes=512, batch_size=100) as writer:
+        writer.write_many(records)
+
+    manifest = read_manifest(path)
+    assert len(manifest["shards"]) > 1
+    assert all(shard["name"].endswith("." + output_format) for shard in manifest["shards"])
+    assert list(iter_records(path)) == records
+    assert list(iter_records(path, columns=["url"])) == [{"url": record["url"]} for record in records]
+
+    # the next run appends to the same folder
+    with ShardedWriter(path, output_format=output_format, max_shard_bytes=512) as writer:
+        writer.write({"content": None, "url": "https://example.com/null"})
+        writer.write({"content": "extra", "url": "https://example.com/extra"})
+    assert len(list(iter_records(path))) == 502
+
+    with pytest.raises(ValueError):
+        ShardedWriter(path, output_format="jsonl.zst" if output_format == "parquet" else "parquet")
+
+
+def test_sharded_writer_skip_empty(tmp_path):
+    path = tmp_path / "test"
+    with ShardedWriter(path, skip_empty="content") as writer:
+        writer.write({"content": None, "url": "https://example.com/1"})
+        writer.write({"content": None, "url": "https://example.com/2", "duplicate_of": "https://example.com/3"})
+        writer.write({"content": "text", "url": "https://example.com/3"})
+    assert [record["url"] for record in iter_records(path)] == ["https://example.com/2", "https://example.com/3"]
+
+
+def test_seen_index_sharded(tmp_path):
+    path = tmp_path / "test"
+    write_records(make_records(300), path, output_format="parquet", max_shard_bytes=512)
+
+    with SeenIndex(tmp_path / "seen.db", table="content", jsonl_path=path, key="url") as seen:
+        assert len(seen) == 300
+        assert "https://example.com/299" in seen
+
+    with ShardedWriter(path, output_format="parquet", max_shard_bytes=512) as writer:
+        writer.write({"content": "extra", "url": "https://example.com/extra"})
+    with SeenIndex(tmp_path / "seen.db", table="content", jsonl_path=path, key="url") as seen:
+        assert len(seen) == 301
+
+    # a rewritten folder is read again from scratch
+    write_records(make_records(10), path, output_format="parquet")
+    with SeenIndex(tmp_path / "seen.db", table="content", jsonl_path=path, key="url") as seen:
+        assert len(seen) == 10
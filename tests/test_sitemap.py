@@ -0,0 +1,97 @@
+import gzip
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ..musubi.utils import (
+    parse_lastmod,
+    parse_robots_sitemaps,
+    is_sitemap_url,
+    iter_sitemap_links,
+    load_last_run,
+    save_last_run
+)
+
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def serve(files):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = files.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_parse_lastmod():
+    assert parse_lastmod("2024") == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert parse_lastmod("2024-05") == datetime(2024, 5, 1, tzinfo=timezone.utc)
+    assert parse_lastmod("2024-05-01T12:30:15.5+08:00") == datetime(2024, 5, 1, 4, 30, 15, 500000, tzinfo=timezone.utc)
+    assert parse_lastmod(" 2024-05-01T12:30Z ") == datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    assert parse_lastmod("yesterday") is None
+    assert parse_lastmod(None) is None
+
+
+def test_parse_robots_sitemaps():
+    robots = "User-agent: *\nDisallow: /admin\nSitemap: https://example.com/a.xml\nsitemap: /b.xml.gz # news\n"
+    assert parse_robots_sitemaps(robots, "https://example.com") == ["https://example.com/a.xml", "https://example.com/b.xml.gz"]
+    assert is_sitemap_url("https://example.com/b.xml.gz")
+    assert not is_sitemap_url("https://example.com/news")
+
+
+def test_iter_sitemap_links():
+    files = {}
+    server = serve(files)
+    root = "http://127.0.0.1:{}".format(server.server_address[1])
+    files["/index.xml"] = """<?xml version="1.0" encoding="UTF-8"?>
+        <sitemapindex {}>
+            <sitemap><loc>{}/new.xml.gz</loc><lastmod>2024-06-01</lastmod></sitemap>
+            <sitemap><loc>{}/old.xml</loc><lastmod>2020-01-01</lastmod></sitemap>
+            <sitemap><loc>{}/missing.xml</loc></sitemap>
+        </sitemapindex>""".format(NS, root, root, root).encode("utf-8")
+    files["/new.xml.gz"] = gzip.compress("""<urlset {}>
+        <url><loc>https://example.com/news/1</loc><lastmod>2024-06-01T08:00:00Z</lastmod></url>
+        <url><loc>https://example.com/news/2</loc><lastmod>2023-01-01</lastmod></url>
+        <url><loc>https://example.com/tag/3</loc></url>
+        <url><loc>https://example.com/news/4</loc></url>
+    </urlset>""".format(NS).encode("utf-8"))
+    files["/old.xml"] = "<urlset {}><url><loc>https://example.com/news/0</loc></url></urlset>".format(NS).encode("utf-8")
+
+    errors = []
+    done = []
+    try:
+        links = list(iter_sitemap_links(
+            [root + "/index.xml"],
+            url_pattern="/news/",
+            since=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            on_error=lambda url, error: errors.append(url),
+            on_done=done.append
+        ))
+    finally:
+        server.shutdown()
+
+    # old.xml is skipped from its lastmod in the index, news/2 from its own
+    assert links == ["https://example.com/news/1", "https://example.com/news/4"]
+    assert errors == [root + "/missing.xml"]
+    assert done == [root + "/index.xml", root + "/new.xml.gz"]
+
+
+def test_last_run(tmp_path):
+    url_path = tmp_path / "test_link.json"
+    assert load_last_run(url_path) is None
+    time = datetime(2024, 6, 1, 8, tzinfo=timezone.utc)
+    save_last_run(url_path, time)
+    assert load_last_run(url_path) == time
@@ -0,0 +1,19 @@
+from ..musubi.utils import sniff_kind, is_unsupported_content_type
+
+
+def test_sniff_kind():
+    # magic bytes win over a misleading content type or URL
+    assert sniff_kind("application/octet-stream", b"%PDF-1.7\n", "https://example.com/download?id=1") == "pdf"
+    assert sniff_kind("text/html", b"<!DOCTYPE html><html></html>", "https://example.com/report.pdf") == "html"
+    assert sniff_kind("text/plain; charset=utf-8", b"hello", "https://example.com/a.txt") == "text"
+    assert sniff_kind(None, b"\x89PNG\r\n\x1a\n", "https://example.com/a") is None
+    assert sniff_kind("application/zip", b"PK\x03\x04", "https://example.com/a.zip") is None
+
+
+def test_is_unsupported_content_type():
+    assert is_unsupported_content_type("image/png")
+    assert is_unsupported_content_type("video/mp4")
+    assert not is_unsupported_content_type("text/html; charset=utf-8")
+    assert not is_unsupported_content_type("application/pdf")
+    # left to the magic bytes since PDFs are often served this way
+    assert not is_unsupported_content_type("application/octet-stream")
@@ -0,0 +1,50 @@
+from ..musubi.utils import WarcWriter, iter_warc, iter_warc_documents, get_warc_paths
+
+
+def test_warc_roundtrip(tmp_path):
+    warc_dir = tmp_path / "warc"
+    with WarcWriter(warc_dir, max_segment_bytes=1) as warc:
+        warc.write_response(
+            "https://example.com/a?page=1",
+            200,
+            "OK",
+            {"Content-Type": "text/html", "Content-Encoding": "gzip"},
+            b"<html>a</html>",
+            request_headers={"User-Agent": "musubi"}
+        )
+        warc.write_response("https://example.com/b.pdf", 200, "OK", {"Content-Type": "application/pdf"}, b"%PDF")
+        warc.write_response("https://example.com/c", 404, "Not Found", {}, b"missing")
+
+    # every response starts a new segment since max_segment_bytes is tiny
+    paths = get_warc_paths(warc_dir)
+    assert len(paths) == 3
+
+    records = list(iter_warc(paths[0]))
+    assert [record.type for record in records] == ["warcinfo", "response", "request"]
+    status, headers, body = records[1].parse_http()
+    assert status == 200
+    assert "content-encoding" not in headers
+    assert body == b"<html>a</html>"
+
+    documents = list(iter_warc_documents(paths))
+    assert documents == [
+        ("https://example.com/a?page=1", b"<html>a</html>", "html"),
+        ("https://example.com/b.pdf", b"%PDF", "pdf")
+    ]
+
+
+def test_warc_write_response_file(tmp_path):
+    pdf = b"%PDF-1.7\n" + bytes(range(256)) * 4000
+    path = tmp_path / "document.pdf"
+    path.write_bytes(pdf)
+    with WarcWriter(tmp_path / "file") as warc:
+        warc.write_response_file("https://example.com/a.pdf", 200, "OK", {"Content-Type": "application/pdf"}, path)
+    with WarcWriter(tmp_path / "bytes") as warc:
+        warc.write_response("https://example.com/a.pdf", 200, "OK", {"Content-Type": "application/pdf"}, pdf)
+
+    streamed, = [record for record in iter_warc(get_warc_paths(tmp_path / "file")[0]) if record.type == "response"]
+    held, = [record for record in iter_warc(get_warc_paths(tmp_path / "bytes")[0]) if record.type == "response"]
+    assert streamed.block == held.block
+    for name in ["WARC-Block-Digest", "WARC-Payload-Digest", "Content-Length"]:
+        assert streamed.headers[name] == held.headers[name]
+    assert list(iter_warc_documents(get_warc_paths(tmp_path / "file"))) == [("https://example.com/a.pdf", pdf, "pdf")]
@@ -0,0 +1,36 @@
+import time
+import pytest
+from ..musubi.utils import JsonlWriter, iter_jsonl
+
+
+def test_jsonl_writer_batches(tmp_path):
+    path = tmp_path / "test_link.json"
+    with JsonlWriter(path, batch_size=3, flush_interval=60) as writer:
+        writer.write_many([{"link": "https://example.com/1"}, {"link": "https://example.com/2"}])
+        time.sleep(0.2)
+        # below batch_size and before flush_interval, nothing is written yet
+        assert path.read_bytes() == b""
+        writer.write({"link": "https://example.com/3"})
+        writer.write({"link": "https://example.com/4"})
+        writer.flush()
+        assert len(list(iter_jsonl(path))) == 4
+        writer.write({"link": "https://example.com/5"})
+    assert list(iter_jsonl(path, key="link")) == ["https://example.com/{}".format(i) for i in range(1, 6)]
+    with pytest.raises(ValueError):
+        writer.write({"link": "https://example.com/6"})
+
+
+def test_jsonl_writer_error(tmp_path):
+    writer = JsonlWriter(tmp_path / "test_link.json")
+    # the record cannot be serialized, which stops the writer thread
+    writer.write({"link": object()})
+    writer.thread.join(5)
+    with pytest.raises(TypeError):
+        writer.write({"link": "https://example.com/1"})
+
+    # the thread died between the check of flush and its request: flush raises instead of hanging
+    writer._check = lambda: None
+    with pytest.raises(TypeError):
+        writer.flush()
+    with pytest.raises(TypeError):
+        writer.close()